@@ -3,16 +3,14 @@ Main application file for PRISM.
 """
 
 import streamlit as st
-from config.config import APP_CONFIG, ACTIONS
-from utils.snowflake_utils import (
-    get_current_snowflake_user,
-    get_current_snowflake_role
-)
+from config.config import CONFIG, ACTIONS_LIST
+from utils.helpers import get_session_context
+from utils.page_registry import render_action
 
 def main():
     # Set page configuration
     st.set_page_config(
-        page_title=APP_CONFIG["APP"]["TITLE"],
+        page_title=CONFIG["APP"]["TITLE"],
         layout="wide",
         initial_sidebar_state="expanded"
     )
@@ -107,7 +105,7 @@ def main():
     
     # Sidebar
     with st.sidebar:
-        st.image(APP_CONFIG["APP"]["LOGO_URL"], width=500)
+        st.image(CONFIG["APP"]["LOGO_URL"], width=500)
         st.image("Prism Designer.jpeg", width=500)
         
         # Account Context
@@ -121,8 +119,9 @@ def main():
        
         # Session Information
         st.markdown("### Current Session")
-        current_user = get_current_snowflake_user()
-        current_role = get_current_snowflake_role()
+        session_context = get_session_context()
+        current_user = session_context.user
+        current_role = session_context.role
        
         session_container = st.container()
         with session_container:
@@ -144,7 +143,7 @@ def main():
         st.markdown("### Actions")
         selected_action = st.radio(
             "",
-            list(ACTIONS.values()),
+            ACTIONS_LIST,
             key="selected_action_radio"
         )
        
@@ -167,40 +166,12 @@ def main():
                 st.text("Kalyan Aravapalli")
 
     # Main content area
-    st.title(APP_CONFIG["APP"]["TITLE"])
+    st.title(CONFIG["APP"]["TITLE"])
     st.markdown("---")
    
-    # Action Dispatcher
-    if selected_action == ACTIONS["ABOUT"]:
-        st.switch_page("pages/1_About.py")
-    elif selected_action == ACTIONS["CREATE_DATABASE"]:
-        st.switch_page("pages/2_Database_Management.py")
-    elif selected_action == ACTIONS["CLONE_DATABASE"]:
-        st.switch_page("pages/2_Database_Management.py")
-    elif selected_action == ACTIONS["DELETE_DATABASE"]:
-        st.switch_page("pages/2_Database_Management.py")
-    elif selected_action == ACTIONS["CREATE_WAREHOUSE"]:
-        st.switch_page("pages/3_Warehouse_Management.py")
-    elif selected_action == ACTIONS["CREATE_ROLE"]:
-        st.switch_page("pages/4_Role_Management.py")
-    elif selected_action == ACTIONS["ASSIGN_ROLES"]:
-        st.switch_page("pages/4_Role_Management.py")
-    elif selected_action == ACTIONS["ASSIGN_DATABASE_ROLES"]:
-        st.switch_page("pages/4_Role_Management.py")
-    elif selected_action == ACTIONS["REVOKE_ROLES"]:
-        st.switch_page("pages/4_Role_Management.py")
-    elif selected_action == ACTIONS["CREATE_ENVIRONMENT_ROLES"]:
-        st.switch_page("pages/4_Role_Management.py")
-    elif selected_action == ACTIONS["SHOW_ROLE_HIERARCHY"]:
-        st.switch_page("pages/5_Role_Hierarchy.py")
-    elif selected_action == ACTIONS["DISPLAY_RBAC_ARCHITECTURE"]:
-        st.switch_page("pages/5_Role_Hierarchy.py")
-    elif selected_action == ACTIONS["MANAGE_METADATA"]:
-        st.switch_page("pages/6_Metadata_Management.py")
-    elif selected_action == ACTIONS["COST_ANALYSIS"]:
-        st.switch_page("pages/7_Cost_Analysis.py")
-    elif selected_action == ACTIONS["AUDIT_LOGS"]:
-        st.switch_page("pages/8_Audit_Logs.py")
+    # Only the selected action's page module is imported
+    if selected_action:
+        render_action(selected_action)
     else:
         st.info("Select an action from the sidebar to get started.")
 
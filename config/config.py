@@ -2,7 +2,8 @@
 CONFIG = {
     "APP": {
         "TITLE": "Portal for Role Integration, Security & Management",
-        "LOGO_URL": "assets/NTT-Data-Logo.png"
+        "LOGO_URL": "assets/NTT-Data-Logo.png",
+        "LAST_UPDATED": "2026-10-18"
     },
     "DATABASE": {
         "NAME": "SECURITY",  # Change this for your environment
@@ -20,6 +21,83 @@ CONFIG = {
         "DATABASE_CONTROLLER": "SP_DATABASE_CONTROLLER",
         "ENVIRONMENT_ROLE_CONTROLLER": "SP_ENVIRONMENT_ROLE_CONTROLLER",
         "MANAGE_FUNCTIONAL_TECHNICAL_ROLES": "SP_MANAGE_FUNCTIONAL_TECHNICAL_ROLES_CONTROLLER"
+    },
+    "CACHE": {
+        "CATALOG_TTL_SECONDS": 300,  # How long SHOW DATABASES/ROLES/WAREHOUSES results are reused
+        "CATALOG_MAX_ENTRIES": 256,  # One entry per account, role and object kind
+        "ROLE_GRAPH_TTL_SECONDS": 600,  # How long a GRANTS_TO_ROLES role graph is reused
+        "ROLE_GRAPH_MAX_ENTRIES": 16,  # One graph per account and role
+        "PRIVILEGE_MATRIX_TTL_SECONDS": 600,  # How long the effective privilege matrix is reused
+        "GRANT_STATE_TTL_SECONDS": 600,  # How long the bulk grant state behind RBAC plans is reused
+        "FORECAST_TTL_SECONDS": 86400,  # Upper bound on reusing a fitted credit forecast; new metering data refits sooner
+        "METADATA_SNAPSHOT_TTL_SECONDS": 900,  # How long a database's INFORMATION_SCHEMA snapshot is reused
+        "METADATA_SNAPSHOT_MAX_ENTRIES": 32,  # One snapshot per account, role and database
+        "SEARCH_INDEX_TTL_SECONDS": 3600,  # How long a built metadata search index is kept in memory
+        "SEARCH_INDEX_MAX_ENTRIES": 8  # One index per account and role
+    },
+    "AUDIT": {
+        "ID_BLOCK_SIZE": 50,  # Sequence values reserved per NEXTVAL round trip
+        "MAX_BUFFERED_EVENTS": 200,  # Flush a batch early once this many events are queued
+        "MAX_BUFFER_AGE_SECONDS": 10  # Flush a batch early once its oldest event is this old
+    },
+    "EXPORT": {
+        "MAX_DOWNLOAD_MB": 200,  # Larger exports are not offered for download; Streamlit holds the file in memory to serve it
+        "MAX_FILE_AGE_HOURS": 6  # Export files older than this are deleted, including those of ended sessions
+    },
+    "BULK_EXECUTION": {
+        "MAX_CONCURRENCY": 8,  # GRANT/REVOKE statements in flight at once
+        "MAX_RETRIES": 3,  # Retries per statement after a throttling error
+        "BACKOFF_SECONDS": 1.0,  # Base delay before the first retry, doubled per attempt
+        "POLL_INTERVAL_SECONDS": 0.2  # How often in-flight async queries are checked
+    },
+    "COST_STORE": {
+        "PATH": ".prism_cache/cost_history",  # Local Parquet store for ACCOUNT_USAGE cost data
+        "REFRESH_INTERVAL_MINUTES": 15  # Minimum time between delta fetches per source
+    },
+    "METADATA_SEARCH": {
+        "PATH": ".prism_cache/metadata_search",  # Local Parquet copy of schema, object and column names
+        "MAX_CONCURRENCY": 4,  # Databases crawled at once
+        "MAX_RESULTS": 1000  # Search hits shown on the page
+    },
+    "GRANT_SNAPSHOTS": {
+        "PATH": ".prism_cache/grant_snapshots",  # Local Parquet snapshots of GRANTS_TO_ROLES
+        "INTERVAL_HOURS": 24,  # A new snapshot is taken when the Drift view opens and the newest is older
+        "MAX_SNAPSHOTS": 30,  # Oldest snapshots beyond this are deleted
+        "ROW_GROUP_SIZE": 16384  # Grants per Parquet row group; smaller groups make per-role reads cheaper
+    },
+    "RESULT_CACHE": {
+        "MAX_BYTES": 256 * 1024 * 1024,  # Memory budget shared by every session; LRU entries are evicted past it
+        "TTL_SECONDS": {  # How long results are reused, per query class
+            "ACCOUNT_USAGE": 900,  # ACCOUNT_USAGE views lag by up to hours anyway
+            "INFORMATION_SCHEMA": 300,
+            "AUDIT_LOG": 60,  # PRISM writes new events continuously
+            "DEFAULT": 120
+        }
+    },
+    "CHARTS": {
+        "HOURLY_MAX_DAYS": 7,  # Auto resolution: hourly points up to this many days, then daily
+        "DAILY_MAX_DAYS": 120,  # Auto resolution: daily points up to this many days, then weekly
+        "MAX_SERIES": 12,  # Largest series drawn individually; the rest are summed into "Other"
+        "MAX_POINTS_PER_SERIES": 500,  # LTTB downsampling target per series
+        "WEBGL_POINT_THRESHOLD": 2000  # Switch to Scattergl once a chart draws more points than this
+    },
+    "ANOMALIES": {
+        "BASELINE_WEEKS": 6,  # Previous weeks each hour-of-week median is taken over; also read before the selected range
+        "MIN_BASELINE_WEEKS": 4,  # Weeks of history an hour needs before it is scored
+        "Z_THRESHOLD": 5.0,  # Robust deviations above the baseline (on the cube root of credits) that count as an anomaly
+        "MIN_EXCESS_CREDITS": 1.0,  # Ignore spikes smaller than this many credits over the baseline
+        "MIN_SPREAD": 0.01  # Spread floor on the cube-root scale, so near-constant usage is not flagged for tiny changes
+    },
+    "FORECAST": {
+        "FIT_DAYS": 56,  # Complete days of metering history each warehouse model is fitted on
+        "MIN_FIT_DAYS": 14,  # Fewer complete days than this and no forecast is made
+        "INTERVAL_Z": 1.645,  # Width of the month-end interval in standard deviations (90%)
+        "DEFAULT_MONTHLY_BUDGET": 0,  # Credits per month for warehouses not listed below; 0 means no budget
+        "MONTHLY_BUDGETS": {}  # Warehouse name -> monthly credit budget, e.g. {"COMPUTE_WH": 500}
+    },
+    "INSTRUMENTATION": {
+        "DEVELOPER_PANEL": False,  # Show the per-run waterfall on every page (or add ?dev=1 to the URL)
+        "MAX_EVENTS": 500  # Statements and stages recorded per page run
     }
 }
 
@@ -32,12 +110,15 @@ CREATE_ROLE = "Create a Role"
 CREATE_ENVIRONMENT_ROLES = "Create Environment Roles"  
 SHOW_ROLE_HIERARCHY = "Show Role Hierarchy"
 DISPLAY_RBAC_ARCHITECTURE = "Display RBAC Architecture"
+PLAN_RBAC_MODEL = "Plan & Apply RBAC Model"
+RBAC_DRIFT = "RBAC Drift"
 MANAGE_METADATA = "Manage Metadata"
 AUDIT_LOGS = "Audit Logs"
 ASSIGN_ROLES = "Assign Roles"
 ASSIGN_DATABASE_ROLES = "Assign Database Roles"
 REVOKE_ROLES = "Revoke Roles"  
 COST_ANALYSIS = "Cost Analysis"
+CREDIT_FORECAST = "Credit Forecast"
 ABOUT = "About PRISM"
 
 ACTIONS_LIST = [
@@ -53,11 +134,15 @@ ACTIONS_LIST = [
     CREATE_ENVIRONMENT_ROLES,
     SHOW_ROLE_HIERARCHY,
     DISPLAY_RBAC_ARCHITECTURE,
+    PLAN_RBAC_MODEL,
+    RBAC_DRIFT,
     MANAGE_METADATA,
     COST_ANALYSIS,
+    CREDIT_FORECAST,
     AUDIT_LOGS, 
 ]
 
 # Role Types
 FUNCTIONAL_ROLE = "Functional"
-TECHNICAL_ROLE = "Technical" 
\ No newline at end of file
+TECHNICAL_ROLE = "Technical"
+ROLE_TYPES = [FUNCTIONAL_ROLE, TECHNICAL_ROLE]
\ No newline at end of file
@@ -1,6 +1,8 @@
 import streamlit as st
 from config.config import CONFIG
+from utils.instrumentation import instrument_page
 
+@instrument_page
 def ui_about():
     st.markdown("## About NTTDATA-Prism")
     st.markdown("""
@@ -2,15 +2,198 @@ import streamlit as st
 from snowflake.snowpark.context import get_active_session
 from config.config import CONFIG
 from utils.helpers import get_fully_qualified_name, log_audit_event, configure_dark_mode_charts
+from utils.async_queries import run_queries_concurrently, submit_queries, iter_completed
+from utils.query import query_pandas, downcast_frame
+from utils.export import EXPORT_FORMATS, export_query, discard_export
+from utils.instrumentation import instrument_page, trace_stage
+from utils.charts import RESOLUTIONS, AUTO_RESOLUTION, resolve_resolution, aggregate_series, time_series_figure
+import os
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 
+# Raw log browser and export state, page sizes
+AUDIT_PAGER_KEY = "audit_log_pager"
+AUDIT_EXPORT_KEY = "audit_log_export"
+PAGE_SIZES = [25, 50, 100, 250, 500]
+
+def build_audit_filter(start_date, end_date, event_types):
+    """Returns the WHERE clause and bind params shared by every audit query."""
+    where = "EVENT_TIME >= TO_DATE(?) AND EVENT_TIME < DATEADD(DAY, 1, TO_DATE(?))"
+    params = [start_date.isoformat(), end_date.isoformat()]
+    if event_types:
+        where += f" AND EVENT_TYPE IN ({', '.join('?' for _ in event_types)})"
+        params.extend(event_types)
+    return where, params
+
+def build_audit_queries(audit_log_table, where, params, resolution="Hour"):
+    """One server-side aggregate per chart; events over time are bucketed at resolution (a RESOLUTIONS label)."""
+    unit = RESOLUTIONS[resolution]
+    def grouped(select_list, group_by, order_by):
+        return (f"""
+            SELECT {select_list}, COUNT(*) AS EVENT_COUNT
+            FROM {audit_log_table}
+            WHERE {where}
+            GROUP BY {group_by}
+            ORDER BY {order_by}
+        """, params)
+    
+    return {
+        "event_types": grouped("EVENT_TYPE", "EVENT_TYPE", "EVENT_COUNT DESC"),
+        "statuses": grouped("STATUS", "STATUS", "EVENT_COUNT DESC"),
+        "over_time": grouped(f"DATE_TRUNC('{unit}', EVENT_TIME) AS PERIOD, EVENT_TYPE", "PERIOD, EVENT_TYPE", "PERIOD"),
+        "users": grouped("INVOKED_BY AS USER_NAME", "INVOKED_BY", "EVENT_COUNT DESC"),
+        "roles": grouped("INVOKED_BY_ROLE AS ROLE_NAME", "INVOKED_BY_ROLE", "EVENT_COUNT DESC"),
+    }
+
+def build_audit_page_query(audit_log_table, where, params, cursor, page_size):
+    """
+    Keyset (seek) query for one page of raw events, newest first.
+    cursor is the (EVENT_TIME, EVENT_ID) of the last row on the previous page,
+    so every page costs the same however deep it is. One extra row is fetched
+    to tell whether a next page exists.
+    """
+    seek = ""
+    seek_params = []
+    if cursor is not None:
+        seek = " AND (EVENT_TIME < ? OR (EVENT_TIME = ? AND EVENT_ID < ?))"
+        seek_params = [cursor[0], cursor[0], cursor[1]]
+    return f"""
+        SELECT
+            EVENT_ID,
+            EVENT_TIME,
+            EVENT_TYPE,
+            OBJECT_NAME,
+            SQL_COMMAND,
+            STATUS,
+            MESSAGE,
+            INVOKED_BY,
+            INVOKED_BY_ROLE
+        FROM {audit_log_table}
+        WHERE {where}{seek}
+        ORDER BY EVENT_TIME DESC, EVENT_ID DESC
+        LIMIT {page_size + 1}
+    """, params + seek_params
+
+def _previous_audit_page():
+    st.session_state[AUDIT_PAGER_KEY]["cursors"].pop()
+
+def _next_audit_page():
+    pager = st.session_state[AUDIT_PAGER_KEY]
+    pager["cursors"].append(pager["next_cursor"])
+
+def render_audit_log_browser(session, audit_log_table, where, params, total_events):
+    """Paginated raw log table that holds at most the current and the prefetched page."""
+    page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key="audit_log_page_size")
+    
+    # Start from the first page whenever the filters or page size change
+    filter_key = (where, tuple(params), page_size)
+    pager = st.session_state.get(AUDIT_PAGER_KEY)
+    if pager is None or pager["filter_key"] != filter_key:
+        pager = {"filter_key": filter_key, "cursors": [None], "next_cursor": None, "prefetch": None}
+        st.session_state[AUDIT_PAGER_KEY] = pager
+    
+    cursor = pager["cursors"][-1]
+    prefetch = pager["prefetch"]
+    if prefetch is not None and prefetch[0] == cursor:
+        pager["prefetch"] = None
+        for _, rows, _, error in iter_completed(prefetch[1]):
+            if error is not None:
+                raise error
+            page = downcast_frame(rows)
+    else:
+        query, query_params = build_audit_page_query(audit_log_table, where, params, cursor, page_size)
+        page = query_pandas(session, query, query_params)
+    
+    has_next = len(page) > page_size
+    page = page.iloc[:page_size]
+    if has_next:
+        last = page.iloc[-1]
+        pager["next_cursor"] = (last["EVENT_TIME"].to_pydatetime(), int(last["EVENT_ID"]))
+    else:
+        pager["next_cursor"] = None
+    
+    st.dataframe(page, use_container_width=True)
+    
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        st.button("◀ Previous", on_click=_previous_audit_page, disabled=len(pager["cursors"]) == 1)
+    with col_page:
+        st.caption(f"Page {len(pager['cursors'])} of {max(1, -(-total_events // page_size))} · {total_events} events")
+    with col_next:
+        st.button("Next ▶", on_click=_next_audit_page, disabled=not has_next)
+    
+    # Start fetching the next page in the background while the user reads this one, once
+    # per next page: reruns that do not page keep the prefetch already in flight
+    if not has_next:
+        pager["prefetch"] = None
+    elif pager["prefetch"] is None or pager["prefetch"][0] != pager["next_cursor"]:
+        query, query_params = build_audit_page_query(audit_log_table, where, params, pager["next_cursor"], page_size)
+        pager["prefetch"] = (pager["next_cursor"], submit_queries(session, {"next_page": (query, query_params)}, as_pandas=True))
+
+def render_audit_export(session, audit_log_table, where, params, total_events):
+    """
+    Streams the filtered log to a local file and keeps its download button across reruns
+    until the filters or the format change. The button is given the open file rather than
+    its contents, and exports over MAX_DOWNLOAD_MB get no button at all.
+    """
+    export_format = st.selectbox("Format", list(EXPORT_FORMATS), key="audit_export_format")
+    filter_key = (where, tuple(params), export_format)
+    
+    export = st.session_state.get(AUDIT_EXPORT_KEY)
+    if export is not None and (export["filter_key"] != filter_key or not os.path.exists(export["path"])):
+        discard_export(export["path"])
+        del st.session_state[AUDIT_EXPORT_KEY]
+        export = None
+    
+    if export is None and st.button("Prepare export"):
+        progress = st.progress(0.0)
+        def on_progress(rows):
+            progress.progress(min(rows / max(total_events, 1), 1.0), text=f"{rows} of {total_events} events written")
+        path, rows = export_query(session, f"""
+            SELECT *
+            FROM {audit_log_table}
+            WHERE {where}
+            ORDER BY EVENT_TIME DESC, EVENT_ID DESC
+        """, params, export_format, on_progress)
+        progress.empty()
+        if path is None:
+            st.info("No events match the filters")
+            return
+        suffix, mime = EXPORT_FORMATS[export_format]
+        export = {
+            "filter_key": filter_key,
+            "path": path,
+            "rows": rows,
+            "file_name": f"audit_logs_{datetime.now():%Y%m%d_%H%M%S}{suffix}",
+            "mime": mime,
+        }
+        st.session_state[AUDIT_EXPORT_KEY] = export
+    
+    if export is not None:
+        size_mb = os.path.getsize(export["path"]) / (1024 * 1024)
+        st.caption(f"{export['rows']} events exported ({size_mb:.1f} MB)")
+        if size_mb > CONFIG["EXPORT"]["MAX_DOWNLOAD_MB"]:
+            st.warning(
+                f"The export is larger than {CONFIG['EXPORT']['MAX_DOWNLOAD_MB']} MB and cannot be downloaded "
+                "through the browser; narrow the filters or the date range"
+            )
+        else:
+            with open(export["path"], "rb") as f:
+                st.download_button(
+                    label=f"Download {export['file_name']}",
+                    data=f,
+                    file_name=export["file_name"],
+                    mime=export["mime"]
+                )
+
+@instrument_page
 def ui_audit_logs():
     st.markdown("## Audit Logs")
     
     try:
         session = get_active_session()
+        audit_log_table = get_fully_qualified_name(CONFIG["TABLES"]["AUDIT_LOG"])
         
         # Date range selection
         col1, col2 = st.columns(2)
@@ -26,12 +209,12 @@ def ui_audit_logs():
             )
         
         # Event type filter
-        event_types = session.sql("""
+        event_types = query_pandas(session, f"""
             SELECT DISTINCT EVENT_TYPE
-            FROM AUDIT_LOG_TABLE
+            FROM {audit_log_table}
             ORDER BY EVENT_TYPE
-        """).collect()
-        event_type_list = [row["EVENT_TYPE"] for row in event_types]
+        """, cached=True)
+        event_type_list = event_types["EVENT_TYPE"].tolist() if not event_types.empty else []
         
         selected_event_types = st.multiselect(
             "Event Types",
@@ -39,120 +222,94 @@ def ui_audit_logs():
             default=event_type_list
         )
         
-        # Build the query
-        query = f"""
-            SELECT 
-                EVENT_ID,
-                EVENT_TYPE,
-                OBJECT_NAME,
-                SQL_COMMAND,
-                STATUS,
-                MESSAGE,
-                USER_NAME,
-                ROLE_NAME,
-                TIMESTAMP
-            FROM AUDIT_LOG_TABLE
-            WHERE TIMESTAMP >= '{start_date}'
-            AND TIMESTAMP <= '{end_date}'
-        """
-        
-        if selected_event_types:
-            event_types_str = "', '".join(selected_event_types)
-            query += f" AND EVENT_TYPE IN ('{event_types_str}')"
+        resolution_choice = st.selectbox("Chart Resolution", [AUTO_RESOLUTION] + list(RESOLUTIONS))
+        resolution = resolve_resolution(resolution_choice, start_date, end_date)
         
-        query += " ORDER BY TIMESTAMP DESC"
+        # Run every aggregate server-side and concurrently
+        where, params = build_audit_filter(start_date, end_date, selected_event_types)
+        queries = build_audit_queries(audit_log_table, where, params, resolution)
+        results = run_queries_concurrently(session, queries, as_pandas=True, cached=True)
         
-        # Execute the query
-        audit_logs = session.sql(query).collect()
-        
-        if audit_logs:
-            # Convert to DataFrame
-            import pandas as pd
-            df = pd.DataFrame(audit_logs)
+        if not results["event_types"].empty:
+            total_events = int(results["event_types"]["EVENT_COUNT"].sum())
             
-            # Display raw logs
+            # Display raw logs one page at a time
             st.markdown("### Audit Logs")
-            st.dataframe(df)
+            render_audit_log_browser(session, audit_log_table, where, params, total_events)
             
             # Event type distribution
             st.markdown("### Event Type Distribution")
-            event_counts = df["EVENT_TYPE"].value_counts()
+            event_counts = results["event_types"]
             
-            fig = px.pie(
-                values=event_counts.values,
-                names=event_counts.index,
-                title="Event Type Distribution"
-            )
-            configure_dark_mode_charts(fig)
-            st.plotly_chart(fig, use_container_width=True)
+            with trace_stage("plotly", "Event Type Distribution"):
+                fig = px.pie(
+                    values=event_counts["EVENT_COUNT"],
+                    names=event_counts["EVENT_TYPE"],
+                    title="Event Type Distribution"
+                )
+                configure_dark_mode_charts(fig)
+                st.plotly_chart(fig, use_container_width=True)
             
             # Status distribution
             st.markdown("### Status Distribution")
-            status_counts = df["STATUS"].value_counts()
+            status_counts = results["statuses"]
             
-            fig = px.pie(
-                values=status_counts.values,
-                names=status_counts.index,
-                title="Status Distribution"
-            )
-            configure_dark_mode_charts(fig)
-            st.plotly_chart(fig, use_container_width=True)
+            with trace_stage("plotly", "Status Distribution"):
+                fig = px.pie(
+                    values=status_counts["EVENT_COUNT"],
+                    names=status_counts["STATUS"],
+                    title="Status Distribution"
+                )
+                configure_dark_mode_charts(fig)
+                st.plotly_chart(fig, use_container_width=True)
             
             # Events over time
             st.markdown("### Events Over Time")
-            df["HOUR"] = pd.to_datetime(df["TIMESTAMP"]).dt.floor("H")
-            hourly_events = df.groupby(["HOUR", "EVENT_TYPE"]).size().reset_index(name="COUNT")
-            
-            fig = px.line(
-                hourly_events,
-                x="HOUR",
-                y="COUNT",
-                color="EVENT_TYPE",
-                title="Events Over Time"
+            events_over_time = aggregate_series(
+                results["over_time"], "PERIOD", ["EVENT_COUNT"], "EVENT_TYPE", resolution
             )
-            configure_dark_mode_charts(fig)
-            st.plotly_chart(fig, use_container_width=True)
+            
+            with trace_stage("plotly", "Events Over Time"):
+                fig, drawn, received = time_series_figure(
+                    events_over_time, "PERIOD", "EVENT_COUNT", "EVENT_TYPE", "Events Over Time"
+                )
+                configure_dark_mode_charts(fig)
+                st.plotly_chart(fig, use_container_width=True)
+                st.caption(f"{drawn:,} of {received:,} points drawn at {resolution.lower()} resolution")
             
             # User activity
             st.markdown("### User Activity")
-            user_activity = df.groupby("USER_NAME").size().reset_index(name="EVENT_COUNT")
-            user_activity = user_activity.sort_values("EVENT_COUNT", ascending=False)
+            user_activity = results["users"]
             
-            fig = px.bar(
-                user_activity,
-                x="USER_NAME",
-                y="EVENT_COUNT",
-                title="User Activity"
-            )
-            configure_dark_mode_charts(fig)
-            st.plotly_chart(fig, use_container_width=True)
+            with trace_stage("plotly", "User Activity"):
+                fig = px.bar(
+                    user_activity,
+                    x="USER_NAME",
+                    y="EVENT_COUNT",
+                    title="User Activity"
+                )
+                configure_dark_mode_charts(fig)
+                st.plotly_chart(fig, use_container_width=True)
             
             # Role activity
             st.markdown("### Role Activity")
-            role_activity = df.groupby("ROLE_NAME").size().reset_index(name="EVENT_COUNT")
-            role_activity = role_activity.sort_values("EVENT_COUNT", ascending=False)
+            role_activity = results["roles"]
             
-            fig = px.bar(
-                role_activity,
-                x="ROLE_NAME",
-                y="EVENT_COUNT",
-                title="Role Activity"
-            )
-            configure_dark_mode_charts(fig)
-            st.plotly_chart(fig, use_container_width=True)
+            with trace_stage("plotly", "Role Activity"):
+                fig = px.bar(
+                    role_activity,
+                    x="ROLE_NAME",
+                    y="EVENT_COUNT",
+                    title="Role Activity"
+                )
+                configure_dark_mode_charts(fig)
+                st.plotly_chart(fig, use_container_width=True)
             
             # Export functionality
             st.markdown("### Export Data")
-            if st.button("Export to CSV"):
-                csv = df.to_csv(index=False)
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name="audit_logs.csv",
-                    mime="text/csv"
-                )
+            render_audit_export(session, audit_log_table, where, params, total_events)
         else:
             st.info("No audit logs found for the selected criteria")
-            
+    
     except Exception as e:
-        st.error(f"Error fetching audit logs: {str(e)}") 
\ No newline at end of file
+        st.error(f"Error fetching audit logs: {str(e)}")
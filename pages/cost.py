@@ -2,10 +2,157 @@ import streamlit as st
 from snowflake.snowpark.context import get_active_session
 from config.config import CONFIG
 from utils.helpers import get_fully_qualified_name, log_audit_event, configure_dark_mode_charts
-import plotly.express as px
+from utils.helpers import get_session_context
+from utils.async_queries import submit_queries, iter_completed
+from utils.cost_store import COST_SOURCES, get_cost_store
+from utils.storage_analytics import StorageTrend, BYTES_PER_GB, storage_summary_query
+from utils.query import cache_key, downcast_frame
+from utils.result_cache import get_result_cache, frame_bytes
+from utils.instrumentation import instrument_page, trace_stage
+from utils.charts import RESOLUTIONS, AUTO_RESOLUTION, resolve_resolution, aggregate_series, time_series_figure
+from utils.credit_anomalies import detect_credit_anomalies
+from utils.credit_forecast import BUDGET_STATUSES, budget_status, get_credit_forecast
+import pandas as pd
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
+FORECAST_BUDGETS_KEY = "credit_forecast_budgets"
+
+def show_time_series(frame, value_column, series_column, title, resolution):
+    """Draws a downsampled line chart and notes how many points it kept."""
+    fig, drawn, received = time_series_figure(frame, "HOUR", value_column, series_column, title)
+    configure_dark_mode_charts(fig)
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"{drawn:,} of {received:,} points drawn at {resolution.lower()} resolution")
+
+def render_warehouse_usage(df, resolution):
+    if df.empty:
+        st.info("No warehouse usage found for the selected dates")
+        return
+    
+    # Create line chart
+    series = aggregate_series(df, "HOUR", ["CREDITS_USED"], "WAREHOUSE_NAME", resolution)
+    show_time_series(series, "CREDITS_USED", "WAREHOUSE_NAME", "Warehouse Credit Usage Over Time", resolution)
+    
+    # Summary statistics
+    st.markdown("### Summary Statistics")
+    summary = df.groupby("WAREHOUSE_NAME", observed=True).agg({
+        "CREDITS_USED": ["sum", "mean", "max"]
+    }).round(2)
+    summary.columns = ["Total Credits", "Average Credits", "Max Credits"]
+    st.dataframe(summary)
+
+def render_credit_anomalies(usage, since):
+    """Hours where a warehouse used far more credits than in the same hour of previous weeks."""
+    anomalies = detect_credit_anomalies(usage, since) if not usage.empty else pd.DataFrame()
+    if anomalies.empty:
+        st.info("No credit anomalies found for the selected dates")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Anomalous Hours", len(anomalies))
+    col2.metric("Excess Credits", f"{anomalies['EXCESS_CREDITS'].sum():,.1f}")
+    col3.metric("Warehouses Affected", anomalies["WAREHOUSE_NAME"].nunique())
+    
+    # Hourly usage of the most affected warehouses, with the anomalous hours marked
+    excess = anomalies.groupby("WAREHOUSE_NAME", observed=True)["EXCESS_CREDITS"].sum()
+    flagged = excess.nlargest(CONFIG["CHARTS"]["MAX_SERIES"]).index
+    hourly = usage[usage["WAREHOUSE_NAME"].isin(flagged) & (usage["HOUR"] >= anomalies["HOUR"].min().floor("D"))]
+    series = aggregate_series(hourly, "HOUR", ["CREDITS_USED"], "WAREHOUSE_NAME", "Hour", len(flagged))
+    fig, drawn, received = time_series_figure(series, "HOUR", "CREDITS_USED", "WAREHOUSE_NAME", "Credit Anomalies")
+    marked = anomalies[anomalies["WAREHOUSE_NAME"].isin(flagged)]
+    fig.add_trace(go.Scatter(
+        x=marked["HOUR"], y=marked["CREDITS_USED"], mode="markers", name="Anomaly",
+        marker=dict(size=9, symbol="x", color="red"), text=marked["WAREHOUSE_NAME"],
+        hovertemplate="%{text}<br>%{x}<br>%{y:.2f} credits<extra></extra>",
+    ))
+    configure_dark_mode_charts(fig)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.dataframe(anomalies.round({"CREDITS_USED": 2, "EXPECTED_CREDITS": 2, "EXCESS_CREDITS": 2, "SCORE": 1}), use_container_width=True)
+
+def render_storage_usage(summary, resolution):
+    if summary.empty:
+        st.info("No storage usage found for the selected dates")
+        return
+    
+    trend = StorageTrend(summary)
+    growth = trend.growth()
+    
+    # Only databases with a row on the newest day count as current; dropped databases and
+    # ones whose history stopped earlier would otherwise add their last size to the total
+    newest = trend.dates[-1]
+    current = growth[pd.to_datetime(growth["LATEST_DATE"]) == newest]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Current Storage (GB)", f"{current['CURRENT_GB'].sum():,.1f}")
+    col2.metric("Change Over Range (GB)", f"{growth['CHANGE_GB'].sum():+,.1f}")
+    col3.metric("Databases", len(current))
+    if len(current) < len(growth):
+        st.caption(f"{len(growth) - len(current)} databases without data on {newest.date()} are left out of the current total")
+    
+    # Latest snapshot per current database, split by storage type
+    latest = summary[pd.to_datetime(summary["LATEST_DATE"]) == newest].assign(
+        DATABASE_GB=summary["DATABASE_BYTES"] / BYTES_PER_GB,
+        FAILSAFE_GB=summary["FAILSAFE_BYTES"] / BYTES_PER_GB,
+    ).nlargest(CONFIG["CHARTS"]["MAX_SERIES"] * 2, "DATABASE_GB")
+    fig = go.Figure([
+        go.Bar(x=latest["DATABASE_NAME"].astype(str), y=latest["DATABASE_GB"], name="Database"),
+        go.Bar(x=latest["DATABASE_NAME"].astype(str), y=latest["FAILSAFE_GB"], name="Fail-safe"),
+    ])
+    fig.update_layout(barmode="stack", title="Latest Storage by Database (GB)", yaxis_title="GB")
+    configure_dark_mode_charts(fig)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Daily trend; storage is a daily snapshot, so it is never re-bucketed
+    fig, drawn, received = time_series_figure(
+        trend.series(CONFIG["CHARTS"]["MAX_SERIES"]), "USAGE_DATE", "STORAGE_GB", "DATABASE_NAME", "Daily Storage Trend (GB)"
+    )
+    configure_dark_mode_charts(fig)
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.markdown("### Storage Growth")
+    st.dataframe(growth.round(2), use_container_width=True)
+
+def render_query_history(df_queries, resolution):
+    if df_queries.empty:
+        st.info("No query history found for the selected dates")
+        return
+    
+    df_queries = df_queries.sort_values("HOUR")
+    df_queries["AVG_EXECUTION_TIME"] = df_queries["TOTAL_EXECUTION_TIME"] / df_queries["QUERY_COUNT"]
+    
+    # Averages are recomputed from bucket totals so coarser resolutions stay query-weighted
+    series = aggregate_series(
+        df_queries, "HOUR", ["QUERY_COUNT", "TOTAL_EXECUTION_TIME"], "WAREHOUSE_NAME", resolution
+    )
+    series["AVG_EXECUTION_TIME"] = series["TOTAL_EXECUTION_TIME"] / series["QUERY_COUNT"].where(series["QUERY_COUNT"] > 0)
+    
+    # Create line chart for query count
+    show_time_series(series, "QUERY_COUNT", "WAREHOUSE_NAME", "Query Count Over Time", resolution)
+    
+    # Create line chart for average execution time
+    show_time_series(series, "AVG_EXECUTION_TIME", "WAREHOUSE_NAME", "Average Query Execution Time Over Time", resolution)
+    
+    # Summary statistics
+    st.markdown("### Query Summary Statistics")
+    summary = df_queries.groupby("WAREHOUSE_NAME", observed=True).agg({
+        "QUERY_COUNT": "sum",
+        "AVG_EXECUTION_TIME": "mean",
+        "CREDITS_USED": "sum"
+    }).round(2)
+    summary.columns = ["Total Queries", "Average Execution Time", "Total Credits"]
+    st.dataframe(summary)
+
+# Panels in display order: key -> (heading, renderer). Credit anomalies has no source of its
+# own; it is rendered from the warehouse usage read, which includes the baseline weeks.
+COST_PANELS = {
+    "warehouse_usage": ("Warehouse Usage Analysis", render_warehouse_usage),
+    "credit_anomalies": ("Credit Anomalies", render_credit_anomalies),
+    "storage_usage": ("Storage Usage Analysis", render_storage_usage),
+    "query_history": ("Query History Analysis", render_query_history),
+}
+
+@instrument_page
 def ui_cost_analysis():
     st.markdown("## Cost Analysis")
     
@@ -24,152 +171,184 @@ def ui_cost_analysis():
                 "End Date",
                 datetime.now()
             )
+        resolution_choice = st.selectbox("Chart Resolution", [AUTO_RESOLUTION] + list(RESOLUTIONS))
+        resolution = resolve_resolution(resolution_choice, start_date, end_date)
         
-        # Warehouse usage analysis
-        st.markdown("### Warehouse Usage Analysis")
+        # Lay out every panel with a placeholder before any query returns
+        placeholders = {}
+        for key, (heading, _) in COST_PANELS.items():
+            st.markdown(f"### {heading}")
+            placeholders[key] = st.empty()
+            placeholders[key].info(f"Loading {heading.lower()}...")
         
-        warehouse_usage = session.sql(f"""
-            SELECT 
-                WAREHOUSE_NAME,
-                DATE_TRUNC('HOUR', START_TIME) as HOUR,
-                SUM(CREDITS_USED) as CREDITS_USED
-            FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY
-            WHERE START_TIME >= '{start_date}'
-            AND START_TIME <= '{end_date}'
-            GROUP BY WAREHOUSE_NAME, HOUR
-            ORDER BY HOUR
-        """).collect()
+        # Only rows newer than each source's watermark (or older than what the
+        # local store holds) are fetched; charts always read from the store
+        context = get_session_context(session)
+        store = get_cost_store(context.account, context.role)
+        # Warehouse usage is also read for the weeks before the range, to seed the anomaly baselines
+        history_start = start_date - timedelta(weeks=CONFIG["ANOMALIES"]["BASELINE_WEEKS"])
+        read_start = {source: history_start if source == "warehouse_usage" else start_date for source in COST_SOURCES}
+        queries = {}
+        for source in COST_SOURCES:
+            for window in store.plan_fetch(source, read_start[source]):
+                queries[(source, window)] = store.fetch_query(source, window)
         
-        if warehouse_usage:
-            # Convert to DataFrame
-            import pandas as pd
-            df = pd.DataFrame(warehouse_usage)
-            
-            # Create line chart
-            fig = px.line(
-                df,
-                x="HOUR",
-                y="CREDITS_USED",
-                color="WAREHOUSE_NAME",
-                title="Warehouse Credit Usage Over Time"
-            )
-            configure_dark_mode_charts(fig)
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Summary statistics
-            st.markdown("### Summary Statistics")
-            summary = df.groupby("WAREHOUSE_NAME").agg({
-                "CREDITS_USED": ["sum", "mean", "max"]
-            }).round(2)
-            summary.columns = ["Total Credits", "Average Credits", "Max Credits"]
-            st.dataframe(summary)
+        # Storage comes back already aggregated to one row per database, through the shared result cache
+        storage_query = storage_summary_query(start_date, end_date)
+        storage_key = cache_key(session, *storage_query)
+        storage = get_result_cache().get(storage_key, storage_key[2])
+        if storage is None:
+            queries[("storage_usage", None)] = storage_query
         
-        # Storage usage analysis
-        st.markdown("### Storage Usage Analysis")
+        def show_panel(source, caption, error=None, frame=None):
+            heading, render = COST_PANELS[source]
+            with placeholders[source].container():
+                st.caption(caption)
+                if error is not None:
+                    st.error(f"Error refreshing {heading.lower()}: {str(error)}")
+                if frame is None:
+                    with trace_stage("pandas", f"read {source} from local store"):
+                        frame = store.read(source, read_start[source], end_date)
+                if source == "warehouse_usage":
+                    show_anomalies(frame)
+                    if not frame.empty:
+                        frame = frame[frame["HOUR"] >= pd.Timestamp(start_date, tz="UTC")]
+                with trace_stage("plotly", f"render {source}"):
+                    render(frame, resolution)
         
-        storage_usage = session.sql(f"""
-            SELECT 
-                DATABASE_NAME,
-                SCHEMA_NAME,
-                ACTIVE_BYTES,
-                TIME_TRAVEL_BYTES,
-                FAILSAFE_BYTES,
-                STORAGE_BYTES
-            FROM SNOWFLAKE.ACCOUNT_USAGE.STORAGE_USAGE
-            WHERE USAGE_DATE >= '{start_date}'
-            AND USAGE_DATE <= '{end_date}'
-            ORDER BY STORAGE_BYTES DESC
-        """).collect()
+        def show_anomalies(usage):
+            with placeholders["credit_anomalies"].container():
+                st.caption(f"⏱ baselines from {CONFIG['ANOMALIES']['BASELINE_WEEKS']} weeks before the range")
+                with trace_stage("pandas", "detect credit anomalies"):
+                    render_credit_anomalies(usage, start_date)
         
-        if storage_usage:
-            # Convert to DataFrame
-            df_storage = pd.DataFrame(storage_usage)
-            
-            # Convert bytes to GB
-            for col in ["ACTIVE_BYTES", "TIME_TRAVEL_BYTES", "FAILSAFE_BYTES", "STORAGE_BYTES"]:
-                df_storage[col] = df_storage[col] / (1024 * 1024 * 1024)
-            
-            # Create bar chart
-            fig = px.bar(
-                df_storage,
-                x="DATABASE_NAME",
-                y="STORAGE_BYTES",
-                title="Storage Usage by Database (GB)"
-            )
-            configure_dark_mode_charts(fig)
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Storage breakdown
-            st.markdown("### Storage Breakdown")
-            storage_breakdown = df_storage.melt(
-                id_vars=["DATABASE_NAME", "SCHEMA_NAME"],
-                value_vars=["ACTIVE_BYTES", "TIME_TRAVEL_BYTES", "FAILSAFE_BYTES"],
-                var_name="Storage Type",
-                value_name="Size (GB)"
-            )
-            
-            fig = px.bar(
-                storage_breakdown,
-                x="DATABASE_NAME",
-                y="Size (GB)",
-                color="Storage Type",
-                title="Storage Breakdown by Type (GB)"
-            )
-            configure_dark_mode_charts(fig)
-            st.plotly_chart(fig, use_container_width=True)
+        pending = {source: sum(1 for key in queries if key[0] == source) for source in COST_SOURCES}
+        for source, count in pending.items():
+            if count == 0:
+                show_panel(source, "⏱ served from local store")
+        if storage is not None:
+            show_panel("storage_usage", "⏱ served from cache", frame=storage.copy(deep=False))
+        
+        # Submit all delta fetches at once and render each panel as its source completes
+        fetched_rows = {source: 0 for source in COST_SOURCES}
+        errors = {}
+        for (source, window), rows, elapsed, error in iter_completed(submit_queries(session, queries, as_pandas=True)):
+            if source == "storage_usage":
+                if error is None:
+                    rows = downcast_frame(rows)
+                    get_result_cache().set(storage_key, storage_key[2], rows, frame_bytes(rows))
+                show_panel(
+                    source, f"⏱ {elapsed:.1f}s · {len(rows) if error is None else 0} databases fetched", error,
+                    frame=rows.copy(deep=False) if error is None else pd.DataFrame()
+                )
+                continue
+            if error is None:
+                store.apply_fetch(source, window, rows)
+                fetched_rows[source] += len(rows)
+            else:
+                errors[source] = error
+            pending[source] -= 1
+            if pending[source] == 0:
+                show_panel(source, f"⏱ {elapsed:.1f}s · {fetched_rows[source]} new rows fetched", errors.get(source))
+    
+    except Exception as e:
+        st.error(f"Error analyzing costs: {str(e)}")
+
+
+def render_burn_down(burn, budget):
+    """Remaining budget over the month (or cumulative credits without a budget), actual then forecast."""
+    offset, label = (budget, "Remaining Budget (credits)") if budget > 0 else (0, "Cumulative Credits")
+    sign = -1 if budget > 0 else 1
+    values = {column: offset + sign * burn[column] for column in ("ACTUAL", "FORECAST", "LOW", "HIGH")}
+    fig = go.Figure([
+        go.Scatter(x=burn["DATE"], y=values["HIGH"], mode="lines", line=dict(width=0), showlegend=False, hoverinfo="skip"),
+        go.Scatter(x=burn["DATE"], y=values["LOW"], mode="lines", line=dict(width=0), fill="tonexty", name="Interval"),
+        go.Scatter(x=burn["DATE"], y=values["ACTUAL"], mode="lines+markers", name="Actual"),
+        go.Scatter(x=burn["DATE"], y=values["FORECAST"], mode="lines", line=dict(dash="dash"), name="Forecast"),
+    ])
+    if budget > 0:
+        fig.add_hline(y=0, line_dash="dot", annotation_text="Budget exhausted")
+    fig.update_layout(title="Budget Burn-down" if budget > 0 else "Credits This Month", xaxis_title="DATE", yaxis_title=label)
+    configure_dark_mode_charts(fig)
+    st.plotly_chart(fig, use_container_width=True)
+
+@instrument_page
+def ui_credit_forecast():
+    st.markdown("## Credit Forecast")
+    
+    try:
+        session = get_active_session()
+        settings = CONFIG["FORECAST"]
+        context = get_session_context(session)
+        store = get_cost_store(context.account, context.role)
         
-        # Query history analysis
-        st.markdown("### Query History Analysis")
+        # Bring the local metering history up to date; the model is only refitted if this finds new hours
+        today = datetime.now(timezone.utc).date()
+        history_start = min(today - timedelta(days=settings["FIT_DAYS"] + 1), today.replace(day=1))
+        queries = {
+            ("warehouse_usage", window): store.fetch_query("warehouse_usage", window)
+            for window in store.plan_fetch("warehouse_usage", history_start)
+        }
+        for (source, window), rows, elapsed, error in iter_completed(submit_queries(session, queries, as_pandas=True)):
+            if error is None:
+                store.apply_fetch(source, window, rows)
+            else:
+                st.warning(f"Error refreshing warehouse usage, forecasting from stored history: {str(error)}")
         
-        query_history = session.sql(f"""
-            SELECT 
-                DATE_TRUNC('HOUR', START_TIME) as HOUR,
-                WAREHOUSE_NAME,
-                COUNT(*) as QUERY_COUNT,
-                AVG(EXECUTION_TIME) as AVG_EXECUTION_TIME,
-                SUM(CREDITS_USED) as CREDITS_USED
-            FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
-            WHERE START_TIME >= '{start_date}'
-            AND START_TIME <= '{end_date}'
-            GROUP BY HOUR, WAREHOUSE_NAME
-            ORDER BY HOUR
-        """).collect()
+        try:
+            with trace_stage("pandas", "fit credit forecast"):
+                forecast, refitted = get_credit_forecast(session, store)
+        except ValueError as e:
+            st.info(str(e))
+            return
+        st.caption(
+            f"{'⏱ refitted' if refitted else '⏱ reused cached fit'} · {forecast.fit_days} days from "
+            f"{forecast.fitted_from.isoformat()} · metering data up to {forecast.as_of:%Y-%m-%d %H:00} UTC"
+        )
         
-        if query_history:
-            # Convert to DataFrame
-            df_queries = pd.DataFrame(query_history)
-            
-            # Create line chart for query count
-            fig = px.line(
-                df_queries,
-                x="HOUR",
-                y="QUERY_COUNT",
-                color="WAREHOUSE_NAME",
-                title="Query Count Over Time"
+        # Budgets start from CONFIG and can be adjusted for this session
+        projection = forecast.projection()
+        if FORECAST_BUDGETS_KEY not in st.session_state:
+            st.session_state[FORECAST_BUDGETS_KEY] = dict(settings["MONTHLY_BUDGETS"])
+        budgets = st.session_state[FORECAST_BUDGETS_KEY]
+        with st.expander("Monthly Budgets"):
+            edited = st.data_editor(
+                pd.DataFrame({
+                    "WAREHOUSE_NAME": projection["WAREHOUSE_NAME"],
+                    "MONTHLY_BUDGET": [float(budgets.get(name, settings["DEFAULT_MONTHLY_BUDGET"])) for name in projection["WAREHOUSE_NAME"]],
+                }),
+                disabled=["WAREHOUSE_NAME"],
+                hide_index=True,
+                use_container_width=True,
             )
-            configure_dark_mode_charts(fig)
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Create line chart for average execution time
-            fig = px.line(
-                df_queries,
-                x="HOUR",
-                y="AVG_EXECUTION_TIME",
-                color="WAREHOUSE_NAME",
-                title="Average Query Execution Time Over Time"
-            )
-            configure_dark_mode_charts(fig)
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Summary statistics
-            st.markdown("### Query Summary Statistics")
-            summary = df_queries.groupby("WAREHOUSE_NAME").agg({
-                "QUERY_COUNT": "sum",
-                "AVG_EXECUTION_TIME": "mean",
-                "CREDITS_USED": "sum"
-            }).round(2)
-            summary.columns = ["Total Queries", "Average Execution Time", "Total Credits"]
-            st.dataframe(summary)
-            
+            budgets.update(zip(edited["WAREHOUSE_NAME"], edited["MONTHLY_BUDGET"].fillna(0)))
+        status = budget_status(projection, budgets)
+        
+        total_budget = status["MONTHLY_BUDGET"].sum()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Month to Date", f"{status['MONTH_TO_DATE'].sum():,.1f}")
+        col2.metric("Projected Month-End", f"{status['PROJECTED_MONTH_END'].sum():,.1f}")
+        col3.metric("Total Budget", f"{total_budget:,.1f}" if total_budget > 0 else "-")
+        col4.metric("Warehouses Over Budget", int(status["STATUS"].isin(["Exceeded", "Will exceed"]).sum()))
+        
+        selection = st.selectbox("Warehouse", ["All warehouses"] + status["WAREHOUSE_NAME"].tolist())
+        if selection == "All warehouses":
+            # Against the total budget, only the warehouses that have one are burned down
+            budgeted = status.loc[status["MONTHLY_BUDGET"] > 0, "WAREHOUSE_NAME"]
+            burn, budget = forecast.burn_down(budgeted if total_budget > 0 else None), total_budget
+        else:
+            burn = forecast.burn_down([selection])
+            budget = status.loc[status["WAREHOUSE_NAME"] == selection, "MONTHLY_BUDGET"].fillna(0).iloc[0]
+        with trace_stage("plotly", "render burn-down"):
+            render_burn_down(burn, budget)
+        
+        st.markdown("### Month-End Projection")
+        ordered = status.assign(STATUS=pd.Categorical(status["STATUS"], BUDGET_STATUSES, ordered=True))
+        st.dataframe(
+            ordered.sort_values(["STATUS", "PROJECTED_MONTH_END"], ascending=[True, False]).round(2),
+            hide_index=True,
+            use_container_width=True,
+        )
+    
     except Exception as e:
-        st.error(f"Error analyzing costs: {str(e)}") 
\ No newline at end of file
+        st.error(f"Error forecasting credits: {str(e)}")
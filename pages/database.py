@@ -2,7 +2,11 @@ import streamlit as st
 from snowflake.snowpark.context import get_active_session
 from config.config import CONFIG
 from utils.helpers import get_fully_qualified_name, log_audit_event
+from utils.catalog import get_database_names, record_object_created, record_object_dropped
+from utils.query import query_rows
+from utils.instrumentation import instrument_page
 
+@instrument_page
 def ui_create_database():
     st.markdown("## Create Database")
     
@@ -29,7 +33,8 @@ def ui_create_database():
                     create_cmd += f" COMMENT = '{comment}'"
                 
                 # Execute the command
-                session.sql(create_cmd).collect()
+                query_rows(session, create_cmd)
+                record_object_created("DATABASES", database_name, session)
                 
                 # Log the event
                 log_audit_event(
@@ -51,6 +56,7 @@ def ui_create_database():
                     message=str(e)
                 )
 
+@instrument_page
 def ui_clone_database():
     st.markdown("## Clone Database")
     
@@ -58,8 +64,7 @@ def ui_clone_database():
         session = get_active_session()
         
         # Get list of existing databases
-        databases = session.sql("SHOW DATABASES").collect()
-        database_list = [row["name"] for row in databases]
+        database_list = get_database_names(session)
         
         with st.form("clone_database_form"):
             source_database = st.selectbox("Source Database", database_list)
@@ -80,7 +85,8 @@ def ui_clone_database():
                         clone_cmd += f" COMMENT = '{comment}'"
                     
                     # Execute the command
-                    session.sql(clone_cmd).collect()
+                    query_rows(session, clone_cmd)
+                    record_object_created("DATABASES", new_database_name, session)
                     
                     # Log the event
                     log_audit_event(
@@ -105,6 +111,7 @@ def ui_clone_database():
     except Exception as e:
         st.error(f"Error fetching databases: {str(e)}")
 
+@instrument_page
 def ui_delete_database():
     st.markdown("## Delete Database")
     
@@ -112,8 +119,7 @@ def ui_delete_database():
         session = get_active_session()
         
         # Get list of existing databases
-        databases = session.sql("SHOW DATABASES").collect()
-        database_list = [row["name"] for row in databases]
+        database_list = get_database_names(session)
         
         with st.form("delete_database_form"):
             database_to_delete = st.selectbox("Select Database to Delete", database_list)
@@ -131,7 +137,8 @@ def ui_delete_database():
                     drop_cmd = f"DROP DATABASE {database_to_delete}"
                     
                     # Execute the command
-                    session.sql(drop_cmd).collect()
+                    query_rows(session, drop_cmd)
+                    record_object_dropped("DATABASES", database_to_delete, session)
                     
                     # Log the event
                     log_audit_event(
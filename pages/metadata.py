@@ -1,42 +1,93 @@
 import streamlit as st
 from snowflake.snowpark.context import get_active_session
 from config.config import CONFIG
+import time
+from datetime import datetime
 from utils.helpers import get_fully_qualified_name, log_audit_event
+from utils.catalog import get_database_names
+from utils.privilege_matrix import get_privilege_matrix
+from utils.metadata_snapshot import get_database_snapshot
+from utils.metadata_search import SEARCH_MODES, crawl_metadata, get_search_index, get_search_store
+from utils.instrumentation import instrument_page
 
+def render_metadata_search(session):
+    """Account-wide name search over the locally crawled metadata index."""
+    store = get_search_store(session)
+    state = store.load_state()
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        if state:
+            st.caption(f"Index covers {len(state)} databases")
+        else:
+            st.info("The search index is empty. Build it to search every database you can see.")
+    with col2:
+        rebuild = st.button("Build index" if not state else "Refresh index")
+    
+    if rebuild:
+        progress = st.progress(0.0)
+        def on_progress(done, total, database):
+            progress.progress(done / total, text=f"Crawled {database} ({done}/{total})")
+        outcome = crawl_metadata(session, store, get_database_names(session, refresh=True), on_progress=on_progress)
+        progress.empty()
+        st.success(
+            f"Updated {len(outcome['UPDATED'])}, unchanged {len(outcome['UNCHANGED'])}, "
+            f"removed {len(outcome['REMOVED'])} databases"
+        )
+        for database, message in outcome["FAILED"].items():
+            st.warning(f"Could not crawl {database}: {message}")
+    
+    index = get_search_index(session, refresh=rebuild)
+    if not len(index):
+        return
+    
+    col1, col2, col3 = st.columns([3, 1, 2])
+    with col1:
+        text = st.text_input("Search names", placeholder="e.g. CUSTOMER_SSN")
+    with col2:
+        mode = st.selectbox("Match", SEARCH_MODES)
+    with col3:
+        kinds = st.multiselect("Kinds", ["DATABASE", "SCHEMA", "TABLE", "VIEW", "COLUMN"])
+    
+    if text:
+        started = time.perf_counter()
+        results, total = index.search(text, mode, kinds, limit=CONFIG["METADATA_SEARCH"]["MAX_RESULTS"])
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        st.caption(f"{total} matches among {len(index)} indexed names in {elapsed_ms:.1f} ms")
+        if total > len(results):
+            st.caption(f"Showing the first {len(results)}")
+        st.dataframe(results.drop(columns=["LAST_ALTERED"]), hide_index=True)
+
+@instrument_page
 def ui_manage_metadata():
     st.markdown("## Metadata Management")
     
     try:
         session = get_active_session()
         
+        view = st.radio("View", ["Browse", "Search"], horizontal=True, key="metadata_view")
+        if view == "Search":
+            render_metadata_search(session)
+            return
+        
         # Get list of databases
-        databases = session.sql("SHOW DATABASES").collect()
-        database_list = [row["name"] for row in databases]
+        database_list = get_database_names(session)
         
         selected_database = st.selectbox("Select Database", database_list)
         
         if selected_database:
-            # Get schemas in the selected database
-            schemas = session.sql(f"SHOW SCHEMAS IN DATABASE {selected_database}").collect()
-            schema_list = [row["name"] for row in schemas]
+            # Every drill-down below is served from one snapshot of the database
+            refresh = st.button("Refresh metadata")
+            snapshot = get_database_snapshot(session, selected_database, refresh=refresh)
+            st.caption(f"Snapshot taken {datetime.fromtimestamp(snapshot.loaded_at):%Y-%m-%d %H:%M:%S}")
+            
+            schema_list = snapshot.schema_names()
             
             selected_schema = st.selectbox("Select Schema", schema_list)
             
             if selected_schema:
                 # Get objects in the selected schema
-                objects = session.sql(f"""
-                    SELECT 
-                        TABLE_NAME as name,
-                        TABLE_TYPE as type
-                    FROM {selected_database}.INFORMATION_SCHEMA.TABLES
-                    WHERE TABLE_SCHEMA = '{selected_schema}'
-                    UNION ALL
-                    SELECT 
-                        VIEW_NAME as name,
-                        'VIEW' as type
-                    FROM {selected_database}.INFORMATION_SCHEMA.VIEWS
-                    WHERE TABLE_SCHEMA = '{selected_schema}'
-                """).collect()
+                objects = snapshot.objects_in(selected_schema)
                 
                 if objects:
                     # Convert to DataFrame for better display
@@ -56,40 +107,43 @@ def ui_manage_metadata():
                         
                         if object_type in ["BASE TABLE", "VIEW"]:
                             # Get columns
-                            columns = session.sql(f"""
-                                SELECT 
-                                    COLUMN_NAME,
-                                    DATA_TYPE,
-                                    CHARACTER_MAXIMUM_LENGTH,
-                                    IS_NULLABLE,
-                                    COLUMN_DEFAULT
-                                FROM {selected_database}.INFORMATION_SCHEMA.COLUMNS
-                                WHERE TABLE_SCHEMA = '{selected_schema}'
-                                AND TABLE_NAME = '{selected_object}'
-                                ORDER BY ORDINAL_POSITION
-                            """).collect()
+                            columns = snapshot.columns_of(selected_schema, selected_object)
                             
                             if columns:
                                 st.markdown("### Column Information")
                                 st.dataframe(pd.DataFrame(columns))
                             
                             # Get object properties
-                            properties = session.sql(f"""
-                                SHOW {object_type}S LIKE '{selected_object}' IN SCHEMA {selected_database}.{selected_schema}
-                            """).collect()
+                            properties = snapshot.object_properties(selected_schema, selected_object)
                             
                             if properties:
                                 st.markdown("### Object Properties")
-                                st.dataframe(pd.DataFrame(properties))
+                                st.dataframe(pd.DataFrame([properties]))
                             
-                            # Get object grants
-                            grants = session.sql(f"""
-                                SHOW GRANTS ON {object_type} {selected_database}.{selected_schema}.{selected_object}
-                            """).collect()
+                            # Effective grants, served from the account-wide privilege matrix
+                            matrix = get_privilege_matrix(session)
+                            grant_type = "TABLE" if object_type == "BASE TABLE" else object_type
+                            full_name = f"{selected_database}.{selected_schema}.{selected_object}"
+                            grants = matrix.object_privileges(grant_type, full_name)
                             
                             if grants:
                                 st.markdown("### Object Grants")
                                 st.dataframe(pd.DataFrame(grants))
+                                
+                                # Point check against the same matrix
+                                col1, col2 = st.columns(2)
+                                with col1:
+                                    check_role = st.selectbox("Role", sorted(matrix.roles.names), key="privilege_check_role")
+                                with col2:
+                                    check_privilege = st.selectbox(
+                                        "Privilege",
+                                        sorted({grant["PRIVILEGE"] for grant in grants}),
+                                        key="privilege_check_privilege"
+                                    )
+                                if matrix.can(check_role, check_privilege, grant_type, full_name):
+                                    st.success(f"{check_role} can {check_privilege} on {full_name}")
+                                else:
+                                    st.warning(f"{check_role} cannot {check_privilege} on {full_name}")
                         else:
                             st.info(f"Object type {object_type} is not supported for detailed view")
                 else:
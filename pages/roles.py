@@ -1,8 +1,21 @@
 import streamlit as st
 from snowflake.snowpark.context import get_active_session
 from config.config import CONFIG, ROLE_TYPES
-from utils.helpers import get_fully_qualified_name, log_audit_event, log_role_hierarchy_event
+from utils.helpers import get_fully_qualified_name, log_audit_event, log_role_hierarchy_event, audit_batch
+from utils.catalog import get_database_names, get_role_names, record_grant_change, record_object_created
+from utils.bulk_executor import execute_statements
+from utils.role_reachability import get_role_reachability, record_role_edge_change
+from utils.query import query_rows
+from utils.instrumentation import instrument_page
+import time
 
+# Session state: the last provisioning run and RBAC apply in this session, kept so their
+# reports survive the rerun, and the role tree nodes that are expanded
+PROVISIONING_REPORT_KEY = "environment_roles_report"
+RBAC_APPLY_REPORT_KEY = "rbac_apply_report"
+ROLE_TREE_EXPANDED_KEY = "role_tree_expanded"
+
+@instrument_page
 def ui_create_role():
     st.markdown("## Create Role")
     
@@ -28,12 +41,15 @@ def ui_create_role():
                     create_cmd += f" COMMENT = '{comment}'"
                 
                 # Execute the command
-                session.sql(create_cmd).collect()
+                query_rows(session, create_cmd)
+                record_object_created("ROLES", role_name, session)
                 
                 # If parent role is specified, grant it
                 if parent_role:
                     grant_cmd = f"GRANT ROLE {parent_role} TO ROLE {role_name}"
-                    session.sql(grant_cmd).collect()
+                    query_rows(session, grant_cmd)
+                    record_grant_change(session=session, grantees=[role_name])
+                    record_role_edge_change(session, role_name, parent_role, granted=True)
                 
                 # Log the events
                 log_audit_event(
@@ -62,6 +78,49 @@ def ui_create_role():
                     message=str(e)
                 )
 
+def run_bulk_grants(session, statements, event_type, object_names, catalog_kinds, grantee, role_edges=None, granted=True):
+    """
+    Executes GRANT/REVOKE statements concurrently, audits every outcome in one
+    batch and shows the per-statement result table.
+    grantee is the role every statement grants to or revokes from.
+    role_edges optionally lists the (grantee role, granted role) pair each statement
+    changes, so the role reachability index is updated for the ones that succeed.
+    Returns:
+        (number succeeded, number failed)
+    """
+    results = execute_statements(session, statements)
+    
+    with audit_batch():
+        for result, object_name in zip(results, object_names):
+            log_audit_event(
+                event_type=event_type,
+                object_name=object_name,
+                sql_command=result["STATEMENT"],
+                status=result["STATUS"],
+                message=result["MESSAGE"]
+            )
+    
+    succeeded = sum(1 for result in results if result["STATUS"] == "SUCCESS")
+    failed = len(results) - succeeded
+    if succeeded:
+        record_grant_change(catalog_kinds, session, grantees=[grantee])
+    for result, edge in zip(results, role_edges or []):
+        if result["STATUS"] == "SUCCESS":
+            record_role_edge_change(session, edge[0], edge[1], granted)
+    
+    import pandas as pd
+    st.dataframe(pd.DataFrame(results), use_container_width=True)
+    return succeeded, failed
+
+def show_bulk_outcome(succeeded, failed, action):
+    if not failed:
+        st.success(f"{action}: all {succeeded} statements succeeded!")
+    elif not succeeded:
+        st.error(f"{action}: all {failed} statements failed.")
+    else:
+        st.warning(f"{action}: {succeeded} statements succeeded, {failed} failed.")
+
+@instrument_page
 def ui_assign_roles():
     st.markdown("## Assign Roles")
     
@@ -69,8 +128,7 @@ def ui_assign_roles():
         session = get_active_session()
         
         # Get list of existing roles
-        roles = session.sql("SHOW ROLES").collect()
-        role_list = [row["name"] for row in roles]
+        role_list = get_role_names(session)
         
         with st.form("assign_roles_form"):
             target_role = st.selectbox("Target Role", role_list)
@@ -84,18 +142,13 @@ def ui_assign_roles():
                     return
                 
                 try:
-                    for role in roles_to_grant:
-                        grant_cmd = f"GRANT ROLE {role} TO ROLE {target_role}"
-                        session.sql(grant_cmd).collect()
-                        
-                        # Log the event
-                        log_role_hierarchy_event(
-                            parent_role=role,
-                            child_role=target_role,
-                            action="GRANT"
-                        )
-                    
-                    st.success(f"Roles assigned successfully to '{target_role}'!")
+                    grant_cmds = [f"GRANT ROLE {role} TO ROLE {target_role}" for role in roles_to_grant]
+                    succeeded, failed = run_bulk_grants(
+                        session, grant_cmds, "GRANT_ROLE", [target_role] * len(grant_cmds),
+                        ("DATABASES", "ROLES", "WAREHOUSES"), target_role,
+                        role_edges=[(target_role, role) for role in roles_to_grant]
+                    )
+                    show_bulk_outcome(succeeded, failed, f"Assign roles to '{target_role}'")
                     
                 except Exception as e:
                     st.error(f"Error assigning roles: {str(e)}")
@@ -103,6 +156,7 @@ def ui_assign_roles():
     except Exception as e:
         st.error(f"Error fetching roles: {str(e)}")
 
+@instrument_page
 def ui_assign_database_roles():
     st.markdown("## Assign Database Roles")
     
@@ -110,11 +164,8 @@ def ui_assign_database_roles():
         session = get_active_session()
         
         # Get list of existing roles and databases
-        roles = session.sql("SHOW ROLES").collect()
-        databases = session.sql("SHOW DATABASES").collect()
-        
-        role_list = [row["name"] for row in roles]
-        database_list = [row["name"] for row in databases]
+        role_list = get_role_names(session)
+        database_list = get_database_names(session)
         
         with st.form("assign_database_roles_form"):
             target_role = st.selectbox("Target Role", role_list)
@@ -134,19 +185,15 @@ def ui_assign_database_roles():
                     return
                 
                 try:
-                    for privilege in privileges:
-                        grant_cmd = f"GRANT {privilege} ON DATABASE {database} TO ROLE {target_role}"
-                        session.sql(grant_cmd).collect()
-                        
-                        # Log the event
-                        log_audit_event(
-                            event_type="GRANT_DATABASE_PRIVILEGE",
-                            object_name=database,
-                            sql_command=grant_cmd,
-                            status="SUCCESS"
-                        )
-                    
-                    st.success(f"Database privileges assigned successfully to '{target_role}'!")
+                    grant_cmds = [
+                        f"GRANT {privilege} ON DATABASE {database} TO ROLE {target_role}"
+                        for privilege in privileges
+                    ]
+                    succeeded, failed = run_bulk_grants(
+                        session, grant_cmds, "GRANT_DATABASE_PRIVILEGE", [database] * len(grant_cmds),
+                        ("DATABASES",), target_role
+                    )
+                    show_bulk_outcome(succeeded, failed, f"Assign database privileges to '{target_role}'")
                     
                 except Exception as e:
                     st.error(f"Error assigning database privileges: {str(e)}")
@@ -154,6 +201,7 @@ def ui_assign_database_roles():
     except Exception as e:
         st.error(f"Error fetching roles or databases: {str(e)}")
 
+@instrument_page
 def ui_revoke_roles():
     st.markdown("## Revoke Roles")
     
@@ -161,8 +209,7 @@ def ui_revoke_roles():
         session = get_active_session()
         
         # Get list of existing roles
-        roles = session.sql("SHOW ROLES").collect()
-        role_list = [row["name"] for row in roles]
+        role_list = get_role_names(session)
         
         with st.form("revoke_roles_form"):
             target_role = st.selectbox("Target Role", role_list)
@@ -176,18 +223,14 @@ def ui_revoke_roles():
                     return
                 
                 try:
-                    for role in roles_to_revoke:
-                        revoke_cmd = f"REVOKE ROLE {role} FROM ROLE {target_role}"
-                        session.sql(revoke_cmd).collect()
-                        
-                        # Log the event
-                        log_role_hierarchy_event(
-                            parent_role=role,
-                            child_role=target_role,
-                            action="REVOKE"
-                        )
-                    
-                    st.success(f"Roles revoked successfully from '{target_role}'!")
+                    revoke_cmds = [f"REVOKE ROLE {role} FROM ROLE {target_role}" for role in roles_to_revoke]
+                    succeeded, failed = run_bulk_grants(
+                        session, revoke_cmds, "REVOKE_ROLE", [target_role] * len(revoke_cmds),
+                        ("DATABASES", "ROLES", "WAREHOUSES"), target_role,
+                        role_edges=[(target_role, role) for role in roles_to_revoke],
+                        granted=False
+                    )
+                    show_bulk_outcome(succeeded, failed, f"Revoke roles from '{target_role}'")
                     
                 except Exception as e:
                     st.error(f"Error revoking roles: {str(e)}")
@@ -195,83 +238,230 @@ def ui_revoke_roles():
     except Exception as e:
         st.error(f"Error fetching roles: {str(e)}")
 
+def _environment_roles_spec():
+    """Reads the spec from the single-prefix form or an uploaded CSV/YAML file; None until one is given."""
+    from utils.role_provisioning import ENVIRONMENTS, ROLE_TIERS, expand_spec, parse_spec
+    
+    source = st.radio("Source", ["Form", "Spec file"], horizontal=True, key="environment_roles_source")
+    if source == "Form":
+        col1, col2 = st.columns(2)
+        with col1:
+            role_prefix = st.text_input("Role Prefix")
+            parent_role = st.text_input("Parent Role (optional)")
+        with col2:
+            environments = st.multiselect("Environments", ENVIRONMENTS, default=ENVIRONMENTS[:1])
+            tiers = st.multiselect("Role Tiers", ROLE_TIERS, default=ROLE_TIERS)
+        if not role_prefix or not environments or not tiers:
+            st.info("Enter a role prefix and pick at least one environment and tier")
+            return None
+        entry = {"PREFIX": role_prefix, "ENVIRONMENTS": environments, "TIERS": tiers, "PARENT_ROLE": parent_role or None}
+        return expand_spec([entry])
+    
+    st.caption(
+        "CSV columns or YAML keys: PREFIX, ENVIRONMENTS, TIERS, PARENT_ROLE. "
+        "Separate several values with ';' in CSV; ENVIRONMENTS and TIERS default to "
+        f"{', '.join(ENVIRONMENTS)} and {', '.join(ROLE_TIERS)}."
+    )
+    uploaded = st.file_uploader("Provisioning spec", type=["csv", "yaml", "yml"])
+    if uploaded is None:
+        return None
+    return parse_spec(uploaded.getvalue().decode("utf-8-sig"), uploaded.name)
+
+@instrument_page
 def ui_create_environment_roles():
+    from utils.role_provisioning import plan_provisioning, apply_provisioning
+    
     st.markdown("## Create Environment Roles")
     
-    with st.form("create_environment_roles_form"):
-        environment = st.selectbox("Environment", ["DEV", "TEST", "PROD"])
-        role_prefix = st.text_input("Role Prefix")
+    try:
+        spec = _environment_roles_spec()
+    except ValueError as e:
+        st.error(f"Invalid provisioning spec: {str(e)}")
+        return
+    
+    report = st.session_state.get(PROVISIONING_REPORT_KEY)
+    if report:
+        created, granted, skipped, failed, results = report
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Roles created", created)
+        col2.metric("Grants issued", granted)
+        col3.metric("Skipped (already present)", skipped)
+        col4.metric("Failed", failed)
+        if results:
+            import pandas as pd
+            st.dataframe(pd.DataFrame(results), use_container_width=True)
+    
+    if spec is None:
+        return
+    
+    try:
+        session = get_active_session()
+        refresh = st.button("Refresh roles and grants")
+        plan = plan_provisioning(session, spec, refresh=refresh)
+    except Exception as e:
+        st.error(f"Error reading existing roles: {str(e)}")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Roles in spec", len(plan.roles))
+    col2.metric("Roles to create", len(plan.creates))
+    col3.metric("Grants to issue", len(plan.grants))
+    with st.expander(f"Plan ({plan.statements} statements)"):
+        st.dataframe(
+            {
+                "ACTION": ["CREATE ROLE"] * len(plan.creates) + ["GRANT ROLE"] * len(plan.grants),
+                "ROLE": plan.creates + [role for _, role in plan.grants],
+                "GRANTEE": [""] * len(plan.creates) + [grantee for grantee, _ in plan.grants],
+            },
+            use_container_width=True
+        )
+        if plan.skipped_roles or plan.skipped_grants:
+            st.caption(
+                f"Already present and skipped: {len(plan.skipped_roles)} roles, {len(plan.skipped_grants)} grants"
+            )
+    
+    if not plan.statements:
+        st.success("Every role and grant in the spec already exists")
+        return
+    
+    if st.button(f"Provision {len(plan.creates)} roles and {len(plan.grants)} grants", type="primary"):
+        try:
+            results = apply_provisioning(session, plan)
+        except Exception as e:
+            st.error(f"Error creating environment roles: {str(e)}")
+            return
         
-        submitted = st.form_submit_button("Create Environment Roles")
+        with audit_batch():
+            for result in results:
+                log_audit_event(
+                    event_type="CREATE_ENVIRONMENT_ROLE" if result["ACTION"] == "CREATE_ROLE" else "GRANT_ROLE",
+                    object_name=result["OBJECT"],
+                    sql_command=result["STATEMENT"],
+                    status=result["STATUS"],
+                    message=result["MESSAGE"]
+                )
         
-        if submitted:
-            if not role_prefix:
-                st.error("Role prefix is required")
-                return
-            
-            try:
-                session = get_active_session()
-                
-                # Create environment-specific roles
-                roles = [
-                    f"{role_prefix}_{environment}_ADMIN",
-                    f"{role_prefix}_{environment}_DEVELOPER",
-                    f"{role_prefix}_{environment}_ANALYST",
-                    f"{role_prefix}_{environment}_VIEWER"
-                ]
-                
-                for role in roles:
-                    create_cmd = f"CREATE ROLE {role}"
-                    session.sql(create_cmd).collect()
-                    
-                    # Log the event
-                    log_audit_event(
-                        event_type="CREATE_ENVIRONMENT_ROLE",
-                        object_name=role,
-                        sql_command=create_cmd,
-                        status="SUCCESS"
-                    )
-                
-                st.success(f"Environment roles created successfully for {environment}!")
-                
-            except Exception as e:
-                st.error(f"Error creating environment roles: {str(e)}")
+        for result in results:
+            if result["STATUS"] != "SUCCESS":
+                continue
+            if result["ACTION"] == "CREATE_ROLE":
+                record_object_created("ROLES", result["OBJECT"], session)
+            else:
+                record_role_edge_change(session, result["GRANTEE"], result["GRANTED_ROLE"], granted=True)
+        granted_to = [
+            result["GRANTEE"] for result in results
+            if result["ACTION"] == "GRANT_ROLE" and result["STATUS"] == "SUCCESS"
+        ]
+        if granted_to:
+            record_grant_change(("DATABASES", "ROLES", "WAREHOUSES"), session, grantees=granted_to)
+        
+        # Roles another session created after the SHOW ROLES snapshot count as skipped
+        creates = [result for result in results if result["ACTION"] == "CREATE_ROLE" and result["STATUS"] == "SUCCESS"]
+        created = sum(1 for result in creates if not result["EXISTED"])
+        failed = sum(1 for result in results if result["STATUS"] != "SUCCESS")
+        skipped = len(plan.skipped_roles) + len(plan.skipped_grants) + len(creates) - created
+        st.session_state[PROVISIONING_REPORT_KEY] = (created, len(granted_to), skipped, failed, results)
+        st.rerun()
 
+# Lazily rendered role tree: only expanded nodes have their children drawn
+ROLE_TREE_MAX_CHILDREN = 200
+
+def _toggle_role_node(path):
+    expanded = st.session_state.setdefault(ROLE_TREE_EXPANDED_KEY, set())
+    expanded.symmetric_difference_update({path})
+
+def render_role_tree(graph, role_id, path=(), depth=0):
+    """Draws one role and, if the user expanded it, its direct children."""
+    path = path + (role_id,)
+    name = graph.names[role_id]
+    child_count = graph.out_degree(role_id)
+    indent = "\u2003" * depth
+    if child_count == 0:
+        st.markdown(f"{indent}• {name}")
+        return
+    
+    expanded = path in st.session_state.get(ROLE_TREE_EXPANDED_KEY, set())
+    st.button(
+        f"{indent}{'▾' if expanded else '▸'} {name} ({child_count})",
+        key=f"role_node_{'_'.join(map(str, path))}",
+        on_click=_toggle_role_node,
+        args=(path,)
+    )
+    if expanded:
+        child_ids = graph.child_ids(role_id)
+        for child_id in child_ids[:ROLE_TREE_MAX_CHILDREN]:
+            # Snowflake rejects cyclic grants; this only guards against stale data
+            if child_id not in path:
+                render_role_tree(graph, int(child_id), path, depth + 1)
+        if len(child_ids) > ROLE_TREE_MAX_CHILDREN:
+            st.caption(f"{indent}\u2003… {len(child_ids) - ROLE_TREE_MAX_CHILDREN} more")
+
+@instrument_page
 def ui_show_role_hierarchy():
+    from utils.role_graph import get_role_graph
+    
     st.markdown("## Role Hierarchy")
     
     try:
         session = get_active_session()
         
-        # Get role hierarchy data
-        hierarchy_data = session.sql("""
-            SELECT 
-                GRANTED_TO as role,
-                GRANTEE_NAME as granted_role
-            FROM SNOWFLAKE.ACCOUNT_USAGE.GRANTS_TO_ROLES
-            WHERE GRANTED_TO != GRANTEE_NAME
-            ORDER BY role, granted_role
-        """).collect()
+        refresh = st.button("Refresh role hierarchy")
+        graph = get_role_graph(session, refresh=refresh)
         
-        if hierarchy_data:
-            # Convert to DataFrame for better display
-            import pandas as pd
-            df = pd.DataFrame(hierarchy_data)
-            st.dataframe(df)
+        if graph.num_edges:
+            col1, col2 = st.columns(2)
+            col1.metric("Roles", graph.num_roles)
+            col2.metric("Grants between roles", graph.num_edges)
+            
+            # Effective inheritance lookups
+            st.markdown("### Who Inherits What")
+            reachability = get_role_reachability(session, refresh=refresh)
+            searched_role = st.selectbox(
+                "Search role",
+                [""] + sorted(reachability.names),
+                key="role_reachability_search"
+            )
+            if searched_role:
+                started = time.perf_counter()
+                inherited = reachability.descendants(searched_role)
+                inherited_by = reachability.ancestors(searched_role)
+                users = reachability.users_holding(searched_role)
+                st.caption(f"Resolved in {(time.perf_counter() - started) * 1e6:.0f} µs")
+                
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.markdown(f"**{searched_role} inherits ({len(inherited)})**")
+                    st.dataframe({"ROLE": inherited}, use_container_width=True)
+                with col2:
+                    st.markdown(f"**Roles holding {searched_role} ({len(inherited_by)})**")
+                    st.dataframe({"ROLE": inherited_by}, use_container_width=True)
+                with col3:
+                    st.markdown(f"**Users holding {searched_role} ({len(users)})**")
+                    st.dataframe({"USER": users}, use_container_width=True)
+            
+            with st.expander("Role grants"):
+                import pandas as pd
+                st.dataframe(pd.DataFrame(graph.edges(), columns=["ROLE", "GRANTED_ROLE"]), use_container_width=True)
             
             # Create a hierarchical view
             st.markdown("### Hierarchical View")
-            for role in df["role"].unique():
-                st.markdown(f"#### {role}")
-                granted_roles = df[df["role"] == role]["granted_role"].tolist()
-                for granted_role in granted_roles:
-                    st.markdown(f"- {granted_role}")
+            role_filter = st.text_input("Filter top-level roles", key="role_tree_filter").strip().upper()
+            if role_filter:
+                top_level = [i for i, name in enumerate(graph.names) if role_filter in name.upper()]
+            else:
+                top_level = [int(i) for i in graph.root_ids()]
+            
+            for role_id in top_level[:ROLE_TREE_MAX_CHILDREN]:
+                render_role_tree(graph, role_id)
+            if len(top_level) > ROLE_TREE_MAX_CHILDREN:
+                st.caption(f"… {len(top_level) - ROLE_TREE_MAX_CHILDREN} more roles, use the filter to narrow down")
         else:
             st.info("No role hierarchy data available")
             
     except Exception as e:
         st.error(f"Error fetching role hierarchy: {str(e)}")
 
+@instrument_page
 def ui_display_rbac_architecture():
     st.markdown("## RBAC Architecture")
     
@@ -315,4 +505,153 @@ def ui_display_rbac_architecture():
     3. Document role hierarchies
     4. Use role naming conventions
     5. Implement role-based security policies
-    """) 
\ No newline at end of file
+    """) 
+
+
+@instrument_page
+def ui_plan_rbac_model():
+    from utils.rbac_plan import parse_desired_state, plan_rbac, apply_rbac_plan, quote_identifier, ROLE_GRANT_TYPE
+    import pandas as pd
+    
+    st.markdown("## Plan & Apply RBAC Model")
+    st.caption(
+        "Upload the desired roles, role grants and privileges as YAML or JSON. PRISM reads the current "
+        "grants in bulk, plans only the GRANT/REVOKE statements that differ and applies them concurrently. "
+        "GRANTS_TO_ROLES can lag by up to two hours, so changes made outside PRISM may not be planned yet."
+    )
+    
+    report = st.session_state.get(RBAC_APPLY_REPORT_KEY)
+    if report:
+        col1, col2 = st.columns(2)
+        col1.metric("Applied", sum(1 for row in report if row["STATUS"] == "SUCCESS"))
+        col2.metric("Failed", sum(1 for row in report if row["STATUS"] != "SUCCESS"))
+        with st.expander("Last apply", expanded=True):
+            st.dataframe(pd.DataFrame(report), use_container_width=True)
+    
+    uploaded = st.file_uploader("RBAC model", type=["yaml", "yml", "json"])
+    if uploaded is None:
+        return
+    try:
+        desired = parse_desired_state(uploaded.getvalue().decode("utf-8-sig"), uploaded.name)
+    except ValueError as e:
+        st.error(f"Invalid RBAC model: {str(e)}")
+        return
+    
+    try:
+        session = get_active_session()
+        refresh = st.button("Reload current grants")
+        plan = plan_rbac(session, desired, refresh=refresh)
+    except Exception as e:
+        st.error(f"Error reading current grants: {str(e)}")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Roles to create", len(plan.creates))
+    col2.metric("Grants", len(plan.grants))
+    col3.metric("Revokes", len(plan.revokes))
+    col4.metric("Unchanged", plan.unchanged)
+    if plan.missing_roles:
+        st.warning(f"Granted roles that do not exist and are not in the model: {', '.join(plan.missing_roles)}")
+    
+    if not plan.statements:
+        st.success(f"The account already matches the model for all {len(desired.roles)} roles")
+        return
+    st.dataframe(pd.DataFrame(plan.rows()), use_container_width=True)
+    
+    if st.button(f"Apply {plan.statements} statements", type="primary"):
+        try:
+            rows = apply_rbac_plan(session, plan)
+        except Exception as e:
+            st.error(f"Error applying RBAC plan: {str(e)}")
+            return
+        
+        with audit_batch():
+            for row in rows:
+                log_audit_event(
+                    event_type=row["ACTION"],
+                    object_name=row["GRANTEE"],
+                    sql_command=row["STATEMENT"],
+                    status=row["STATUS"],
+                    message=row["MESSAGE"]
+                )
+        
+        # GRANTEE is the stored role name and OBJECT the quoted identifier; the record
+        # helpers take identifiers as written in a statement
+        succeeded = [row for row in rows if row["STATUS"] == "SUCCESS"]
+        for row in succeeded:
+            if row["ACTION"] == "CREATE_ROLE":
+                record_object_created("ROLES", quote_identifier(row["GRANTEE"]), session)
+            elif row["GRANTED_ON"] == ROLE_GRANT_TYPE:
+                record_role_edge_change(
+                    session, quote_identifier(row["GRANTEE"]), row["OBJECT"], row["ACTION"] == "GRANT_ROLE"
+                )
+        changed_grantees = [quote_identifier(row["GRANTEE"]) for row in succeeded if row["ACTION"] != "CREATE_ROLE"]
+        if changed_grantees:
+            record_grant_change(session=session, grantees=changed_grantees)
+        
+        st.session_state[RBAC_APPLY_REPORT_KEY] = rows
+        st.rerun()
+
+@instrument_page
+def ui_rbac_drift():
+    from utils.grant_snapshots import get_snapshot_store, take_grant_snapshot, snapshot_due
+    from utils.helpers import get_session_context
+    
+    st.markdown("## RBAC Drift")
+    
+    try:
+        session = get_active_session()
+        context = get_session_context(session)
+        store = get_snapshot_store(context.account, context.role)
+        
+        take_now = st.button("Take snapshot now")
+        if take_now or snapshot_due(store):
+            with st.spinner("Snapshotting GRANTS_TO_ROLES..."):
+                entry = take_grant_snapshot(session, store)
+            st.caption(f"Snapshot taken: {entry['GRANTS']} grants across {entry['ROLES']} roles")
+        
+        snapshots = store.snapshots()
+        if len(snapshots) < 2:
+            st.info("Drift needs at least two snapshots; one is taken automatically each day this page is opened.")
+            return
+        
+        labels = {entry["ID"]: f"{entry['TAKEN_AT'][:19].replace('T', ' ')} UTC ({entry['GRANTS']} grants)" for entry in snapshots}
+        ids = [entry["ID"] for entry in reversed(snapshots)]
+        col1, col2 = st.columns(2)
+        with col1:
+            old_id = st.selectbox("From snapshot", ids, index=1, format_func=labels.get)
+        with col2:
+            new_id = st.selectbox("To snapshot", ids, index=0, format_func=labels.get)
+        if old_id == new_id:
+            st.info("Pick two different snapshots")
+            return
+        
+        started = time.perf_counter()
+        changes, roles = store.drift(old_id, new_id)
+        st.caption(f"Compared in {time.perf_counter() - started:.2f}s; {len(roles)} roles changed")
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Roles changed", len(roles))
+        col2.metric("Grants added", int((changes["CHANGE"] == "ADDED").sum()))
+        col3.metric("Grants removed", int((changes["CHANGE"] == "REMOVED").sum()))
+        
+        if changes.empty:
+            st.success("No grants changed between these snapshots")
+            return
+        
+        with st.expander("Changed roles"):
+            st.dataframe(roles, use_container_width=True)
+        
+        selected_roles = st.multiselect("Filter roles", roles["ROLE"].tolist())
+        if selected_roles:
+            changes = changes[changes["GRANTEE_NAME"].isin(selected_roles)]
+        st.dataframe(changes, use_container_width=True)
+        st.download_button(
+            label="Download drift (CSV)",
+            data=changes.to_csv(index=False),
+            file_name=f"prism_rbac_drift_{old_id}_{new_id}.csv",
+            mime="text/csv"
+        )
+        
+    except Exception as e:
+        st.error(f"Error computing RBAC drift: {str(e)}")
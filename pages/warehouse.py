@@ -2,7 +2,11 @@ import streamlit as st
 from snowflake.snowpark.context import get_active_session
 from config.config import CONFIG
 from utils.helpers import get_fully_qualified_name, log_audit_event
+from utils.catalog import record_object_created
+from utils.query import query_rows
+from utils.instrumentation import instrument_page
 
+@instrument_page
 def ui_create_warehouse():
     st.markdown("## Create Warehouse")
     
@@ -59,7 +63,8 @@ def ui_create_warehouse():
                     create_cmd += f" COMMENT = '{comment}'"
                 
                 # Execute the command
-                session.sql(create_cmd).collect()
+                query_rows(session, create_cmd)
+                record_object_created("WAREHOUSES", warehouse_name, session)
                 
                 # Log the event
                 log_audit_event(
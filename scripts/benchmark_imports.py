@@ -0,0 +1,90 @@
+"""
+Import-time benchmark for PRISM's cold start.
+
+Runs every measurement in a fresh interpreter, so each number is a true cold import:
+first Home.py on its own, then each action's page module on top of it, the way the
+page registry loads it. Also lists which heavy libraries each step pulled in and,
+with --top, the slowest modules under Home.py according to python -X importtime.
+
+Usage (from the repository root):
+    python scripts/benchmark_imports.py [--repeat 5] [--top 15]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pandas", "numpy", "plotly", "pyarrow")
+
+_MEASURE = """
+import json, sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def _run(code, extra_args=()):
+    return subprocess.run(
+        [sys.executable, *extra_args, "-c", code],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")]))},
+        capture_output=True,
+        text=True,
+    )
+
+def measure(statement: str, repeat: int, setup: str = "") -> dict:
+    """Median wall time of statement over repeat fresh interpreters, after running setup untimed."""
+    samples, heavy = [], []
+    for _ in range(repeat):
+        result = _run(setup + "\n" + _MEASURE.format(statement=statement, heavy=HEAVY_MODULES))
+        if result.returncode != 0:
+            return {"error": result.stderr.strip().splitlines()[-1] if result.stderr else "failed"}
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        samples.append(sample["seconds"])
+        heavy = sample["heavy"]
+    return {"median_ms": statistics.median(samples) * 1000, "heavy": heavy}
+
+def slowest_imports(statement: str, top: int) -> list:
+    """(cumulative ms, module) of the slowest imports reported by -X importtime."""
+    result = _run(statement, ["-X", "importtime"])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [part.strip() for part in line[len("import time:"):].split("|")]
+        if parts[1].isdigit():
+            rows.append((int(parts[1]) / 1000, parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest imports under Home.py")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from utils.page_registry import PAGE_REGISTRY
+
+    rows = [("Home.py", measure("import Home", args.repeat))]
+    for module_name in sorted({module for module, _ in PAGE_REGISTRY.values()}):
+        rows.append((f"+ {module_name}", measure(f"import {module_name}", args.repeat, setup="import Home")))
+
+    width = max(len(name) for name, _ in rows)
+    print(f"{'step':<{width}}  {'median ms':>10}  heavy libraries loaded")
+    for name, result in rows:
+        if "error" in result:
+            print(f"{name:<{width}}  {'error':>10}  {result['error']}")
+        else:
+            print(f"{name:<{width}}  {result['median_ms']:>10.1f}  {', '.join(result['heavy']) or '-'}")
+
+    if args.top:
+        print("\nSlowest imports under Home.py (cumulative ms):")
+        for milliseconds, module in slowest_imports("import Home", args.top):
+            print(f"{milliseconds:>10.1f}  {module}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+False-positive and detection check for utils.credit_anomalies.
+
+Scores synthetic hourly metering with no real anomalies: stationary gamma-distributed credits
+with a daily cycle, per-warehouse scale and randomly suspended hours. Then it plants spikes
+and checks that they are found. Exits non-zero if more than --max-rate of the scored hours
+are flagged in pure noise, if fewer than --min-recall of the planted spikes are found, or if
+scoring the noise takes longer than --max-seconds.
+
+Usage (from the repository root):
+    python scripts/check_anomaly_noise.py [--warehouses 500] [--weeks 52] [--seed 0]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def synthetic_usage(warehouses: int, weeks: int, rng) -> pd.DataFrame:
+    """
+    Hourly WAREHOUSE_NAME, HOUR, CREDITS_USED rows of stationary noise, suspended hours
+    omitted, with the categorical names and float32 credits the cost store reads return.
+    """
+    hours = pd.date_range("2025-01-06", periods=weeks * 168, freq="h", tz="UTC")
+    cycle = 1.0 + 0.5 * np.sin(np.arange(len(hours)) * 2 * np.pi / 24)
+    scale = rng.uniform(0.2, 4.0, warehouses)[:, np.newaxis]
+    credits = rng.gamma(2.0, 0.5, (warehouses, len(hours))) * cycle * scale
+    running = rng.random((warehouses, len(hours))) > 0.1
+    names = np.repeat([f"WH_{index:04d}" for index in range(warehouses)], len(hours))
+    frame = pd.DataFrame({
+        "WAREHOUSE_NAME": pd.Categorical(names),
+        "HOUR": np.tile(hours, warehouses),
+        "CREDITS_USED": credits.ravel().astype(np.float32),
+    })
+    return frame[running.ravel()].reset_index(drop=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--warehouses", type=int, default=500)
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spikes", type=int, default=200, help="spikes planted for the detection check")
+    parser.add_argument("--max-rate", type=float, default=0.0001, help="highest acceptable share of flagged hours in noise")
+    parser.add_argument("--min-recall", type=float, default=0.9, help="lowest acceptable share of planted spikes found")
+    parser.add_argument("--max-seconds", type=float, default=0.8, help="longest acceptable time to score the noise")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from config.config import CONFIG
+    from utils.credit_anomalies import detect_credit_anomalies
+
+    rng = np.random.default_rng(args.seed)
+    usage = synthetic_usage(args.warehouses, args.weeks, rng)
+    started = time.perf_counter()
+    flagged = detect_credit_anomalies(usage)
+    elapsed = time.perf_counter() - started
+    scored_hours = args.warehouses * (args.weeks - CONFIG["ANOMALIES"]["MIN_BASELINE_WEEKS"] - 1) * 168
+    rate = len(flagged) / scored_hours
+    print(f"noise: {len(flagged)} of {scored_hours} scored hours flagged ({rate:.5%}) in {elapsed:.2f}s")
+
+    # Plant spikes of 25 times a warehouse's typical hourly credits after the baseline warm-up
+    warm_up = pd.Timestamp(usage["HOUR"].min()) + pd.Timedelta(weeks=CONFIG["ANOMALIES"]["MIN_BASELINE_WEEKS"])
+    candidates = np.flatnonzero((usage["HOUR"] >= warm_up).to_numpy())
+    planted = rng.choice(candidates, args.spikes, replace=False)
+    typical = usage.groupby("WAREHOUSE_NAME", observed=True)["CREDITS_USED"].transform("median").to_numpy()
+    usage.loc[planted, "CREDITS_USED"] += 25 * typical[planted] + CONFIG["ANOMALIES"]["MIN_EXCESS_CREDITS"]
+    found = detect_credit_anomalies(usage).merge(usage.loc[planted, ["WAREHOUSE_NAME", "HOUR"]])
+    recall = len(found) / args.spikes
+    print(f"spikes: {len(found)} of {args.spikes} planted spikes found ({recall:.1%})")
+
+    if rate > args.max_rate or recall < args.min_recall or elapsed > args.max_seconds:
+        print("FAILED")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
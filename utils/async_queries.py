@@ -0,0 +1,113 @@
+import time
+from config.config import CONFIG
+from utils.query import downcast_frame, cache_key
+from utils.result_cache import get_result_cache, frame_bytes
+from utils.instrumentation import start_query, finish_query, record_cache_hit
+
+# Submit several queries at once
+def submit_queries(session, queries: dict, as_pandas: bool = False) -> dict:
+    """
+    Submits every query as an async job without waiting for results.
+    Args:
+        session: Snowpark session
+        queries: Mapping of name -> SQL string or (SQL string, bind params)
+        as_pandas: Jobs return DataFrames built from the Arrow result instead of Rows
+    Returns:
+        Mapping of name -> (async job, submitted_at, trace event); the event is closed
+        when iter_completed or iter_bounded sees the job finish
+    """
+    jobs = {}
+    for name, query in queries.items():
+        sql, params = query if isinstance(query, tuple) else (query, None)
+        event = start_query(sql)
+        frame = session.sql(sql, params=params)
+        try:
+            job = frame.to_pandas(block=False) if as_pandas else frame.collect_nowait()
+        except Exception as e:
+            finish_query(event, error=e)
+            raise
+        jobs[name] = (job, time.monotonic(), event)
+    return jobs
+
+# Yield async query results in the order they finish
+def iter_completed(jobs: dict, poll_interval: float = None):
+    """
+    Yields (name, rows, elapsed_seconds, error) for each job as soon as it completes.
+    Exactly one of rows and error is None.
+    """
+    poll_interval = poll_interval or CONFIG["BULK_EXECUTION"]["POLL_INTERVAL_SECONDS"]
+    pending = dict(jobs)
+    while pending:
+        completed = False
+        for name, (job, submitted_at, event) in list(pending.items()):
+            try:
+                if not job.is_done():
+                    continue
+                rows, error = job.result(), None
+            except Exception as e:
+                rows, error = None, e
+            finish_query(event, rows, job.query_id, error)
+            del pending[name]
+            completed = True
+            yield name, rows, time.monotonic() - submitted_at, error
+        if pending and not completed:
+            time.sleep(poll_interval)
+
+# Run several queries concurrently and wait for all of them
+def run_queries_concurrently(session, queries: dict, as_pandas: bool = False, cached: bool = False) -> dict:
+    """
+    Returns a mapping of name -> rows, or -> downcast DataFrame with as_pandas,
+    raising the first error encountered.
+    With cached (DataFrames only), queries found in the shared result cache are not
+    submitted and fresh results are added to it.
+    """
+    results, keys = {}, {}
+    if cached and as_pandas:
+        cache = get_result_cache()
+        for name, query in list(queries.items()):
+            sql, params = query if isinstance(query, tuple) else (query, None)
+            keys[name] = cache_key(session, sql, params)
+            df = cache.get(keys[name], keys[name][2])
+            if df is not None:
+                record_cache_hit(sql, df)
+                results[name] = df.copy(deep=False)
+        queries = {name: query for name, query in queries.items() if name not in results}
+    for name, rows, _, error in iter_completed(submit_queries(session, queries, as_pandas)):
+        if error is not None:
+            raise error
+        results[name] = downcast_frame(rows) if as_pandas else rows
+        if name in keys:
+            get_result_cache().set(keys[name], keys[name][2], results[name], frame_bytes(results[name]))
+            results[name] = results[name].copy(deep=False)
+    return results
+
+# Run many queries with a cap on how many are in flight
+def iter_bounded(session, queries: dict, max_concurrency: int, poll_interval: float = None, as_pandas: bool = False):
+    """
+    Submits queries in order, keeping at most max_concurrency running, and yields
+    (name, rows, elapsed_seconds, error) for each as soon as it completes.
+    """
+    poll_interval = poll_interval or CONFIG["BULK_EXECUTION"]["POLL_INTERVAL_SECONDS"]
+    waiting = list(queries.items())
+    running = {}
+    while waiting or running:
+        while waiting and len(running) < max_concurrency:
+            name, query = waiting.pop(0)
+            try:
+                running.update(submit_queries(session, {name: query}, as_pandas))
+            except Exception as e:
+                yield name, None, 0.0, e
+        completed = False
+        for name, (job, submitted_at, event) in list(running.items()):
+            try:
+                if not job.is_done():
+                    continue
+                rows, error = job.result(), None
+            except Exception as e:
+                rows, error = None, e
+            finish_query(event, rows, job.query_id, error)
+            del running[name]
+            completed = True
+            yield name, rows, time.monotonic() - submitted_at, error
+        if running and not completed:
+            time.sleep(poll_interval)
@@ -0,0 +1,137 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from utils.query import query_rows
+
+AUDIT_LOG_COLUMNS = (
+    "EVENT_ID", "EVENT_TIME", "INVOKED_BY", "INVOKED_BY_ROLE", "EVENT_TYPE",
+    "OBJECT_NAME", "SQL_COMMAND", "STATUS", "MESSAGE",
+)
+
+ROLE_HIERARCHY_LOG_COLUMNS = (
+    "LOG_ID", "EVENT_TIME", "AUDIT_EVENT_ID", "INVOKED_BY", "ENVIRONMENT_NAME",
+    "CREATED_ROLE_NAME", "CREATED_ROLE_TYPE", "MAPPED_DATABASE_ROLE",
+    "PARENT_ACCOUNT_ROLE", "SQL_COMMAND_CREATE_ROLE", "SQL_COMMAND_GRANT_DB_ROLE",
+    "SQL_COMMAND_GRANT_OWNERSHIP", "STATUS", "MESSAGE",
+)
+
+# Rows per INSERT statement, keeps the number of bind variables per statement bounded
+MAX_ROWS_PER_INSERT = 500
+
+
+class SequenceIdAllocator:
+    """Hands out values of a Snowflake sequence, reserving them in blocks with one query."""
+
+    def __init__(self, sequence_name: str, block_size: int):
+        self.sequence_name = sequence_name
+        self.block_size = block_size
+        self._reserved = []
+
+    def take(self, session) -> int:
+        if not self._reserved:
+            rows = query_rows(
+                session,
+                f"SELECT {self.sequence_name}.NEXTVAL AS ID "
+                f"FROM TABLE(GENERATOR(ROWCOUNT => {int(self.block_size)}))"
+            )
+            if not rows:
+                raise RuntimeError(f"Could not reserve IDs from sequence {self.sequence_name}")
+            # Values are handed out in ascending order so event IDs still follow event order
+            self._reserved = sorted((row["ID"] for row in rows), reverse=True)
+        return self._reserved.pop()
+
+
+class AuditWriter:
+    """
+    Buffers audit rows per table and writes them with one multi-row bind-parameter
+    INSERT per table. Outside of batch() every row is written immediately; inside
+    it rows are held until the batch ends or the size or age threshold is reached.
+    """
+
+    def __init__(self, tables: dict, id_block_size: int, max_buffered_events: int,
+                 max_buffer_age_seconds: float, on_error=None):
+        """
+        Args:
+            tables: Mapping of fully qualified table name -> (sequence name, column names).
+                    The first column of each table receives the sequence value.
+            on_error: Called as on_error(table, exception) when a flush fails
+        """
+        self.on_error = on_error
+        self.max_buffered_events = max_buffered_events
+        self.max_buffer_age_seconds = max_buffer_age_seconds
+        self._columns = {table: columns for table, (_, columns) in tables.items()}
+        self._allocators = {
+            table: SequenceIdAllocator(sequence, id_block_size)
+            for table, (sequence, _) in tables.items()
+        }
+        self._pending = {table: [] for table in tables}
+        self._oldest_pending = None
+        self._batch_depth = 0
+        self._lock = threading.RLock()
+
+    def append(self, session, table: str, values: tuple) -> int:
+        """
+        Queues one row for table and returns the ID assigned to it.
+        values holds every column after the ID and event time, in table column order.
+        """
+        with self._lock:
+            row_id = self._allocators[table].take(session)
+            event_time = datetime.now(timezone.utc).isoformat()
+            self._pending[table].append((row_id, event_time) + tuple(values))
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+            if self._should_flush():
+                self.flush(session)
+            return row_id
+
+    def _should_flush(self) -> bool:
+        if self._batch_depth == 0:
+            return True
+        pending = sum(len(rows) for rows in self._pending.values())
+        if pending >= self.max_buffered_events:
+            return True
+        return (time.monotonic() - self._oldest_pending) >= self.max_buffer_age_seconds
+
+    def flush(self, session):
+        """Writes every buffered row. Rows are dropped even if the write fails, so a broken table cannot grow the buffer."""
+        with self._lock:
+            pending = {table: rows for table, rows in self._pending.items() if rows}
+            self._pending = {table: [] for table in self._pending}
+            self._oldest_pending = None
+        for table, rows in pending.items():
+            try:
+                for start in range(0, len(rows), MAX_ROWS_PER_INSERT):
+                    self._insert(session, table, rows[start:start + MAX_ROWS_PER_INSERT])
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(table, e)
+
+    def _insert(self, session, table, rows):
+        columns = self._columns[table]
+        placeholders = "(" + ", ".join("?" for _ in columns) + ")"
+        # Event times are bound as ISO-8601 strings and converted server-side
+        select_list = ", ".join(
+            f"TO_TIMESTAMP_LTZ(COLUMN{position})" if column == "EVENT_TIME" else f"COLUMN{position}"
+            for position, column in enumerate(columns, start=1)
+        )
+        insert_sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"SELECT {select_list} FROM VALUES {', '.join(placeholders for _ in rows)}"
+        )
+        params = [value for row in rows for value in row]
+        query_rows(session, insert_sql, params)
+
+    @contextmanager
+    def batch(self, session):
+        """Buffers rows appended inside the block and flushes them when the outermost block exits."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                done = self._batch_depth == 0
+            if done:
+                self.flush(session)
@@ -0,0 +1,141 @@
+import heapq
+import random
+import re
+import time
+from collections import deque
+from config.config import CONFIG
+from utils.instrumentation import start_query, finish_query
+
+# Connector errnos for HTTP 429 and 503 responses (ER_HTTP_GENERAL_ERROR + status code)
+THROTTLE_ERRNOS = (290429, 290503)
+# Error text that indicates Snowflake is shedding load rather than rejecting the statement.
+# Status codes only count when phrased as one, since bare digits also occur in query IDs.
+THROTTLE_PATTERN = re.compile(
+    r"throttl|too many requests|too many concurrent|rate limit|service unavailable"
+    r"|\b(?:http|status|status code|error code)[ :]*(?:429|503)\b",
+    re.IGNORECASE,
+)
+
+def _error_numbers(error: Exception) -> list:
+    """
+    Error numbers of error: the errno of the connector error it wraps, then its own errno
+    and error_code. A SnowparkSQLException's error_code is Snowpark's, not the HTTP one.
+    """
+    numbers = []
+    for candidate, attribute in (
+        (getattr(error, "conn_error", None), "errno"),
+        (error, "errno"),
+        (error, "error_code"),
+    ):
+        try:
+            numbers.append(int(getattr(candidate, attribute, None)))
+        except (TypeError, ValueError):
+            continue
+    return numbers
+
+def is_throttling_error(error: Exception) -> bool:
+    if any(number in THROTTLE_ERRNOS for number in _error_numbers(error)):
+        return True
+    return THROTTLE_PATTERN.search(str(error)) is not None
+
+# Run many DDL/DCL statements concurrently
+def execute_statements(
+    session,
+    statements: list,
+    max_concurrency: int = None,
+    max_retries: int = None,
+    backoff_seconds: float = None,
+) -> list:
+    """
+    Submits statements as async queries (collect_nowait) with at most
+    max_concurrency in flight. Every statement runs even if others fail.
+    Throttled statements are retried with exponential backoff and jitter, and
+    the in-flight limit is halved on each throttle and grows back by one per
+    success.
+    Args:
+        session: Snowpark session
+        statements: SQL statements to execute
+        max_concurrency: Upper bound on in-flight statements, defaults to CONFIG
+        max_retries: Retries per statement after a throttling error, defaults to CONFIG
+        backoff_seconds: Base delay before the first retry, defaults to CONFIG
+    Returns:
+        One dict per statement, in input order, with STATEMENT, STATUS
+        ("SUCCESS"/"FAILED"), MESSAGE (the error, or the status Snowflake returned for the
+        statement), QUERY_ID, ATTEMPTS and ELAPSED_SECONDS
+    """
+    settings = CONFIG["BULK_EXECUTION"]
+    max_concurrency = max(1, max_concurrency or settings["MAX_CONCURRENCY"])
+    max_retries = settings["MAX_RETRIES"] if max_retries is None else max_retries
+    backoff_seconds = settings["BACKOFF_SECONDS"] if backoff_seconds is None else backoff_seconds
+    poll_interval = settings["POLL_INTERVAL_SECONDS"]
+
+    results = [
+        {"STATEMENT": statement, "STATUS": None, "MESSAGE": "", "QUERY_ID": None,
+         "ATTEMPTS": 0, "ELAPSED_SECONDS": 0.0}
+        for statement in statements
+    ]
+    ready = deque(range(len(statements)))
+    delayed = []  # heap of (retry_at, index)
+    in_flight = {}  # index -> (async job, submitted_at, trace event)
+    concurrency = max_concurrency
+
+    def finish(index, status, message=""):
+        results[index]["STATUS"] = status
+        results[index]["MESSAGE"] = message
+
+    def fail(index, error):
+        nonlocal concurrency
+        if is_throttling_error(error) and results[index]["ATTEMPTS"] <= max_retries:
+            concurrency = max(1, concurrency // 2)
+            delay = backoff_seconds * (2 ** (results[index]["ATTEMPTS"] - 1))
+            heapq.heappush(delayed, (time.monotonic() + delay * random.uniform(0.5, 1.5), index))
+        else:
+            finish(index, "FAILED", str(error))
+
+    while ready or delayed or in_flight:
+        now = time.monotonic()
+        while delayed and delayed[0][0] <= now:
+            ready.append(heapq.heappop(delayed)[1])
+
+        while ready and len(in_flight) < concurrency:
+            index = ready.popleft()
+            results[index]["ATTEMPTS"] += 1
+            submitted_at = time.monotonic()
+            event = start_query(statements[index])
+            try:
+                job = session.sql(statements[index]).collect_nowait()
+            except Exception as e:
+                results[index]["ELAPSED_SECONDS"] += time.monotonic() - submitted_at
+                finish_query(event, error=e)
+                fail(index, e)
+                continue
+            results[index]["QUERY_ID"] = job.query_id
+            in_flight[index] = (job, submitted_at, event)
+
+        completed = False
+        for index, (job, submitted_at, event) in list(in_flight.items()):
+            try:
+                if not job.is_done():
+                    continue
+                rows = job.result()
+            except Exception as e:
+                del in_flight[index]
+                results[index]["ELAPSED_SECONDS"] += time.monotonic() - submitted_at
+                finish_query(event, query_id=job.query_id, error=e)
+                fail(index, e)
+                completed = True
+                continue
+            del in_flight[index]
+            results[index]["ELAPSED_SECONDS"] += time.monotonic() - submitted_at
+            finish_query(event, rows, job.query_id)
+            # DDL and DCL return one row with a status such as "X already exists, statement succeeded."
+            finish(index, "SUCCESS", str(rows[0][0]) if rows and len(rows[0]) else "")
+            concurrency = min(max_concurrency, concurrency + 1)
+            completed = True
+
+        if not completed and (in_flight or delayed):
+            time.sleep(poll_interval)
+
+    for result in results:
+        result["ELAPSED_SECONDS"] = round(result["ELAPSED_SECONDS"], 3)
+    return results
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU mapping whose entries expire after a fixed TTL.
+
+    The cache lives for the whole Streamlit server process, so every session
+    shares it; callers are responsible for putting account and role context
+    into their keys.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _is_fresh(self, stored_at: float) -> bool:
+        return (time.monotonic() - stored_at) < self.ttl_seconds
+
+    def get(self, key, default=None):
+        """Returns the cached value for key, or default if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            stored_at, value = entry
+            if not self._is_fresh(stored_at):
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Stores value under key, evicting the least recently used entries if full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        """Returns the cached value for key, calling loader() and caching its result on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def update(self, key, func) -> bool:
+        """
+        Replaces a live entry with func(value) without resetting its age.
+        Returns False if there was no live entry to update.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not self._is_fresh(entry[0]):
+                self._entries.pop(key, None)
+                return False
+            self._entries[key] = (entry[0], func(entry[1]))
+            return True
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry else None
+
+    def discard_where(self, predicate) -> int:
+        """Removes every entry whose key satisfies predicate and returns how many were removed."""
+        with self._lock:
+            doomed = [key for key in self._entries if predicate(key)]
+            for key in doomed:
+                del self._entries[key]
+            return len(doomed)
+
+    def keys(self) -> list:
+        """Snapshot of the current keys, including entries that have expired but not yet been evicted."""
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
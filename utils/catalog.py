@@ -0,0 +1,115 @@
+import bisect
+from snowflake.snowpark.context import get_active_session
+from config.config import CONFIG
+from utils.cache import TTLCache
+from utils.helpers import get_session_context, normalize_identifier
+from utils.query import query_rows
+from utils.role_reachability import get_cached_role_reachability
+
+# SHOW command backing each catalog kind
+CATALOG_COMMANDS = {
+    "DATABASES": "SHOW DATABASES",
+    "ROLES": "SHOW ROLES",
+    "WAREHOUSES": "SHOW WAREHOUSES",
+}
+
+# Process-wide cache keyed by (account, role, kind) -> sorted tuple of object names
+_CATALOG_CACHE = TTLCache(
+    ttl_seconds=CONFIG["CACHE"]["CATALOG_TTL_SECONDS"],
+    max_entries=CONFIG["CACHE"]["CATALOG_MAX_ENTRIES"],
+)
+
+# Resolve the (account, role) context a catalog entry belongs to
+def _catalog_context(session):
+    context = get_session_context(session)
+    return (context.account, context.role)
+
+# Get cached object names for a catalog kind
+def get_catalog_names(kind: str, session=None, refresh: bool = False) -> list:
+    """
+    Returns the object names listed by the SHOW command for kind, served from
+    the shared catalog cache for the caller's account and active role.
+    Args:
+        kind: One of CATALOG_COMMANDS ("DATABASES", "ROLES", "WAREHOUSES")
+        session: Snowpark session, defaults to the active session
+        refresh: Bypass and repopulate the cached entry
+    Returns:
+        List of object names sorted by name
+    """
+    session = session or get_active_session()
+    key = _catalog_context(session) + (kind,)
+    if refresh:
+        _CATALOG_CACHE.pop(key)
+
+    def load():
+        rows = query_rows(session, CATALOG_COMMANDS[kind])
+        return tuple(sorted(row["name"] for row in rows))
+
+    return list(_CATALOG_CACHE.get_or_load(key, load))
+
+def get_database_names(session=None, refresh: bool = False) -> list:
+    return get_catalog_names("DATABASES", session, refresh)
+
+def get_role_names(session=None, refresh: bool = False) -> list:
+    return get_catalog_names("ROLES", session, refresh)
+
+def get_warehouse_names(session=None, refresh: bool = False) -> list:
+    return get_catalog_names("WAREHOUSES", session, refresh)
+
+# Patch the current context and drop the same kind for other role contexts
+def _apply_catalog_change(kind, name, session, patch):
+    session = session or get_active_session()
+    account, role = _catalog_context(session)
+    name = normalize_identifier(name)
+    # Other roles may or may not see the object, so their listings are refetched lazily
+    _CATALOG_CACHE.discard_where(lambda key: key[0] == account and key[2] == kind and key[1] != role)
+    _CATALOG_CACHE.update((account, role, kind), lambda names: patch(names, name))
+
+def _with_name(names, name):
+    if name in names:
+        return names
+    position = bisect.bisect_left(names, name)
+    return names[:position] + (name,) + names[position:]
+
+def _without_name(names, name):
+    return tuple(existing for existing in names if existing != name)
+
+# Record an object created by PRISM
+def record_object_created(kind: str, name: str, session=None):
+    """Adds name to the cached listing for kind after a successful CREATE."""
+    _apply_catalog_change(kind, name, session, _with_name)
+
+# Record an object dropped by PRISM
+def record_object_dropped(kind: str, name: str, session=None):
+    """Removes name from the cached listing for kind after a successful DROP."""
+    _apply_catalog_change(kind, name, session, _without_name)
+
+def _grant_reaches_role(session, role, grantees) -> bool:
+    """True if a grant to any of grantees changes what role sees: role is a grantee or inherits one."""
+    if grantees is None:
+        return True
+    index = get_cached_role_reachability(session)
+    for grantee in grantees:
+        grantee = normalize_identifier(grantee)
+        if grantee == role:
+            return True
+        # Without a built index there is no cheap way to tell, so assume it does
+        if index is None or index.inherits(role, grantee):
+            return True
+    return False
+
+# Record a privilege or role grant change made by PRISM
+def record_grant_change(kinds=tuple(CATALOG_COMMANDS), session=None, grantees=None):
+    """
+    Invalidates listings whose visibility may have changed after a GRANT or REVOKE.
+    The entries of other role contexts in the same account are always dropped. The
+    acting role's own entries are dropped too when a grantee is the acting role or a
+    role it inherits (or grantees is not given), since its own listing then changes.
+    """
+    session = session or get_active_session()
+    account, role = _catalog_context(session)
+    kinds = set(kinds)
+    include_own = _grant_reaches_role(session, role, grantees)
+    _CATALOG_CACHE.discard_where(
+        lambda key: key[0] == account and key[2] in kinds and (include_own or key[1] != role)
+    )
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from config.config import CONFIG
+
+# Chart resolutions: label -> Snowflake DATE_TRUNC unit
+RESOLUTIONS = {"Hour": "HOUR", "Day": "DAY", "Week": "WEEK"}
+AUTO_RESOLUTION = "Auto"
+OTHER_SERIES = "Other"
+
+def default_resolution(start_date, end_date) -> str:
+    """Coarsest resolution that still shows useful detail for the range."""
+    days = (end_date - start_date).days + 1
+    if days <= CONFIG["CHARTS"]["HOURLY_MAX_DAYS"]:
+        return "Hour"
+    if days <= CONFIG["CHARTS"]["DAILY_MAX_DAYS"]:
+        return "Day"
+    return "Week"
+
+def resolve_resolution(choice: str, start_date, end_date) -> str:
+    return default_resolution(start_date, end_date) if choice == AUTO_RESOLUTION else choice
+
+def bucket_times(times: pd.Series, resolution: str) -> pd.Series:
+    """Truncates timestamps to the start of their hour, day or (Monday-based, like DATE_TRUNC) week."""
+    if resolution == "Hour":
+        return times.dt.floor("h")
+    days = times.dt.floor("D")
+    if resolution == "Week":
+        return days - pd.to_timedelta(days.dt.dayofweek, unit="D")
+    return days
+
+def top_series(frame: pd.DataFrame, series_column: str, value_column: str, max_series: int = None) -> pd.Series:
+    """Series labels with everything outside the max_series largest totals folded into OTHER_SERIES."""
+    max_series = max_series or CONFIG["CHARTS"]["MAX_SERIES"]
+    # Work on category codes so labels are mapped once per series rather than once per row
+    series = frame[series_column]
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(str).astype("category")
+    names = series.cat.categories.astype(str)
+    totals = np.bincount(series.cat.codes.to_numpy() + 1, frame[value_column].abs().to_numpy(np.float64), len(names) + 1)[1:]
+    if np.count_nonzero(totals) <= max_series:
+        labels = names.to_numpy(dtype=object)
+    else:
+        keep = np.zeros(len(names), dtype=bool)
+        keep[np.argsort(-totals, kind="stable")[:max_series]] = True
+        labels = np.where(keep, names.to_numpy(dtype=object), OTHER_SERIES)
+    # Code -1 (missing) maps to the last slot
+    return pd.Series(np.append(labels, OTHER_SERIES)[series.cat.codes.to_numpy()], index=frame.index)
+
+def aggregate_series(frame, time_column, value_columns, series_column, resolution, max_series=None) -> pd.DataFrame:
+    """
+    Sums value_columns per series and time bucket, capping the series count at max_series
+    plus OTHER_SERIES (ranked by the first value column). Returns columns series_column,
+    time_column and value_columns, sorted by series and time.
+    """
+    value_columns = list(value_columns)
+    grouped = pd.DataFrame({
+        series_column: top_series(frame, series_column, value_columns[0], max_series),
+        time_column: bucket_times(pd.to_datetime(frame[time_column]), resolution),
+    })
+    for column in value_columns:
+        grouped[column] = frame[column].astype(np.float64)
+    return grouped.groupby([series_column, time_column], sort=True, observed=True)[value_columns].sum().reset_index()
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of threshold points that keep the visual shape
+    of the (x, y) line, always including the first and last point. x must be sorted.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    anchor = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, n)
+        average_x = x[end:next_end].mean()
+        average_y = y[end:next_end].mean()
+        areas = np.abs(
+            (x[anchor] - average_x) * (y[start:end] - y[anchor])
+            - (x[anchor] - x[start:end]) * (average_y - y[anchor])
+        )
+        anchor = start + int(np.argmax(areas))
+        selected[bucket + 1] = anchor
+    return selected
+
+# Build a bounded line chart from long-format series data
+def time_series_figure(frame, time_column, value_column, series_column, title, max_points=None) -> tuple:
+    """
+    One line per series, each downsampled with LTTB to at most max_points points.
+    WebGL traces (Scattergl) are used once the drawn points pass WEBGL_POINT_THRESHOLD.
+    Args:
+        frame: Output of aggregate_series, or any frame sorted by series and time
+        time_column, value_column, series_column: Columns to plot
+        title: Chart title
+        max_points: Points per series, defaults to CONFIG
+    Returns:
+        (figure, points drawn, points received)
+    """
+    settings = CONFIG["CHARTS"]
+    max_points = max_points or settings["MAX_POINTS_PER_SERIES"]
+    traces = []
+    for name, series in frame.groupby(series_column, sort=False, observed=True):
+        series = series.sort_values(time_column)
+        times = pd.to_datetime(series[time_column])
+        values = series[value_column].to_numpy(dtype=np.float64)
+        keep = lttb(times.to_numpy(dtype="datetime64[ns]").astype(np.int64), np.nan_to_num(values), max_points)
+        traces.append((str(name), times.iloc[keep], values[keep]))
+
+    # Largest series first so they get the first colours and legend slots; Other last
+    traces.sort(key=lambda trace: (trace[0] == OTHER_SERIES, -np.nansum(trace[2])))
+    drawn = sum(len(trace[2]) for trace in traces)
+    trace_type = go.Scattergl if drawn > settings["WEBGL_POINT_THRESHOLD"] else go.Scatter
+    fig = go.Figure([trace_type(x=times, y=values, name=name, mode="lines") for name, times, values in traces])
+    fig.update_layout(title=title, xaxis_title=time_column, yaxis_title=value_column, legend_title=series_column)
+    return fig, drawn, len(frame)
@@ -0,0 +1,197 @@
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from config.config import CONFIG
+from utils.local_store import store_lock, store_root
+from utils.query import downcast_frame, widen_numeric
+
+# ACCOUNT_USAGE sources kept locally. Storage is not one of them: it is read as one
+# server-aggregated row per database (utils/storage_analytics.py).
+# Each query receives a half-open [from, to) window as two ISO-8601 bind params.
+# late_arrival_hours is how far behind the watermark every delta fetch starts again,
+# covering rows that ACCOUNT_USAGE publishes late.
+COST_SOURCES = {
+    "warehouse_usage": {
+        "time_column": "HOUR",
+        "late_arrival_hours": 6,
+        "query": """
+            SELECT
+                WAREHOUSE_NAME,
+                DATE_TRUNC('HOUR', START_TIME) AS HOUR,
+                SUM(CREDITS_USED) AS CREDITS_USED
+            FROM SNOWFLAKE.ACCOUNT_USAGE.WAREHOUSE_METERING_HISTORY
+            WHERE START_TIME >= TO_TIMESTAMP_LTZ(?)
+            AND START_TIME < TO_TIMESTAMP_LTZ(?)
+            GROUP BY WAREHOUSE_NAME, HOUR
+        """,
+    },
+    "query_history": {
+        "time_column": "HOUR",
+        "late_arrival_hours": 6,
+        "query": """
+            SELECT
+                DATE_TRUNC('HOUR', START_TIME) AS HOUR,
+                WAREHOUSE_NAME,
+                COUNT(*) AS QUERY_COUNT,
+                SUM(EXECUTION_TIME) AS TOTAL_EXECUTION_TIME,
+                SUM(CREDITS_USED_CLOUD_SERVICES) AS CREDITS_USED
+            FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+            WHERE START_TIME >= TO_TIMESTAMP_LTZ(?)
+            AND START_TIME < TO_TIMESTAMP_LTZ(?)
+            GROUP BY HOUR, WAREHOUSE_NAME
+        """,
+    },
+}
+
+def _day_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+
+def _unified_schema(paths):
+    """
+    One schema for a set of partitions, widening integers to int64 and floats to float64,
+    so partitions written with different widths read back together.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    types = {}
+    for path in paths:
+        for field in pq.read_schema(path):
+            seen = types.setdefault(field.name, [])
+            seen.append(field.type)
+    fields = []
+    for name, seen in types.items():
+        if any(pa.types.is_floating(kind) for kind in seen) and all(
+            pa.types.is_floating(kind) or pa.types.is_integer(kind) or pa.types.is_null(kind) for kind in seen
+        ):
+            kind = pa.float64()
+        elif any(pa.types.is_integer(kind) for kind in seen) and all(
+            pa.types.is_integer(kind) or pa.types.is_null(kind) for kind in seen
+        ):
+            kind = pa.int64()
+        else:
+            kind = next((kind for kind in seen if not pa.types.is_null(kind)), seen[0])
+        fields.append(pa.field(name, kind))
+    return pa.schema(fields)
+
+
+class CostHistoryStore:
+    """
+    Local Parquet copy of the ACCOUNT_USAGE cost sources for one account and role, one file
+    per UTC day. Each role gets its own copy, so data fetched under a role that can read
+    ACCOUNT_USAGE is never shown to a session running under one that cannot.
+
+    Layout: <root>/<account>/<role>/<source>/day=YYYY-MM-DD.parquet plus <source>/state.json, which
+    records the earliest day held (covered_from), the newest timestamp fetched (watermark) and
+    when the source was last checked for new rows.
+    """
+
+    def __init__(self, root: str, account: str, role: str):
+        self.root = store_root(root, account, role)
+
+    def _source_dir(self, source):
+        return os.path.join(self.root, source)
+
+    def _partition_path(self, source, day):
+        return os.path.join(self._source_dir(source), f"day={day.isoformat()}.parquet")
+
+    def _partition_days(self, source):
+        directory = self._source_dir(source)
+        if not os.path.isdir(directory):
+            return []
+        days = []
+        for name in os.listdir(directory):
+            match = re.fullmatch(r"day=(\d{4}-\d{2}-\d{2})\.parquet", name)
+            if match:
+                days.append(datetime.strptime(match.group(1), "%Y-%m-%d").date())
+        return sorted(days)
+
+    def load_state(self, source) -> dict:
+        try:
+            with open(os.path.join(self._source_dir(source), "state.json")) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {key: datetime.fromisoformat(value) for key, value in state.items()}
+
+    def _save_state(self, source, state):
+        os.makedirs(self._source_dir(source), exist_ok=True)
+        path = os.path.join(self._source_dir(source), "state.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump({key: value.isoformat() for key, value in state.items()}, f)
+        os.replace(path + ".tmp", path)
+
+    def plan_fetch(self, source, start_date, now=None) -> list:
+        """
+        Returns the day-aligned [from, to) windows that must be fetched so the store
+        covers start_date onwards: a backfill window if start_date is older than
+        anything held, and a delta window from the watermark minus the source's
+        late-arrival allowance once the refresh interval has passed.
+        """
+        now = now or datetime.now(timezone.utc)
+        start = datetime(start_date.year, start_date.month, start_date.day, tzinfo=timezone.utc)
+        end = _day_start(now) + timedelta(days=1)
+        state = self.load_state(source)
+        if not state:
+            return [(start, end)]
+
+        windows = []
+        if start < state["covered_from"]:
+            windows.append((start, state["covered_from"]))
+        refresh_interval = timedelta(minutes=CONFIG["COST_STORE"]["REFRESH_INTERVAL_MINUTES"])
+        if now - state["last_checked"] >= refresh_interval:
+            late_arrival = timedelta(hours=COST_SOURCES[source]["late_arrival_hours"])
+            windows.append((_day_start(state["watermark"] - late_arrival), end))
+        return windows
+
+    def fetch_query(self, source, window) -> tuple:
+        """SQL and bind params that fetch one window of a source."""
+        return COST_SOURCES[source]["query"], [window[0].isoformat(), window[1].isoformat()]
+
+    def apply_fetch(self, source, window, frame: pd.DataFrame, now=None):
+        """Replaces every day partition inside window with the fetched rows and advances the state."""
+        now = now or datetime.now(timezone.utc)
+        time_column = COST_SOURCES[source]["time_column"]
+        window_from, window_to = window
+        if not frame.empty:
+            frame = widen_numeric(frame.copy())
+            frame[time_column] = pd.to_datetime(frame[time_column], utc=True)
+
+        with store_lock(self._source_dir(source)):
+            os.makedirs(self._source_dir(source), exist_ok=True)
+            for day in self._partition_days(source):
+                if window_from.date() <= day < window_to.date():
+                    os.remove(self._partition_path(source, day))
+            if not frame.empty:
+                for day, day_frame in frame.groupby(frame[time_column].dt.date):
+                    path = self._partition_path(source, day)
+                    day_frame.reset_index(drop=True).to_parquet(path + ".tmp", index=False)
+                    os.replace(path + ".tmp", path)
+
+            state = self.load_state(source)
+            newest = frame[time_column].max().to_pydatetime() if not frame.empty else window_from
+            state["covered_from"] = min(state.get("covered_from", window_from), window_from)
+            state["watermark"] = max(state.get("watermark", newest), newest)
+            if window_to > _day_start(now):
+                state["last_checked"] = now
+            else:
+                state.setdefault("last_checked", now)
+            self._save_state(source, state)
+
+    def read(self, source, start_date, end_date) -> pd.DataFrame:
+        """
+        Returns stored rows whose timestamp falls on start_date through end_date (UTC days),
+        downcast for charting; the files themselves keep full precision.
+        """
+        days = [day for day in self._partition_days(source) if start_date <= day <= end_date]
+        if not days:
+            return pd.DataFrame()
+        import pyarrow.dataset as ds
+        paths = [self._partition_path(source, day) for day in days]
+        dataset = ds.dataset(paths, format="parquet", schema=_unified_schema(paths))
+        return downcast_frame(dataset.to_table().to_pandas())
+
+# Get the cost store for the current account and role
+def get_cost_store(account: str, role: str) -> CostHistoryStore:
+    return CostHistoryStore(CONFIG["COST_STORE"]["PATH"], account, role)
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+from config.config import CONFIG
+
+HOURS_PER_WEEK = 168
+# Scales a median absolute deviation to a standard deviation for normally distributed noise
+MAD_TO_SIGMA = 1.4826
+
+def credit_grid(usage: pd.DataFrame) -> tuple:
+    """
+    Hourly credits of every warehouse as a dense (warehouse x hour) matrix starting on the
+    Monday 00:00 UTC before the first row and padded to whole weeks. Hours without a
+    metering row are 0 credits (the warehouse was suspended).
+    Returns:
+        (warehouse names, grid start, grid, number of real hours)
+    """
+    hours = pd.to_datetime(usage["HOUR"], utc=True)
+    first = hours.min().floor("D")
+    start = first - pd.Timedelta(days=first.dayofweek)
+    offsets = ((hours - start) // pd.Timedelta(hours=1)).to_numpy(dtype=np.int64)
+    num_hours = int(offsets.max()) + 1
+    length = -(-num_hours // HOURS_PER_WEEK) * HOURS_PER_WEEK
+
+    names = usage["WAREHOUSE_NAME"]
+    if isinstance(names.dtype, pd.CategoricalDtype):
+        codes, warehouses = names.cat.codes.to_numpy(dtype=np.int64), names.cat.categories.astype(str)
+    else:
+        codes, warehouses = pd.factorize(names, sort=True)
+    warehouses = np.asarray(warehouses, dtype=object)
+    flat = np.bincount(
+        codes * length + offsets,
+        weights=usage["CREDITS_USED"].to_numpy(dtype=np.float64),
+        minlength=len(warehouses) * length,
+    )
+    return warehouses, start, flat.reshape(len(warehouses), length), num_hours
+
+def trailing_median(values: np.ndarray, window: int, first: int = 0, min_count: int = 1) -> np.ndarray:
+    """
+    Row r: the column-wise median of rows max(first, r - window) to r - 1, NaN where fewer
+    than min_count rows are available. Layer j holds every row's j-th window row, and an
+    odd-even transposition network of np.minimum/np.maximum over whole layers sorts all
+    windows at once; np.sort or np.median over a sliding window view handle millions of
+    windows of a few values one at a time and are several times slower. Missing rows at the
+    start are +inf, so they sort last, and float32 halves the memory traffic.
+    """
+    num_rows = values.shape[0]
+    result = np.full(values.shape, np.nan)
+    history = values[first:-1].astype(np.float32)
+    if not len(history):
+        return result
+    padded = np.concatenate([np.full((window - 1,) + values.shape[1:], np.inf, dtype=np.float32), history])
+    layers = [padded[j:j + len(history)].copy() for j in range(window)]
+    spare = np.empty_like(layers[0])
+    for step in range(window):
+        for j in range(step % 2, window - 1, 2):
+            np.minimum(layers[j], layers[j + 1], out=spare)
+            np.maximum(layers[j], layers[j + 1], out=layers[j + 1])
+            layers[j], spare = spare, layers[j]
+
+    # Row first + 1 + i has min(i + 1, window) rows, so each count covers one run of rows
+    for count in range(max(min_count, 1), window + 1):
+        rows = slice(count - 1, len(history) if count == window else count)
+        result[first + 1:][rows] = layers[(count - 1) // 2][rows]
+        result[first + 1:][rows] += layers[count // 2][rows]
+        result[first + 1:][rows] /= 2
+    return result
+
+def seasonal_baseline(values: np.ndarray, num_series: int, window: int, min_weeks: int) -> tuple:
+    """
+    Robust per-week baselines of a (week x series-slot) matrix whose columns are
+    num_series blocks of HOURS_PER_WEEK slots:
+        expected (week x slot): each slot's median over the up to window weeks before,
+            once min_weeks weeks are available
+        spread (week x series): the median over the up to window weeks before of each
+            week's median absolute residual (value - expected) across the series' slots.
+            A MAD of a handful of weeks per slot is too noisy to divide by, and residuals
+            against earlier weeks' medians are exactly what is scored, so the spread is
+            not understated.
+    NaN where there is not enough history; spread starts one week after expected.
+    """
+    expected = trailing_median(values, window, min_count=min_weeks)
+    residuals = np.abs(values - expected).reshape(values.shape[0], num_series, HOURS_PER_WEEK)
+    weekly = np.full(residuals.shape[:2], np.nan)
+    weekly[min_weeks:] = np.median(residuals[min_weeks:], axis=-1)
+    return expected, trailing_median(weekly, window, first=min_weeks)
+
+# Score hourly warehouse credits against a seasonal baseline
+def detect_credit_anomalies(usage: pd.DataFrame, since=None) -> pd.DataFrame:
+    """
+    Flags hours whose credits are far above what the same warehouse used in the same
+    hour of the week before. For each (warehouse, hour of week) slot the baseline is the
+    median of the previous BASELINE_WEEKS weeks and the spread the warehouse's typical
+    absolute residual against such medians (see seasonal_baseline). Both are taken on the
+    cube root of the credits, which makes gamma-like usage noise close to normal
+    (Wilson-Hilferty) where raw credits have a long right tail, so Z_THRESHOLD means about
+    the same for busy and quiet warehouses. Medians keep one spike from raising the baseline after it.
+    Args:
+        usage: WAREHOUSE_NAME, HOUR, CREDITS_USED rows, including the baseline history
+        since: Only report anomalies at or after this timestamp
+    Returns:
+        WAREHOUSE_NAME, HOUR, CREDITS_USED, EXPECTED_CREDITS, EXCESS_CREDITS and SCORE
+        per anomalous hour, highest score first
+    """
+    columns = ["WAREHOUSE_NAME", "HOUR", "CREDITS_USED", "EXPECTED_CREDITS", "EXCESS_CREDITS", "SCORE"]
+    if usage.empty:
+        return pd.DataFrame(columns=columns)
+    settings = CONFIG["ANOMALIES"]
+    warehouses, start, grid, num_hours = credit_grid(usage)
+    num_weeks = grid.shape[1] // HOURS_PER_WEEK
+
+    # Rows are weeks, columns are (warehouse, hour of week) slots
+    values = grid.reshape(len(warehouses), num_weeks, HOURS_PER_WEEK).transpose(1, 0, 2).reshape(num_weeks, -1)
+    scaled = np.cbrt(np.maximum(values, 0))
+    scaled_expected, spread = seasonal_baseline(
+        scaled, len(warehouses), settings["BASELINE_WEEKS"], settings["MIN_BASELINE_WEEKS"]
+    )
+    sigma = MAD_TO_SIGMA * spread + settings["MIN_SPREAD"]
+    with np.errstate(invalid="ignore"):
+        score = (scaled - scaled_expected).reshape(num_weeks, len(warehouses), HOURS_PER_WEEK) / sigma[:, :, np.newaxis]
+        week_index, slot = np.nonzero(score.reshape(num_weeks, -1) > settings["Z_THRESHOLD"])
+
+    # Credits only for the few hours above the threshold. The cube root is monotonic, so
+    # this is the median of the credits (for an even number of weeks, a value between the
+    # two middle ones)
+    credits = values[week_index, slot]
+    expected = scaled_expected[week_index, slot] ** 3
+    large = credits - expected >= settings["MIN_EXCESS_CREDITS"]
+    week_index, slot, credits, expected = week_index[large], slot[large], credits[large], expected[large]
+    warehouse_index, hour_of_week = np.divmod(slot, HOURS_PER_WEEK)
+    hour_offset = week_index * HOURS_PER_WEEK + hour_of_week
+    anomalies = pd.DataFrame({
+        "WAREHOUSE_NAME": warehouses[warehouse_index],
+        "HOUR": start + pd.to_timedelta(hour_offset, unit="h"),
+        "CREDITS_USED": credits,
+        "EXPECTED_CREDITS": expected,
+        "EXCESS_CREDITS": credits - expected,
+        "SCORE": score[week_index, warehouse_index, hour_of_week],
+    }, columns=columns)
+    anomalies = anomalies[hour_offset < num_hours]
+    if since is not None:
+        anomalies = anomalies[anomalies["HOUR"] >= pd.Timestamp(since, tz="UTC")]
+    return anomalies.sort_values("SCORE", ascending=False, ignore_index=True)
@@ -0,0 +1,206 @@
+from datetime import date, datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+from config.config import CONFIG
+from utils.cache import TTLCache
+from utils.helpers import get_session_context
+
+# Budget status, most severe first
+BUDGET_STATUSES = ["Exceeded", "Will exceed", "At risk", "On track", "No budget"]
+
+def month_bounds(day: date) -> tuple:
+    """First and last day of the month containing day."""
+    first = day.replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return first, next_month - timedelta(days=1)
+
+def daily_credits(usage: pd.DataFrame, first_day: date, last_day: date) -> tuple:
+    """
+    Credits per warehouse and UTC day as a dense (warehouse x day) matrix covering
+    first_day through last_day; days without metering rows are 0 credits.
+    Returns:
+        (warehouse names, matrix)
+    """
+    names = usage["WAREHOUSE_NAME"]
+    if isinstance(names.dtype, pd.CategoricalDtype):
+        codes, warehouses = names.cat.codes.to_numpy(dtype=np.int64), names.cat.categories.astype(str)
+    else:
+        codes, warehouses = pd.factorize(names, sort=True)
+    warehouses = np.asarray(warehouses, dtype=object)
+    num_days = (last_day - first_day).days + 1
+    days = (pd.to_datetime(usage["HOUR"], utc=True).dt.floor("D") - pd.Timestamp(first_day, tz="UTC")).dt.days.to_numpy()
+    inside = (days >= 0) & (days < num_days)
+    flat = np.bincount(
+        codes[inside] * num_days + days[inside],
+        weights=usage["CREDITS_USED"].to_numpy(dtype=np.float64)[inside],
+        minlength=len(warehouses) * num_days,
+    )
+    return warehouses, flat.reshape(len(warehouses), num_days)
+
+def design_matrix(days: np.ndarray, weekdays: np.ndarray) -> np.ndarray:
+    """Intercept, linear trend (in weeks) and one indicator per weekday except Monday."""
+    return np.column_stack([
+        np.ones(len(days)),
+        days / 7.0,
+        weekdays[:, np.newaxis] == np.arange(1, 7),
+    ]).astype(np.float64)
+
+
+class CreditForecast:
+    """
+    Month-end credit forecast for every warehouse. Each warehouse's daily credits are
+    modelled as a linear trend plus a day-of-week effect. The design matrix is the same
+    for every warehouse, so one least-squares solve fits them all, with the warehouses as
+    columns of the right-hand side, and the prediction intervals come from the shared
+    (X'X)^-1 scaled by each warehouse's residual variance.
+    """
+
+    def __init__(self, usage: pd.DataFrame, as_of: datetime, fit_days: int = None):
+        """
+        Args:
+            usage: Hourly WAREHOUSE_NAME, HOUR, CREDITS_USED rows covering the fit window and the month so far
+            as_of: First hour without metering data (the store watermark plus one hour); the
+                month being forecast is the one containing it
+            fit_days: Complete days before as_of the model is fitted on, defaults to CONFIG
+        """
+        settings = CONFIG["FORECAST"]
+        fit_days = fit_days or settings["FIT_DAYS"]
+        self.as_of = as_of
+        self.month_start, self.month_end = month_bounds(as_of.date())
+        today = as_of.date()
+        first_day = min(today - timedelta(days=fit_days), self.month_start)
+        self.warehouses, daily = daily_credits(usage, first_day, self.month_end)
+
+        # Fit on complete days only, starting at the first day any warehouse has data
+        today_index = (today - first_day).days
+        with_data = np.flatnonzero(daily[:, :today_index].any(axis=0))
+        fit_from = max(today_index - fit_days, int(with_data[0]) if len(with_data) else today_index)
+        self.fit_days = today_index - fit_from
+        if self.fit_days < settings["MIN_FIT_DAYS"]:
+            raise ValueError(
+                f"Need at least {settings['MIN_FIT_DAYS']} complete days of metering history to forecast, "
+                f"found {self.fit_days}"
+            )
+        self.fitted_from = first_day + timedelta(days=fit_from)
+        all_days = np.arange(daily.shape[1])
+        weekdays = (first_day.weekday() + all_days) % 7
+        design = design_matrix(all_days, weekdays)
+
+        fit = design[fit_from:today_index]
+        targets = daily[:, fit_from:today_index].T
+        self.coefficients = np.linalg.lstsq(fit, targets, rcond=None)[0]
+        residuals = targets - fit @ self.coefficients
+        self.variances = (residuals ** 2).sum(axis=0) / max(self.fit_days - fit.shape[1], 1)
+        self._covariance = np.linalg.pinv(fit.T @ fit)
+
+        # The month: actual credits up to as_of, then a weighted forecast per day, the first
+        # weighted by the part of as_of's day still to come
+        month_index = (self.month_start - first_day).days
+        self.dates = pd.date_range(self.month_start, self.month_end, freq="D")
+        self.actual = daily[:, month_index:today_index + 1].copy()
+        self._weights = np.ones(len(self.dates) - self.actual.shape[1] + 1)
+        self._weights[0] = 1.0 - as_of.hour / 24.0
+        self._future = design[today_index:]
+
+    def _cumulative(self, rows: np.ndarray) -> tuple:
+        """Cumulative month credits and their standard deviation for the summed rows, per day."""
+        mean = np.clip(self._future @ self.coefficients[:, rows], 0, None).sum(axis=1) * self._weights
+        # Variance of a sum of daily forecasts: noise on every day plus the shared parameter uncertainty
+        loadings = np.cumsum(self._weights[:, np.newaxis] * self._future, axis=0)
+        spread = np.cumsum(self._weights ** 2) + np.einsum("ij,jk,ik->i", loadings, self._covariance, loadings)
+        actual = self.actual[rows].sum(axis=0).cumsum()
+        # as_of's day is part actual, part forecast
+        forecast = actual[-1] + mean.cumsum()
+        return actual, forecast, np.sqrt(self.variances[rows].sum() * spread)
+
+    def projection(self) -> pd.DataFrame:
+        """
+        Per warehouse: MONTH_TO_DATE, FORECAST_REMAINING, PROJECTED_MONTH_END and its
+        LOW/HIGH interval (never below what has already been used).
+        """
+        month_to_date = self.actual.sum(axis=1)
+        remaining = (np.clip(self._future @ self.coefficients, 0, None) * self._weights[:, np.newaxis]).sum(axis=0)
+        loading = self._weights @ self._future
+        spread = (self._weights ** 2).sum() + loading @ self._covariance @ loading
+        margin = CONFIG["FORECAST"]["INTERVAL_Z"] * np.sqrt(self.variances * spread)
+        projected = month_to_date + remaining
+        frame = pd.DataFrame({
+            "WAREHOUSE_NAME": self.warehouses,
+            "MONTH_TO_DATE": month_to_date,
+            "FORECAST_REMAINING": remaining,
+            "PROJECTED_MONTH_END": projected,
+            "LOW": np.maximum(projected - margin, month_to_date),
+            "HIGH": projected + margin,
+        })
+        return frame.sort_values("PROJECTED_MONTH_END", ascending=False, ignore_index=True)
+
+    def burn_down(self, warehouses=None) -> pd.DataFrame:
+        """
+        Cumulative credits per day of the month for the given warehouses combined (all if
+        None): ACTUAL up to as_of, then FORECAST with LOW/HIGH. as_of's day has both.
+        """
+        rows = np.arange(len(self.warehouses)) if warehouses is None else np.flatnonzero(np.isin(self.warehouses, list(warehouses)))
+        actual, forecast, deviation = self._cumulative(rows)
+        margin = CONFIG["FORECAST"]["INTERVAL_Z"] * deviation
+        frame = pd.DataFrame({"DATE": self.dates, "ACTUAL": np.nan, "FORECAST": np.nan, "LOW": np.nan, "HIGH": np.nan})
+        frame.loc[:len(actual) - 1, "ACTUAL"] = actual
+        future = slice(len(actual) - 1, None)
+        frame.loc[frame.index[future], "FORECAST"] = forecast
+        frame.loc[frame.index[future], "LOW"] = np.maximum(forecast - margin, actual[-1])
+        frame.loc[frame.index[future], "HIGH"] = forecast + margin
+        return frame
+
+def budget_status(projection: pd.DataFrame, budgets: dict) -> pd.DataFrame:
+    """
+    Adds MONTHLY_BUDGET, PROJECTED_PCT (of budget) and STATUS to a projection. Warehouses
+    without a budget fall back to DEFAULT_MONTHLY_BUDGET; a budget of 0 means none.
+    """
+    default = CONFIG["FORECAST"]["DEFAULT_MONTHLY_BUDGET"]
+    budget = projection["WAREHOUSE_NAME"].map(lambda name: budgets.get(name, default)).astype(np.float64).to_numpy()
+    has_budget = budget > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent = np.where(has_budget, projection["PROJECTED_MONTH_END"] / budget * 100, np.nan)
+    status = np.select(
+        [
+            ~has_budget,
+            projection["MONTH_TO_DATE"].to_numpy() > budget,
+            projection["LOW"].to_numpy() > budget,
+            projection["HIGH"].to_numpy() > budget,
+        ],
+        ["No budget", "Exceeded", "Will exceed", "At risk"],
+        "On track",
+    )
+    return projection.assign(MONTHLY_BUDGET=np.where(has_budget, budget, np.nan), PROJECTED_PCT=percent, STATUS=status)
+
+# Process-wide cache keyed by (account, role); entries are (watermark, month, forecast)
+_FORECAST_CACHE = TTLCache(
+    ttl_seconds=CONFIG["CACHE"]["FORECAST_TTL_SECONDS"],
+    max_entries=CONFIG["CACHE"]["ROLE_GRAPH_MAX_ENTRIES"],
+)
+
+# Get the credit forecast for the current account and role
+def get_credit_forecast(session, store) -> tuple:
+    """
+    Fits the forecast from the local cost store, reusing the cached fit until the
+    warehouse usage watermark advances (new hourly data arrived) or the month changes.
+    Returns:
+        (forecast, whether it was refitted)
+    """
+    context = get_session_context(session)
+    key = (context.account, context.role)
+    watermark = store.load_state("warehouse_usage").get("watermark")
+    if watermark is None:
+        raise ValueError("No warehouse metering history has been fetched yet")
+    as_of = min(watermark + timedelta(hours=1), datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0))
+    month = month_bounds(as_of.date())[0]
+
+    cached = _FORECAST_CACHE.get(key)
+    if cached is not None and cached[0] == watermark and cached[1] == month:
+        return cached[2], False
+    first_day = min(as_of.date() - timedelta(days=CONFIG["FORECAST"]["FIT_DAYS"]), month)
+    usage = store.read("warehouse_usage", first_day, as_of.date())
+    if usage.empty:
+        raise ValueError("No warehouse metering history in the local store")
+    forecast = CreditForecast(usage, as_of)
+    _FORECAST_CACHE.set(key, (watermark, month, forecast))
+    return forecast, True
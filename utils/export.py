@@ -0,0 +1,107 @@
+import gzip
+import glob
+import os
+import tempfile
+import time
+from config.config import CONFIG
+from utils.query import iter_pandas_batches, widen_numeric
+
+EXPORT_PREFIX = "prism_export_"
+
+# Download formats: label -> (file suffix, MIME type)
+EXPORT_FORMATS = {
+    "CSV": (".csv", "text/csv"),
+    "CSV (gzip)": (".csv.gz", "application/gzip"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+def _arrow_table(batch, schema=None):
+    import pyarrow as pa
+    if schema is not None:
+        # Columns that were entirely NULL in the first batch were written as strings
+        for field in schema:
+            if pa.types.is_string(field.type) and batch[field.name].notna().any():
+                batch[field.name] = batch[field.name].astype("string")
+        return pa.Table.from_pandas(batch, schema=schema, preserve_index=False)
+    table = pa.Table.from_pandas(batch, preserve_index=False)
+    # A column that is entirely NULL in the first batch would otherwise fix the file type to null
+    fields = [field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in table.schema]
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+# Stream a query result into a local file
+def export_query(session, sql: str, params=None, export_format: str = "CSV", on_progress=None) -> tuple:
+    """
+    Writes the result of sql to a temporary file one pandas batch at a time, so memory
+    stays bounded by the batch size however many rows the query returns.
+    Args:
+        session: Snowpark session
+        sql: Query to export
+        params: Optional bind params
+        export_format: One of EXPORT_FORMATS
+        on_progress: Optional callback(rows written so far) called after each batch
+    Returns:
+        (path of the written file, number of rows written); the caller owns the file.
+        An empty result writes no file and returns (None, 0).
+    """
+    discard_stale_exports()
+    suffix = EXPORT_FORMATS[export_format][0]
+    handle, path = tempfile.mkstemp(prefix=EXPORT_PREFIX, suffix=suffix)
+    os.close(handle)
+
+    rows = 0
+    writer = None
+    try:
+        if export_format == "Parquet":
+            import pyarrow.parquet as pq
+            for batch in iter_pandas_batches(session, sql, params, downcast=False):
+                table = _arrow_table(widen_numeric(batch), writer.schema if writer else None)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                rows += len(batch)
+                if on_progress:
+                    on_progress(rows)
+        else:
+            opener = gzip.open if export_format == "CSV (gzip)" else open
+            with opener(path, "wt", newline="") as f:
+                for batch in iter_pandas_batches(session, sql, params, downcast=False):
+                    widen_numeric(batch).to_csv(f, header=rows == 0, index=False)
+                    rows += len(batch)
+                    if on_progress:
+                        on_progress(rows)
+    except Exception:
+        if writer is not None:
+            writer.close()
+            writer = None
+        os.remove(path)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+    # An empty Parquet file is not valid Parquet, and an empty CSV has no header to go on
+    if rows == 0:
+        os.remove(path)
+        return None, 0
+    return path, rows
+
+# Remove a previously exported file
+def discard_export(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+# Remove exports left behind by sessions that ended without discarding them
+def discard_stale_exports(max_age_hours: float = None) -> int:
+    """Deletes PRISM export files older than MAX_FILE_AGE_HOURS; returns how many were removed."""
+    max_age_hours = max_age_hours or CONFIG["EXPORT"]["MAX_FILE_AGE_HOURS"]
+    cutoff = time.time() - max_age_hours * 3600
+    removed = 0
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), f"{EXPORT_PREFIX}*")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
@@ -0,0 +1,203 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pandas as pd
+from config.config import CONFIG
+from utils.local_store import store_lock, store_root
+from utils.privilege_matrix import grant_object_name
+from utils.query import query_pandas
+
+# Every active grant to an account role: role hierarchy (GRANTED_ON = 'ROLE'), ownership and privileges
+SNAPSHOT_QUERY = """
+    SELECT
+        GRANTEE_NAME,
+        GRANTED_ON,
+        NAME,
+        TABLE_CATALOG,
+        TABLE_SCHEMA,
+        PRIVILEGE,
+        GRANT_OPTION,
+        GRANTED_BY
+    FROM SNOWFLAKE.ACCOUNT_USAGE.GRANTS_TO_ROLES
+    WHERE GRANTED_TO = 'ROLE'
+    AND DELETED_ON IS NULL
+"""
+
+# Stored columns; a grant is identified by all of them, so a changed GRANT_OPTION shows as removed plus added
+GRANT_COLUMNS = ["GRANTEE_NAME", "GRANTED_ON", "OBJECT_NAME", "PRIVILEGE", "GRANT_OPTION", "GRANTED_BY"]
+
+def normalize_grants(frame: pd.DataFrame) -> pd.DataFrame:
+    """GRANTS_TO_ROLES rows as GRANT_COLUMNS strings, deduplicated and sorted by grantee."""
+    object_names = [
+        grant_object_name(*values)
+        for values in zip(*(frame[column].tolist() for column in ("GRANTED_ON", "NAME", "TABLE_CATALOG", "TABLE_SCHEMA")))
+    ]
+    grants = pd.DataFrame({
+        "GRANTEE_NAME": frame["GRANTEE_NAME"].astype(str).to_numpy(),
+        "GRANTED_ON": frame["GRANTED_ON"].astype(str).to_numpy(),
+        "OBJECT_NAME": object_names,
+        "PRIVILEGE": frame["PRIVILEGE"].astype(str).to_numpy(),
+        "GRANT_OPTION": frame["GRANT_OPTION"].astype(str).str.upper().to_numpy(),
+        "GRANTED_BY": frame["GRANTED_BY"].fillna("").astype(str).to_numpy(),
+    }, columns=GRANT_COLUMNS)
+    return grants.drop_duplicates().sort_values(GRANT_COLUMNS, ignore_index=True)
+
+def role_hashes(grants: pd.DataFrame) -> pd.DataFrame:
+    """
+    One row per grantee role with GRANTS (count) and HASH, the wrapping uint64 sum of its
+    row hashes, so the hash does not depend on row order. Expects normalize_grants output.
+    """
+    if grants.empty:
+        return pd.DataFrame({"ROLE": pd.Series(dtype=str), "GRANTS": pd.Series(dtype=np.int64), "HASH": pd.Series(dtype=np.uint64)})
+    row_hashes = pd.util.hash_pandas_object(grants[GRANT_COLUMNS], index=False).to_numpy(dtype=np.uint64)
+    roles = grants["GRANTEE_NAME"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, roles[1:] != roles[:-1]])
+    return pd.DataFrame({
+        "ROLE": roles[starts],
+        "GRANTS": np.diff(np.r_[starts, len(roles)]).astype(np.int64),
+        "HASH": np.add.reduceat(row_hashes, starts),
+    })
+
+
+def _parquet_schema(kind: str):
+    """
+    Explicit schema of a snapshot file, so an empty snapshot is not written with null-typed
+    columns that cannot be compared against a later, non-empty one.
+    """
+    import pyarrow as pa
+    if kind == "grants":
+        return pa.schema([(column, pa.string()) for column in GRANT_COLUMNS])
+    return pa.schema([("ROLE", pa.string()), ("GRANTS", pa.int64()), ("HASH", pa.uint64())])
+
+
+class GrantSnapshotStore:
+    """
+    Local Parquet snapshots of every grant to an account role, for one account and role.
+
+    Layout: <root>/<account>/<role>/<snapshot id>.grants.parquet (grants sorted by grantee,
+    in small row groups so reads filtered by grantee skip most of the file),
+    <snapshot id>.roles.parquet (one content hash per grantee role) and state.json, which
+    lists the snapshots with when they were taken and their grant and role counts.
+    """
+
+    def __init__(self, root: str, account: str, role: str):
+        self.root = store_root(root, account, role)
+
+    def _path(self, snapshot_id, kind):
+        return os.path.join(self.root, f"{snapshot_id}.{kind}.parquet")
+
+    def snapshots(self) -> list:
+        """Snapshot entries (ID, TAKEN_AT, GRANTS, ROLES), oldest first."""
+        try:
+            with open(os.path.join(self.root, "state.json")) as f:
+                return json.load(f)["snapshots"]
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def _save_snapshots(self, snapshots):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, "state.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump({"snapshots": snapshots}, f)
+        os.replace(path + ".tmp", path)
+
+    def latest_taken_at(self):
+        snapshots = self.snapshots()
+        return datetime.fromisoformat(snapshots[-1]["TAKEN_AT"]) if snapshots else None
+
+    def write(self, grants: pd.DataFrame, taken_at: datetime = None) -> dict:
+        """Stores normalized grants as a new snapshot, pruning the oldest past MAX_SNAPSHOTS."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        taken_at = taken_at or datetime.now(timezone.utc)
+        snapshot_id = taken_at.strftime("%Y%m%dT%H%M%S%fZ")
+        hashes = role_hashes(grants)
+        settings = CONFIG["GRANT_SNAPSHOTS"]
+        with store_lock(self.root):
+            os.makedirs(self.root, exist_ok=True)
+            for kind, frame, options in (
+                ("grants", grants, {"row_group_size": settings["ROW_GROUP_SIZE"]}),
+                ("roles", hashes, {}),
+            ):
+                path = self._path(snapshot_id, kind)
+                table = pa.Table.from_pandas(frame, schema=_parquet_schema(kind), preserve_index=False)
+                pq.write_table(table, path + ".tmp", **options)
+                os.replace(path + ".tmp", path)
+
+            entry = {"ID": snapshot_id, "TAKEN_AT": taken_at.isoformat(), "GRANTS": len(grants), "ROLES": len(hashes)}
+            snapshots = self.snapshots() + [entry]
+            expired, snapshots = snapshots[:-settings["MAX_SNAPSHOTS"]], snapshots[-settings["MAX_SNAPSHOTS"]:]
+            self._save_snapshots(snapshots)
+            for old in expired:
+                for kind in ("grants", "roles"):
+                    if os.path.exists(self._path(old["ID"], kind)):
+                        os.remove(self._path(old["ID"], kind))
+        return entry
+
+    def read_hashes(self, snapshot_id) -> pd.DataFrame:
+        return pd.read_parquet(self._path(snapshot_id, "roles"))
+
+    def read_grants(self, snapshot_id, roles=None) -> pd.DataFrame:
+        """Grants of a snapshot, only those of roles if given (pushed down to the row groups)."""
+        if roles is not None and not len(roles):
+            return pd.DataFrame(columns=GRANT_COLUMNS)
+        filters = None if roles is None else [("GRANTEE_NAME", "in", list(roles))]
+        return pd.read_parquet(self._path(snapshot_id, "grants"), filters=filters)
+
+    def drift(self, old_id, new_id) -> tuple:
+        """
+        Grants added and removed between two snapshots. Role hashes are compared first and
+        only the roles whose hash changed, appeared or disappeared have their grants read
+        and diffed.
+        Returns:
+            (changes, roles): changes has CHANGE ("ADDED"/"REMOVED") plus GRANT_COLUMNS;
+            roles has ROLE, OLD_GRANTS, NEW_GRANTS and STATUS for every changed role
+        """
+        old_hashes = self.read_hashes(old_id).set_index("ROLE")
+        new_hashes = self.read_hashes(new_id).set_index("ROLE")
+        roles = old_hashes.join(new_hashes, how="outer", lsuffix="_OLD", rsuffix="_NEW")
+        changed = roles[
+            roles["HASH_OLD"].isna() | roles["HASH_NEW"].isna()
+            | (roles["HASH_OLD"] != roles["HASH_NEW"]) | (roles["GRANTS_OLD"] != roles["GRANTS_NEW"])
+        ]
+        changed_roles = changed.index.tolist()
+
+        merged = self.read_grants(old_id, changed_roles).merge(
+            self.read_grants(new_id, changed_roles), how="outer", on=GRANT_COLUMNS, indicator=True
+        )
+        merged = merged[merged["_merge"] != "both"]
+        changes = pd.DataFrame({"CHANGE": np.where(merged["_merge"] == "right_only", "ADDED", "REMOVED")})
+        changes[GRANT_COLUMNS] = merged[GRANT_COLUMNS].to_numpy()
+        changes = changes.sort_values(["GRANTEE_NAME", "CHANGE", "GRANTED_ON", "OBJECT_NAME", "PRIVILEGE"], ignore_index=True)
+
+        summary = pd.DataFrame({
+            "ROLE": changed_roles,
+            "OLD_GRANTS": changed["GRANTS_OLD"].fillna(0).astype(np.int64).to_numpy(),
+            "NEW_GRANTS": changed["GRANTS_NEW"].fillna(0).astype(np.int64).to_numpy(),
+            "STATUS": np.select(
+                [changed["HASH_OLD"].isna().to_numpy(), changed["HASH_NEW"].isna().to_numpy()],
+                ["NEW ROLE", "ROLE REMOVED"],
+                "CHANGED",
+            ),
+        })
+        return changes, summary
+
+# Get the grant snapshot store for the current account and role
+def get_snapshot_store(account: str, role: str) -> GrantSnapshotStore:
+    return GrantSnapshotStore(CONFIG["GRANT_SNAPSHOTS"]["PATH"], account, role)
+
+# Take a snapshot of the current grants
+def take_grant_snapshot(session, store: GrantSnapshotStore) -> dict:
+    """Reads GRANTS_TO_ROLES in bulk and writes it to the store; returns the new snapshot entry."""
+    frame = query_pandas(session, SNAPSHOT_QUERY, downcast=False)
+    if frame.empty:
+        frame = pd.DataFrame(columns=["GRANTEE_NAME", "GRANTED_ON", "NAME", "TABLE_CATALOG", "TABLE_SCHEMA",
+                                      "PRIVILEGE", "GRANT_OPTION", "GRANTED_BY"])
+    return store.write(normalize_grants(frame))
+
+def snapshot_due(store: GrantSnapshotStore, now: datetime = None) -> bool:
+    """True when the newest snapshot is older than INTERVAL_HOURS, or there is none."""
+    latest = store.latest_taken_at()
+    now = now or datetime.now(timezone.utc)
+    return latest is None or now - latest >= timedelta(hours=CONFIG["GRANT_SNAPSHOTS"]["INTERVAL_HOURS"])
@@ -1,8 +1,11 @@
 import streamlit as st
 from snowflake.snowpark.context import get_active_session
-import pandas as pd
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from config.config import CONFIG
+from utils.audit_writer import AuditWriter, AUDIT_LOG_COLUMNS, ROLE_HIERARCHY_LOG_COLUMNS
+from utils.query import query_rows
 
 # Helper function to get fully qualified object names
 def get_fully_qualified_name(object_name, include_db=True):
@@ -18,6 +21,14 @@ def get_fully_qualified_name(object_name, include_db=True):
         return f"{CONFIG['DATABASE']['NAME']}.{CONFIG['DATABASE']['SCHEMA']}.{object_name}"
     return f"{CONFIG['DATABASE']['SCHEMA']}.{object_name}"
 
+# Normalize an identifier the way Snowflake stores it
+def normalize_identifier(name: str) -> str:
+    """Unquoted identifiers are stored upper-case; quoted ones keep their case."""
+    name = name.strip()
+    if len(name) >= 2 and name.startswith('"') and name.endswith('"'):
+        return name[1:-1]
+    return name.upper()
+
 # Get Snowflake session
 def get_snowflake_session():
     try:
@@ -30,27 +41,116 @@ def get_snowflake_session():
         st.error(f"Error establishing Snowflake session: {e}")
         return None
 
+# Session identity resolved once per Streamlit session
+@dataclass(frozen=True)
+class SessionContext:
+    user: str
+    role: str
+    warehouse: str
+    account: str
+    session_id: str
+
+SESSION_CONTEXT_KEY = "prism_session_context"
+UNKNOWN_SESSION_CONTEXT = SessionContext("UNKNOWN_USER", "UNKNOWN_ROLE", "UNKNOWN_WAREHOUSE", "UNKNOWN_ACCOUNT", "")
+
+def _client_side_role(session):
+    """Role the connector last reported, tracked locally so checking it costs no query."""
+    try:
+        role = session.get_current_role()
+    except Exception:
+        return None
+    return role.strip('"') if role else None
+
+# Get the current session context
+def get_session_context(session=None, refresh: bool = False) -> SessionContext:
+    """
+    Returns user, role, warehouse, account and session id from a single query.
+    The result is kept in session state and re-resolved only when the active role changes.
+    """
+    session = session or get_snowflake_session()
+    if not session:
+        return UNKNOWN_SESSION_CONTEXT
+
+    cached = st.session_state.get(SESSION_CONTEXT_KEY)
+    if cached is not None and not refresh:
+        current_role = _client_side_role(session)
+        if current_role is None or current_role == cached.role:
+            return cached
+
+    try:
+        row = query_rows(session, """
+            SELECT
+                CURRENT_USER() AS USER_NAME,
+                CURRENT_ROLE() AS ROLE_NAME,
+                CURRENT_WAREHOUSE() AS WAREHOUSE_NAME,
+                CURRENT_ACCOUNT() AS ACCOUNT_NAME,
+                CURRENT_SESSION() AS SESSION_ID
+        """)[0]
+    except Exception:
+        return cached or UNKNOWN_SESSION_CONTEXT
+
+    context = SessionContext(
+        user=row["USER_NAME"] or UNKNOWN_SESSION_CONTEXT.user,
+        role=row["ROLE_NAME"] or UNKNOWN_SESSION_CONTEXT.role,
+        warehouse=row["WAREHOUSE_NAME"] or UNKNOWN_SESSION_CONTEXT.warehouse,
+        account=row["ACCOUNT_NAME"] or UNKNOWN_SESSION_CONTEXT.account,
+        session_id=str(row["SESSION_ID"] or ""),
+    )
+    st.session_state[SESSION_CONTEXT_KEY] = context
+    return context
+
 # Get current Snowflake user
 def get_current_snowflake_user() -> str:
     """Gets the current Snowflake user."""
-    try:
-        session = get_snowflake_session()
-        if session:
-            return session.sql("SELECT CURRENT_USER()").collect()[0][0]
-    except Exception:
-        pass
-    return "UNKNOWN_USER"
+    return get_session_context().user
 
 # Get current Snowflake role
 def get_current_snowflake_role() -> str:
     """Safely get the current role from the session."""
-    try:
-        session = get_snowflake_session()
-        if session:
-            return session.sql("SELECT CURRENT_ROLE()").collect()[0][0]
-    except Exception:
-        pass
-    return "UNKNOWN_ROLE"
+    return get_session_context().role
+
+# Get the audit writer for this Streamlit session
+AUDIT_WRITER_KEY = "prism_audit_writer"
+
+def _report_audit_failure(table, error):
+    st.warning(f"Audit logging to {table} failed: {error}")
+
+def get_audit_writer() -> AuditWriter:
+    """Returns the session's buffered audit writer, creating it on first use."""
+    writer = st.session_state.get(AUDIT_WRITER_KEY)
+    if writer is None:
+        writer = AuditWriter(
+            tables={
+                get_fully_qualified_name(CONFIG["TABLES"]["AUDIT_LOG"]): (
+                    get_fully_qualified_name(CONFIG["TABLES"]["AUDIT_LOG_SEQUENCE"]),
+                    AUDIT_LOG_COLUMNS,
+                ),
+                get_fully_qualified_name(CONFIG["TABLES"]["ROLE_HIERARCHY_LOG"]): (
+                    get_fully_qualified_name(CONFIG["TABLES"]["ROLE_HIERARCHY_LOG_SEQUENCE"]),
+                    ROLE_HIERARCHY_LOG_COLUMNS,
+                ),
+            },
+            id_block_size=CONFIG["AUDIT"]["ID_BLOCK_SIZE"],
+            max_buffered_events=CONFIG["AUDIT"]["MAX_BUFFERED_EVENTS"],
+            max_buffer_age_seconds=CONFIG["AUDIT"]["MAX_BUFFER_AGE_SECONDS"],
+            on_error=_report_audit_failure,
+        )
+        st.session_state[AUDIT_WRITER_KEY] = writer
+    return writer
+
+# Buffer audit events for the duration of an action
+@contextmanager
+def audit_batch():
+    """
+    Collects every audit and role hierarchy event logged inside the block and
+    writes them in one INSERT per table when the block exits.
+    """
+    session = get_snowflake_session()
+    if not session:
+        yield
+        return
+    with get_audit_writer().batch(session):
+        yield
 
 # Log audit event
 def log_audit_event(
@@ -67,35 +167,20 @@ def log_audit_event(
     if not session:
         return None
 
-    if invoked_by_role is None:
-        invoked_by_role = get_current_snowflake_role()
-    if invoked_by_user is None:
-        invoked_by_user = get_current_snowflake_user()
+    if invoked_by_role is None or invoked_by_user is None:
+        context = get_session_context(session)
+        invoked_by_role = invoked_by_role or context.role
+        invoked_by_user = invoked_by_user or context.user
 
-    event_id = None
     try:
-        audit_log_sequence = get_fully_qualified_name(CONFIG["TABLES"]["AUDIT_LOG_SEQUENCE"])
         audit_log_table = get_fully_qualified_name(CONFIG["TABLES"]["AUDIT_LOG"])
-        
-        event_id_result = session.sql(f"SELECT {audit_log_sequence}.NEXTVAL AS ID").collect()
-        if not event_id_result:
-            st.warning(f"Audit logging failed for '{event_type}': Could not retrieve next event ID from sequence.")
-            return None
-        event_id = event_id_result[0]["ID"]
-
-        insert_sql = f"""
-            INSERT INTO {audit_log_table} (
-                EVENT_ID, EVENT_TIME, INVOKED_BY, INVOKED_BY_ROLE, EVENT_TYPE,
-                OBJECT_NAME, SQL_COMMAND, STATUS, MESSAGE
-            ) VALUES (
-                {event_id}, CURRENT_TIMESTAMP(), '{invoked_by_user}', '{invoked_by_role}',
-                '{event_type}', '{object_name}', $${sql_command}$$, '{status}', $${message}$$
-            )
-        """
-        session.sql(insert_sql).collect()
-        return event_id
+        return get_audit_writer().append(session, audit_log_table, (
+            invoked_by_user, invoked_by_role, event_type,
+            object_name, sql_command, status, message,
+        ))
     except Exception as e:
-        return event_id
+        st.warning(f"Audit logging failed for '{event_type}': {e}")
+        return None
 
 # Log role hierarchy event
 def log_role_hierarchy_event(
@@ -112,38 +197,22 @@ def log_role_hierarchy_event(
     status: str,
     message: str = "",
 ):
-    """Logs an event to the ROLE_HIERARCHY_LOG table."""
+    """Logs an event to the ROLE_HIERARCHY_LOG table and returns the log_id."""
     session = get_snowflake_session()
     if not session:
         return None
 
     try:
-        role_hierarchy_log_sequence = get_fully_qualified_name(CONFIG["TABLES"]["ROLE_HIERARCHY_LOG_SEQUENCE"])
         role_hierarchy_log_table = get_fully_qualified_name(CONFIG["TABLES"]["ROLE_HIERARCHY_LOG"])
-        
-        log_id_result = session.sql(f"SELECT {role_hierarchy_log_sequence}.NEXTVAL AS ID").collect()
-        if not log_id_result:
-            st.warning(f"Role hierarchy logging failed for '{created_role_name}': Could not retrieve LOG_ID from sequence.")
-            return
-        log_id = log_id_result[0]["ID"]
-
-        insert_sql = f"""
-            INSERT INTO {role_hierarchy_log_table} (
-                LOG_ID, EVENT_TIME, AUDIT_EVENT_ID, INVOKED_BY, ENVIRONMENT_NAME,
-                CREATED_ROLE_NAME, CREATED_ROLE_TYPE, MAPPED_DATABASE_ROLE,
-                PARENT_ACCOUNT_ROLE, SQL_COMMAND_CREATE_ROLE, SQL_COMMAND_GRANT_DB_ROLE,
-                SQL_COMMAND_GRANT_OWNERSHIP, STATUS, MESSAGE
-            ) VALUES (
-                {log_id}, CURRENT_TIMESTAMP(), {audit_event_id if audit_event_id else "NULL"},
-                '{invoked_by}', '{environment_name}', '{created_role_name}',
-                '{created_role_type}', '{mapped_database_role}', '{parent_account_role}',
-                $${sql_command_create_role}$$, $${sql_command_grant_db_role}$$,
-                $${sql_command_grant_ownership}$$, '{status}', $${message}$$
-            )
-        """
-        session.sql(insert_sql).collect()
+        return get_audit_writer().append(session, role_hierarchy_log_table, (
+            audit_event_id, invoked_by, environment_name, created_role_name,
+            created_role_type, mapped_database_role, parent_account_role,
+            sql_command_create_role, sql_command_grant_db_role,
+            sql_command_grant_ownership, status, message,
+        ))
     except Exception as e:
-        return audit_event_id
+        st.warning(f"Role hierarchy logging failed for '{created_role_name}': {e}")
+        return None
 
 # Configure dark mode charts
 def configure_dark_mode_charts(fig):
@@ -0,0 +1,218 @@
+import contextvars
+import functools
+import json
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+import streamlit as st
+from config.config import CONFIG
+
+# Trace of the most recent page run in this session
+LAST_TRACE_KEY = "prism_last_trace"
+
+# Frames in these files are skipped when attributing a statement to the code that issued it
+_WRAPPER_FILES = (
+    "utils/instrumentation.py",
+    "utils/query.py",
+    "utils/async_queries.py",
+    "utils/bulk_executor.py",
+    "contextlib.py",
+)
+
+# Rows sampled when estimating the in-memory size of a result
+_SIZE_SAMPLE_ROWS = 1000
+
+
+@dataclass
+class TraceEvent:
+    kind: str  # "query", "cache", "pandas", "plotly" or "page"
+    label: str
+    caller: str
+    started: float  # Seconds after the page run began
+    elapsed: float = 0.0
+    rows: int = None
+    bytes: int = None
+    query_id: str = None
+    error: str = None
+
+
+class PageTrace:
+    """Every statement and timed stage of one page run, in the order they started."""
+
+    def __init__(self, page: str):
+        self.page = page
+        self.started_at = datetime.now(timezone.utc)
+        self._origin = time.perf_counter()
+        self.events = []
+        self.dropped = 0
+        self.elapsed = None
+
+    def offset(self) -> float:
+        return round(time.perf_counter() - self._origin, 4)
+
+    def add(self, event: TraceEvent) -> TraceEvent:
+        if len(self.events) < CONFIG["INSTRUMENTATION"]["MAX_EVENTS"]:
+            self.events.append(event)
+        else:
+            self.dropped += 1
+        return event
+
+    def to_jsonl(self) -> str:
+        """One JSON object per event, tagged with the page and when the run started."""
+        run = {"page": self.page, "run_started_at": self.started_at.isoformat()}
+        return "".join(json.dumps({**run, **asdict(event)}) + "\n" for event in self.events)
+
+_CURRENT_TRACE = contextvars.ContextVar("prism_page_trace", default=None)
+
+def _caller() -> str:
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename.replace("\\", "/").endswith(_WRAPPER_FILES):
+        frame = frame.f_back
+    if frame is None:
+        return ""
+    path = frame.f_code.co_filename.replace("\\", "/")
+    return f"{'/'.join(path.split('/')[-2:])}:{frame.f_code.co_name}"
+
+def estimate_bytes(result) -> int:
+    """Approximate in-memory size of a DataFrame or list of Rows, extrapolated from a sample."""
+    if result is None or not len(result):
+        return 0
+    if hasattr(result, "memory_usage"):
+        sample = result.head(_SIZE_SAMPLE_ROWS)
+        return int(sample.memory_usage(deep=True, index=False).sum() * len(result) / len(sample))
+    sample = result[:_SIZE_SAMPLE_ROWS]
+    sampled = sum(sys.getsizeof(value) for row in sample for value in row)
+    return int(sampled * len(result) / len(sample))
+
+# Record statements on the current page trace
+def start_query(sql: str, query_id: str = None) -> TraceEvent:
+    """Opens a query event on the current trace; returns None when no page is being traced."""
+    trace = _CURRENT_TRACE.get()
+    if trace is None:
+        return None
+    label = " ".join(sql.split())[:200]
+    return trace.add(TraceEvent("query", label, _caller(), trace.offset(), query_id=query_id))
+
+def finish_query(event: TraceEvent, result=None, query_id: str = None, error: Exception = None, rows: int = None):
+    """Closes a query event with its elapsed time, result size, query ID and error."""
+    if event is None:
+        return
+    trace = _CURRENT_TRACE.get()
+    # An async job can be collected on a later run (the audit page prefetch); its event stays
+    # on the trace it started on, whose clock this run cannot read
+    if trace is not None and any(recorded is event for recorded in trace.events):
+        event.elapsed = round(trace.offset() - event.started, 4)
+    event.query_id = query_id or event.query_id
+    if error is not None:
+        event.error = str(error)
+    if result is not None:
+        event.rows = len(result)
+        event.bytes = estimate_bytes(result)
+    elif rows is not None:
+        event.rows = rows
+
+def record_cache_hit(sql: str, result):
+    """Records a statement answered from the shared result cache instead of Snowflake."""
+    trace = _CURRENT_TRACE.get()
+    if trace is None:
+        return
+    label = " ".join(sql.split())[:200]
+    trace.add(TraceEvent("cache", label, _caller(), trace.offset(), rows=len(result), bytes=estimate_bytes(result)))
+
+@contextmanager
+def trace_stage(kind: str, label: str):
+    """Times a pandas or plotly stage of the current page."""
+    trace = _CURRENT_TRACE.get()
+    if trace is None:
+        yield
+        return
+    event = trace.add(TraceEvent(kind, label, _caller(), trace.offset()))
+    try:
+        yield
+    finally:
+        event.elapsed = round(trace.offset() - event.started, 4)
+
+def developer_panel_enabled() -> bool:
+    """The panel is opt-in, through CONFIG or ?dev=1 in the URL."""
+    return CONFIG["INSTRUMENTATION"]["DEVELOPER_PANEL"] or st.query_params.get("dev") == "1"
+
+def render_trace_panel(trace: PageTrace):
+    """Waterfall, totals and JSONL export for one page run."""
+    import pandas as pd
+    import plotly.graph_objects as go
+    from utils.helpers import configure_dark_mode_charts
+
+    with st.expander("Developer: page run waterfall", expanded=False):
+        queries = [event for event in trace.events if event.kind == "query"]
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Page Time", f"{trace.elapsed:.2f}s")
+        with col2:
+            st.metric("Statements", len(queries))
+        with col3:
+            st.metric("Statement Time", f"{sum(event.elapsed for event in queries):.2f}s")
+        with col4:
+            st.metric("Rows Fetched", sum(event.rows or 0 for event in queries))
+        if trace.dropped:
+            st.caption(f"{trace.dropped} further events were not recorded")
+
+        from utils.result_cache import get_result_cache
+        cache = get_result_cache().stats()
+        st.caption(
+            f"Shared result cache: {cache['ENTRIES']} entries, "
+            f"{cache['BYTES'] / (1024 * 1024):.1f} of {cache['MAX_BYTES'] / (1024 * 1024):.0f} MB"
+        )
+        if cache["CLASSES"]:
+            st.dataframe(pd.DataFrame.from_dict(cache["CLASSES"], orient="index"), use_container_width=True)
+
+        if trace.events:
+            events = pd.DataFrame([asdict(event) for event in trace.events])
+            fig = go.Figure()
+            labels = [f"{position:03d} {event.label[:60]}" for position, event in enumerate(trace.events)]
+            for kind in events["kind"].unique():
+                mask = (events["kind"] == kind).to_numpy()
+                fig.add_trace(go.Bar(
+                    name=kind,
+                    y=[label for label, keep in zip(labels, mask) if keep],
+                    x=events.loc[mask, "elapsed"],
+                    base=events.loc[mask, "started"],
+                    orientation="h",
+                    customdata=events.loc[mask, ["caller", "rows", "query_id"]],
+                    hovertemplate="%{y}<br>%{customdata[0]}<br>%{x:.3f}s · %{customdata[1]} rows<br>%{customdata[2]}<extra></extra>",
+                ))
+            fig.update_layout(
+                title="Waterfall (seconds since the page run began)",
+                barmode="overlay",
+                yaxis={"autorange": "reversed", "showticklabels": False},
+                height=max(300, 18 * len(labels)),
+            )
+            configure_dark_mode_charts(fig)
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(events, use_container_width=True)
+
+        st.download_button(
+            label="Download trace (JSONL)",
+            data=trace.to_jsonl(),
+            file_name=f"prism_trace_{trace.page}_{trace.started_at:%Y%m%d_%H%M%S}.jsonl",
+            mime="application/x-ndjson"
+        )
+
+# Trace a page entry point
+def instrument_page(func):
+    """Records every statement and stage of the page run and shows the developer panel after it."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        trace = PageTrace(func.__name__)
+        token = _CURRENT_TRACE.set(trace)
+        page_event = trace.add(TraceEvent("page", func.__name__, func.__module__, 0.0))
+        try:
+            return func(*args, **kwargs)
+        finally:
+            page_event.elapsed = trace.elapsed = trace.offset()
+            _CURRENT_TRACE.reset(token)
+            st.session_state[LAST_TRACE_KEY] = trace
+            if developer_panel_enabled():
+                render_trace_panel(trace)
+    return wrapper
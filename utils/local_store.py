@@ -0,0 +1,25 @@
+import hashlib
+import os
+import re
+import threading
+
+_STORE_LOCKS = {}
+_STORE_LOCKS_GUARD = threading.Lock()
+
+# Serialize writers of one local store directory within the process
+def store_lock(path) -> threading.Lock:
+    with _STORE_LOCKS_GUARD:
+        return _STORE_LOCKS.setdefault(path, threading.Lock())
+
+def _directory_name(name: str) -> str:
+    """
+    name with anything but letters, digits, '_', '.' and '-' replaced, plus a hash of the
+    original, so distinct names such as "A B" and A_B never share a directory.
+    """
+    readable = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+    return f"{readable}-{hashlib.sha1(name.encode()).hexdigest()[:12]}"
+
+# Directory of a local store for one account and role
+def store_root(root: str, account: str, role: str) -> str:
+    """Data fetched under one role must never be served to another, so each gets its own directory."""
+    return os.path.join(root, _directory_name(account), _directory_name(role))
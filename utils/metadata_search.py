@@ -0,0 +1,345 @@
+import bisect
+import hashlib
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+from config.config import CONFIG
+from utils.async_queries import iter_bounded
+from utils.cache import TTLCache
+from utils.helpers import get_session_context
+from utils.local_store import store_lock, store_root
+from utils.metadata_snapshot import quote_identifier
+
+# Per-database crawl queries; {database} is a quoted identifier.
+# Schemas and objects are listed in full on every crawl so drops are noticed;
+# columns are only read for objects altered since the database's watermark (bind param).
+CRAWL_QUERIES = {
+    "schemata": """
+        SELECT SCHEMA_NAME
+        FROM {database}.INFORMATION_SCHEMA.SCHEMATA
+        WHERE SCHEMA_NAME <> 'INFORMATION_SCHEMA'
+    """,
+    "tables": """
+        SELECT TABLE_SCHEMA, TABLE_NAME, TABLE_TYPE, LAST_ALTERED
+        FROM {database}.INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_SCHEMA <> 'INFORMATION_SCHEMA'
+    """,
+    "columns": """
+        SELECT c.TABLE_SCHEMA, c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE
+        FROM {database}.INFORMATION_SCHEMA.COLUMNS c
+        JOIN {database}.INFORMATION_SCHEMA.TABLES t
+            ON t.TABLE_SCHEMA = c.TABLE_SCHEMA
+            AND t.TABLE_NAME = c.TABLE_NAME
+        WHERE c.TABLE_SCHEMA <> 'INFORMATION_SCHEMA'
+        AND t.LAST_ALTERED >= TO_TIMESTAMP_LTZ(?)
+    """,
+}
+
+# One row per indexed database, schema, table/view or column
+INDEX_COLUMNS = ["KIND", "DATABASE_NAME", "SCHEMA_NAME", "OBJECT_NAME", "COLUMN_NAME", "DATA_TYPE", "LAST_ALTERED"]
+
+SEARCH_MODES = ("substring", "prefix", "token")
+
+# Identifier words: CUSTOMER_SSN_HASH -> CUSTOMER, SSN, HASH
+TOKEN_PATTERN = re.compile(r"[^0-9A-Z]+")
+
+_EPOCH = "1970-01-01T00:00:00+00:00"
+
+def _parquet_schema():
+    """Fixed file schema, so databases without views or columns still read back as one dataset."""
+    import pyarrow as pa
+    return pa.schema(
+        [(column, pa.string()) for column in INDEX_COLUMNS[:-1]] + [("LAST_ALTERED", pa.timestamp("ns", tz="UTC"))]
+    )
+
+
+class MetadataSearchStore:
+    """
+    Local Parquet copy of every schema, object and column name visible to one account and role.
+
+    Layout: <root>/<account>/<role>/<database hash>.parquet plus state.json, which maps each
+    database to its file and its watermark (the newest LAST_ALTERED seen in it). Metadata is
+    kept per role because different roles can see different objects.
+    """
+
+    def __init__(self, root: str, account: str, role: str):
+        self.root = store_root(root, account, role)
+
+    def _database_path(self, database):
+        return os.path.join(self.root, hashlib.sha1(database.encode()).hexdigest()[:16] + ".parquet")
+
+    def load_state(self) -> dict:
+        try:
+            with open(os.path.join(self.root, "state.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state):
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, "state.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(state, f)
+        os.replace(path + ".tmp", path)
+
+    def read_database(self, database) -> pd.DataFrame:
+        path = self._database_path(database)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=INDEX_COLUMNS)
+        return pd.read_parquet(path)
+
+    def write_database(self, database, frame: pd.DataFrame, watermark: str):
+        with store_lock(self.root):
+            os.makedirs(self.root, exist_ok=True)
+            path = self._database_path(database)
+            frame.reset_index(drop=True).to_parquet(path + ".tmp", index=False, schema=_parquet_schema())
+            os.replace(path + ".tmp", path)
+            state = self.load_state()
+            state[database] = watermark
+            self._save_state(state)
+
+    def remove_databases(self, databases):
+        with store_lock(self.root):
+            state = self.load_state()
+            for database in databases:
+                state.pop(database, None)
+                path = self._database_path(database)
+                if os.path.exists(path):
+                    os.remove(path)
+            self._save_state(state)
+
+    def read_all(self) -> pd.DataFrame:
+        """Every stored row, ordered by database, schema, object and column."""
+        paths = [self._database_path(database) for database in sorted(self.load_state())]
+        paths = [path for path in paths if os.path.exists(path)]
+        if not paths:
+            return pd.DataFrame(columns=INDEX_COLUMNS)
+        import pyarrow.dataset as ds
+        return ds.dataset(paths, format="parquet").to_table().to_pandas()
+
+def merge_database(database, previous: pd.DataFrame, schemata, tables, columns, watermark: str) -> tuple:
+    """
+    Folds one crawl of a database into its previously stored rows.
+    Args:
+        database: Database name
+        previous: Stored rows for the database (may be empty)
+        schemata, tables, columns: Frames returned by CRAWL_QUERIES
+        watermark: Watermark the columns query was run with
+    Returns:
+        (rows, new watermark, whether anything changed)
+    """
+    objects = pd.DataFrame({
+        "KIND": np.where(tables["TABLE_TYPE"] == "VIEW", "VIEW", "TABLE"),
+        "DATABASE_NAME": database,
+        "SCHEMA_NAME": tables["TABLE_SCHEMA"],
+        "OBJECT_NAME": tables["TABLE_NAME"],
+        "LAST_ALTERED": pd.to_datetime(tables["LAST_ALTERED"], utc=True),
+    })
+    live = pd.MultiIndex.from_frame(objects[["SCHEMA_NAME", "OBJECT_NAME"]])
+
+    # Objects altered since the watermark, plus anything the columns query caught
+    # between the two listings, get their columns replaced wholesale
+    fetched = pd.DataFrame({
+        "KIND": "COLUMN",
+        "DATABASE_NAME": database,
+        "SCHEMA_NAME": columns["TABLE_SCHEMA"],
+        "OBJECT_NAME": columns["TABLE_NAME"],
+        "COLUMN_NAME": columns["COLUMN_NAME"],
+        "DATA_TYPE": columns["DATA_TYPE"],
+    })
+    altered = objects["LAST_ALTERED"] >= pd.Timestamp(watermark)
+    changed = pd.MultiIndex.from_frame(objects.loc[altered, ["SCHEMA_NAME", "OBJECT_NAME"]]).union(
+        pd.MultiIndex.from_frame(fetched[["SCHEMA_NAME", "OBJECT_NAME"]])
+    )
+
+    old_columns = previous[previous["KIND"] == "COLUMN"]
+    old_keys = pd.MultiIndex.from_frame(old_columns[["SCHEMA_NAME", "OBJECT_NAME"]])
+    kept = old_columns[old_keys.isin(live) & ~old_keys.isin(changed)]
+    fetched = fetched[pd.MultiIndex.from_frame(fetched[["SCHEMA_NAME", "OBJECT_NAME"]]).isin(live)]
+
+    schemas = pd.DataFrame({"KIND": "SCHEMA", "DATABASE_NAME": database, "SCHEMA_NAME": schemata["SCHEMA_NAME"]})
+    header = pd.DataFrame({"KIND": ["DATABASE"], "DATABASE_NAME": [database]})
+    rows = pd.concat([header, schemas, objects, kept, fetched], ignore_index=True)
+    rows = rows.reindex(columns=INDEX_COLUMNS).astype({"LAST_ALTERED": "datetime64[ns, UTC]"})
+    rows = rows.sort_values(["SCHEMA_NAME", "OBJECT_NAME", "COLUMN_NAME"], na_position="first", kind="stable")
+
+    newest = objects["LAST_ALTERED"].max()
+    new_watermark = max(pd.Timestamp(watermark), newest).isoformat() if pd.notna(newest) else watermark
+    # Columns only change together with their object's LAST_ALTERED, so comparing the
+    # listings is enough to tell whether the stored rows are still current
+    listing = lambda frame: set(
+        frame.loc[frame["KIND"] != "COLUMN", ["KIND", "SCHEMA_NAME", "OBJECT_NAME", "LAST_ALTERED"]]
+        .fillna("").itertuples(index=False)
+    )
+    return rows.reset_index(drop=True), new_watermark, previous.empty or listing(previous) != listing(rows)
+
+# Crawl every listed database into the store
+def crawl_metadata(session, store: MetadataSearchStore, databases, max_concurrency: int = None, on_progress=None) -> dict:
+    """
+    Fans the crawl queries out over databases with at most max_concurrency databases in flight,
+    refreshing each one incrementally from its stored watermark. Databases that are no longer
+    listed are dropped from the store; databases that fail keep their previous rows.
+    Args:
+        on_progress: Optional callback(done, total, database) called as each database finishes
+    Returns:
+        Dict of UPDATED, UNCHANGED and REMOVED database lists and FAILED {database: message}
+    """
+    max_concurrency = max_concurrency or CONFIG["METADATA_SEARCH"]["MAX_CONCURRENCY"]
+    databases = list(databases)
+    state = store.load_state()
+    outcome = {"UPDATED": [], "UNCHANGED": [], "REMOVED": sorted(set(state) - set(databases)), "FAILED": {}}
+    store.remove_databases(outcome["REMOVED"])
+
+    queries = {}
+    for database in databases:
+        quoted = quote_identifier(database)
+        watermark = state.get(database, _EPOCH)
+        for part, query in CRAWL_QUERIES.items():
+            sql = query.format(database=quoted)
+            queries[(database, part)] = (sql, [watermark]) if part == "columns" else sql
+
+    results = {}
+    finished = 0
+    in_flight = max_concurrency * len(CRAWL_QUERIES)
+    for (database, part), frame, _, error in iter_bounded(session, queries, in_flight, as_pandas=True):
+        if database in outcome["FAILED"]:
+            continue
+        if error is not None:
+            outcome["FAILED"][database] = str(error)
+            results.pop(database, None)
+        else:
+            results.setdefault(database, {})[part] = frame
+            if len(results[database]) < len(CRAWL_QUERIES):
+                continue
+            parts = results.pop(database)
+            watermark = state.get(database, _EPOCH)
+            rows, new_watermark, changed = merge_database(
+                database,
+                store.read_database(database) if database in state else pd.DataFrame(columns=INDEX_COLUMNS),
+                # Empty results may come back without any columns
+                parts["schemata"].reindex(columns=["SCHEMA_NAME"]),
+                parts["tables"].reindex(columns=["TABLE_SCHEMA", "TABLE_NAME", "TABLE_TYPE", "LAST_ALTERED"]),
+                parts["columns"].reindex(columns=["TABLE_SCHEMA", "TABLE_NAME", "COLUMN_NAME", "DATA_TYPE"]),
+                watermark,
+            )
+            if changed:
+                store.write_database(database, rows, new_watermark)
+                outcome["UPDATED"].append(database)
+            else:
+                outcome["UNCHANGED"].append(database)
+        finished += 1
+        if on_progress:
+            on_progress(finished, len(databases), database)
+    return outcome
+
+
+class MetadataSearchIndex:
+    """
+    Inverted index over the names of every stored database, schema, object and column.
+
+    Names are upper-cased and de-duplicated; each distinct name points at the rows that
+    carry it through CSR postings. Prefix search is a bisect over the sorted names,
+    substring search a str.find scan over one newline-joined string of them, and token
+    search an intersection of per-word posting sets, so a lookup touches the distinct
+    names rather than every row.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame.reset_index(drop=True)
+        kind = self.frame["KIND"].to_numpy(dtype=object)
+        leaf = np.select(
+            [kind == "COLUMN", np.isin(kind, ["TABLE", "VIEW"]), kind == "SCHEMA"],
+            [self.frame["COLUMN_NAME"], self.frame["OBJECT_NAME"], self.frame["SCHEMA_NAME"]],
+            default=self.frame["DATABASE_NAME"],
+        )
+        keys = pd.Series(leaf, dtype=object).fillna("").str.upper().to_numpy(dtype=object)
+        names, inverse = np.unique(keys, return_inverse=True)
+        self.names = names.tolist()
+        self._kinds = kind
+        self._offsets = np.zeros(len(self.names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(inverse, minlength=len(self.names)), out=self._offsets[1:])
+        self._postings = np.argsort(inverse, kind="stable").astype(np.int64)
+
+        self._haystack = "\n".join(self.names)
+        self._starts = [0]
+        for name in self.names:
+            self._starts.append(self._starts[-1] + len(name) + 1)
+
+        tokens = {}
+        for name_id, name in enumerate(self.names):
+            for token in set(TOKEN_PATTERN.split(name)):
+                if token:
+                    tokens.setdefault(token, []).append(name_id)
+        self._tokens = {token: np.array(ids, dtype=np.int64) for token, ids in tokens.items()}
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _prefix_ids(self, text):
+        low = bisect.bisect_left(self.names, text)
+        high = bisect.bisect_left(self.names, text[:-1] + chr(ord(text[-1]) + 1))
+        return np.arange(low, high, dtype=np.int64)
+
+    def _substring_ids(self, text):
+        ids = []
+        position = self._haystack.find(text)
+        while position != -1:
+            name_id = bisect.bisect_right(self._starts, position) - 1
+            ids.append(name_id)
+            position = self._haystack.find(text, self._starts[name_id + 1])
+        return np.array(ids, dtype=np.int64)
+
+    def _token_ids(self, text):
+        ids = None
+        for token in set(TOKEN_PATTERN.split(text)):
+            if not token:
+                continue
+            matched = self._tokens.get(token, np.empty(0, dtype=np.int64))
+            ids = matched if ids is None else np.intersect1d(ids, matched, assume_unique=True)
+        return np.empty(0, dtype=np.int64) if ids is None else ids
+
+    def search(self, text: str, mode: str = "substring", kinds=None, limit: int = None) -> tuple:
+        """
+        Finds rows whose own name matches text, case-insensitively.
+        Args:
+            text: Search text; in token mode every word must appear as a whole name part
+            mode: One of SEARCH_MODES
+            kinds: Optional collection of KIND values to keep
+            limit: Maximum rows returned
+        Returns:
+            (DataFrame of matching rows in database/schema/object order, total number of matches)
+        """
+        text = text.strip().upper().replace("\n", "")
+        if not text:
+            return self.frame.iloc[0:0], 0
+        name_ids = {"prefix": self._prefix_ids, "substring": self._substring_ids, "token": self._token_ids}[mode](text)
+
+        starts = self._offsets[name_ids]
+        lengths = self._offsets[name_ids + 1] - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        rows = np.sort(self._postings[positions])
+        if kinds:
+            rows = rows[np.isin(self._kinds[rows], list(kinds))]
+        return self.frame.iloc[rows[:limit]], len(rows)
+
+# Process-wide cache keyed by (account, role)
+_INDEX_CACHE = TTLCache(
+    ttl_seconds=CONFIG["CACHE"]["SEARCH_INDEX_TTL_SECONDS"],
+    max_entries=CONFIG["CACHE"]["SEARCH_INDEX_MAX_ENTRIES"],
+)
+
+# Get the metadata search store for the current account and role
+def get_search_store(session) -> MetadataSearchStore:
+    context = get_session_context(session)
+    return MetadataSearchStore(CONFIG["METADATA_SEARCH"]["PATH"], context.account, context.role)
+
+# Get the search index for the current account and role
+def get_search_index(session, refresh: bool = False) -> MetadataSearchIndex:
+    """Builds the index from the local store on first use; refresh rebuilds it after a crawl."""
+    context = get_session_context(session)
+    key = (context.account, context.role)
+    if refresh:
+        _INDEX_CACHE.pop(key)
+    return _INDEX_CACHE.get_or_load(key, lambda: MetadataSearchIndex(get_search_store(session).read_all()))
@@ -0,0 +1,98 @@
+import time
+from config.config import CONFIG
+from utils.async_queries import run_queries_concurrently
+from utils.cache import TTLCache
+from utils.helpers import get_session_context
+
+# Bulk INFORMATION_SCHEMA reads for one database; {database} is a quoted identifier
+SNAPSHOT_QUERIES = {
+    "schemata": """
+        SELECT SCHEMA_NAME, SCHEMA_OWNER, CREATED, LAST_ALTERED, COMMENT
+        FROM {database}.INFORMATION_SCHEMA.SCHEMATA
+        ORDER BY SCHEMA_NAME
+    """,
+    "tables": """
+        SELECT
+            TABLE_SCHEMA, TABLE_NAME, TABLE_TYPE, TABLE_OWNER, ROW_COUNT, BYTES,
+            CLUSTERING_KEY, CREATED, LAST_ALTERED, COMMENT
+        FROM {database}.INFORMATION_SCHEMA.TABLES
+        ORDER BY TABLE_SCHEMA, TABLE_NAME
+    """,
+    "views": """
+        SELECT TABLE_SCHEMA, TABLE_NAME, IS_SECURE, VIEW_DEFINITION
+        FROM {database}.INFORMATION_SCHEMA.VIEWS
+    """,
+    "columns": """
+        SELECT
+            TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION, DATA_TYPE,
+            CHARACTER_MAXIMUM_LENGTH, IS_NULLABLE, COLUMN_DEFAULT, COMMENT
+        FROM {database}.INFORMATION_SCHEMA.COLUMNS
+        ORDER BY TABLE_SCHEMA, TABLE_NAME, ORDINAL_POSITION
+    """,
+}
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DatabaseSnapshot:
+    """
+    In-memory copy of one database's SCHEMATA, TABLES, VIEWS and COLUMNS,
+    indexed by schema and object name so every drill-down is a dictionary lookup.
+    """
+
+    def __init__(self, database: str, schemata, tables, views, columns):
+        self.database = database
+        self.loaded_at = time.time()
+        self.schemas = {row["SCHEMA_NAME"]: row for row in schemata}
+        self.objects = {schema: {} for schema in self.schemas}
+        for row in tables:
+            self.objects.setdefault(row["TABLE_SCHEMA"], {})[row["TABLE_NAME"]] = row
+        self.views = {(row["TABLE_SCHEMA"], row["TABLE_NAME"]): row for row in views}
+        self.columns = {}
+        for row in columns:
+            self.columns.setdefault((row["TABLE_SCHEMA"], row["TABLE_NAME"]), []).append(row)
+
+    @classmethod
+    def load(cls, session, database: str):
+        """Reads the whole database's metadata with concurrent bulk queries."""
+        quoted = quote_identifier(database)
+        results = run_queries_concurrently(session, {
+            name: query.format(database=quoted) for name, query in SNAPSHOT_QUERIES.items()
+        }, as_pandas=True)
+        as_dicts = {name: frame.to_dict("records") for name, frame in results.items()}
+        return cls(database, **as_dicts)
+
+    def schema_names(self) -> list:
+        return list(self.schemas)
+
+    def objects_in(self, schema: str) -> list:
+        """Objects of a schema as dicts of name and type."""
+        return [
+            {"name": name, "type": row["TABLE_TYPE"]}
+            for name, row in self.objects.get(schema, {}).items()
+        ]
+
+    def object_properties(self, schema: str, name: str) -> dict:
+        """TABLES row of an object, merged with its VIEWS row for views."""
+        properties = dict(self.objects.get(schema, {}).get(name, {}))
+        properties.update(self.views.get((schema, name), {}))
+        return properties
+
+    def columns_of(self, schema: str, name: str) -> list:
+        return self.columns.get((schema, name), [])
+
+# Process-wide cache keyed by (account, role, database)
+_SNAPSHOT_CACHE = TTLCache(
+    ttl_seconds=CONFIG["CACHE"]["METADATA_SNAPSHOT_TTL_SECONDS"],
+    max_entries=CONFIG["CACHE"]["METADATA_SNAPSHOT_MAX_ENTRIES"],
+)
+
+# Get the metadata snapshot of a database
+def get_database_snapshot(session, database: str, refresh: bool = False) -> DatabaseSnapshot:
+    """Returns the cached snapshot for database, loading it on first use, expiry or refresh."""
+    context = get_session_context(session)
+    key = (context.account, context.role, database)
+    if refresh:
+        _SNAPSHOT_CACHE.pop(key)
+    return _SNAPSHOT_CACHE.get_or_load(key, lambda: DatabaseSnapshot.load(session, database))
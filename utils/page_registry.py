@@ -0,0 +1,42 @@
+import importlib
+from config.config import (
+    ACTIONS_LIST, ABOUT, CREATE_DATABASE, CLONE_DATABASE, DELETE_DATABASE, CREATE_WAREHOUSE,
+    CREATE_ROLE, ASSIGN_ROLES, ASSIGN_DATABASE_ROLES, REVOKE_ROLES, CREATE_ENVIRONMENT_ROLES,
+    SHOW_ROLE_HIERARCHY, DISPLAY_RBAC_ARCHITECTURE, PLAN_RBAC_MODEL, RBAC_DRIFT,
+    MANAGE_METADATA, COST_ANALYSIS, CREDIT_FORECAST, AUDIT_LOGS,
+)
+
+# Action -> (page module, entry point). Modules are imported only when their action is selected,
+# so plotly, pandas and numpy are loaded by the pages that chart or crunch data and no others.
+PAGE_REGISTRY = {
+    ABOUT: ("pages.about", "ui_about"),
+    CREATE_DATABASE: ("pages.database", "ui_create_database"),
+    CLONE_DATABASE: ("pages.database", "ui_clone_database"),
+    DELETE_DATABASE: ("pages.database", "ui_delete_database"),
+    CREATE_WAREHOUSE: ("pages.warehouse", "ui_create_warehouse"),
+    CREATE_ROLE: ("pages.roles", "ui_create_role"),
+    ASSIGN_ROLES: ("pages.roles", "ui_assign_roles"),
+    ASSIGN_DATABASE_ROLES: ("pages.roles", "ui_assign_database_roles"),
+    REVOKE_ROLES: ("pages.roles", "ui_revoke_roles"),
+    CREATE_ENVIRONMENT_ROLES: ("pages.roles", "ui_create_environment_roles"),
+    SHOW_ROLE_HIERARCHY: ("pages.roles", "ui_show_role_hierarchy"),
+    DISPLAY_RBAC_ARCHITECTURE: ("pages.roles", "ui_display_rbac_architecture"),
+    PLAN_RBAC_MODEL: ("pages.roles", "ui_plan_rbac_model"),
+    RBAC_DRIFT: ("pages.roles", "ui_rbac_drift"),
+    MANAGE_METADATA: ("pages.metadata", "ui_manage_metadata"),
+    COST_ANALYSIS: ("pages.cost", "ui_cost_analysis"),
+    CREDIT_FORECAST: ("pages.cost", "ui_credit_forecast"),
+    AUDIT_LOGS: ("pages.audit", "ui_audit_logs"),
+}
+
+_UNREGISTERED = [action for action in ACTIONS_LIST if action not in PAGE_REGISTRY]
+if _UNREGISTERED:
+    raise RuntimeError(f"Actions without a page: {', '.join(_UNREGISTERED)}")
+
+# Resolve the entry point of an action, importing its page module on first use
+def get_page_renderer(action: str):
+    module_name, function_name = PAGE_REGISTRY[action]
+    return getattr(importlib.import_module(module_name), function_name)
+
+def render_action(action: str):
+    get_page_renderer(action)()
@@ -0,0 +1,139 @@
+import threading
+from config.config import CONFIG
+from utils.cache import TTLCache
+from utils.helpers import get_session_context
+from utils.query import query_pandas
+from utils.role_reachability import RoleReachabilityIndex, iter_bits
+
+# Every active grant to an account role: role-to-role edges and object privileges in one read
+ALL_ROLE_GRANTS_QUERY = """
+    SELECT
+        GRANTEE_NAME,
+        GRANTED_ON,
+        NAME,
+        TABLE_CATALOG,
+        TABLE_SCHEMA,
+        PRIVILEGE
+    FROM SNOWFLAKE.ACCOUNT_USAGE.GRANTS_TO_ROLES
+    WHERE GRANTED_TO = 'ROLE'
+    AND DELETED_ON IS NULL
+"""
+
+# Object types whose NAME is already the full identifier
+ACCOUNT_LEVEL_TYPES = {"ACCOUNT", "DATABASE", "WAREHOUSE", "ROLE", "USER", "INTEGRATION", "RESOURCE_MONITOR"}
+
+def grant_object_name(granted_on, name, table_catalog, table_schema) -> str:
+    """Fully qualified name of a granted object as it appears in GRANTS_TO_ROLES."""
+    if granted_on in ACCOUNT_LEVEL_TYPES or not table_catalog:
+        return name
+    if granted_on == "SCHEMA" or not table_schema:
+        return f"{table_catalog}.{name}"
+    return f"{table_catalog}.{table_schema}.{name}"
+
+
+class EffectivePrivilegeMatrix:
+    """
+    Sparse (object, privilege) -> role bitset matrix joined with the role hierarchy.
+
+    Direct grants are stored as one role bitset per (object, privilege) cell. The
+    effective bitset of a cell, the direct holders plus every role that inherits
+    one of them, is computed on first use and memoized, so point checks and
+    "who can" lookups are a dictionary hit and a bit test afterwards. OWNERSHIP
+    implies every other privilege on the object.
+    """
+
+    def __init__(self, grant_rows):
+        """
+        Args:
+            grant_rows: Iterable of (grantee role, granted_on, name, table_catalog, table_schema, privilege)
+        """
+        edges, object_grants, grantees = [], [], set()
+        for grantee, granted_on, name, table_catalog, table_schema, privilege in grant_rows:
+            if granted_on == "ROLE":
+                if privilege == "USAGE":
+                    edges.append((grantee, name))
+                continue
+            grantees.add(grantee)
+            object_grants.append((grantee, (granted_on, grant_object_name(granted_on, name, table_catalog, table_schema)), privilege))
+
+        self.roles = RoleReachabilityIndex(edges, roles=grantees)
+        self._direct = {}
+        for grantee, object_key, privilege in object_grants:
+            cell = (object_key, privilege)
+            self._direct[cell] = self._direct.get(cell, 0) | (1 << self.roles.ids[grantee])
+        self._privileges_by_object = {}
+        for object_key, privilege in self._direct:
+            self._privileges_by_object.setdefault(object_key, set()).add(privilege)
+        self._effective = {}
+        self._lock = threading.Lock()
+
+    @property
+    def num_grants(self) -> int:
+        return len(self._direct)
+
+    def _effective_mask(self, object_key, privilege) -> int:
+        cell = (object_key, privilege)
+        mask = self._effective.get(cell)
+        if mask is None:
+            mask = 0
+            for role_id in iter_bits(self._direct.get(cell, 0)):
+                mask |= self.roles.holder_mask(self.roles.names[role_id])
+            with self._lock:
+                self._effective[cell] = mask
+        return mask
+
+    def _holders(self, object_key, privilege) -> int:
+        mask = self._effective_mask(object_key, privilege)
+        if privilege != "OWNERSHIP":
+            mask |= self._effective_mask(object_key, "OWNERSHIP")
+        return mask
+
+    def can(self, role: str, privilege: str, object_type: str, object_name: str) -> bool:
+        """True if role holds privilege on the object directly, by inheritance or through OWNERSHIP."""
+        role_id = self.roles.ids.get(role)
+        if role_id is None:
+            return False
+        return bool(self._holders((object_type, object_name), privilege) >> role_id & 1)
+
+    def roles_with(self, privilege: str, object_type: str, object_name: str) -> list:
+        """Every role that effectively holds privilege on the object."""
+        mask = self._holders((object_type, object_name), privilege)
+        return sorted(self.roles.names[role_id] for role_id in iter_bits(mask))
+
+    def object_privileges(self, object_type: str, object_name: str) -> list:
+        """
+        Effective privileges on one object as rows of PRIVILEGE, ROLE and GRANT_TYPE
+        ("DIRECT" or "INHERITED").
+        """
+        object_key = (object_type, object_name)
+        rows = []
+        for privilege in sorted(self._privileges_by_object.get(object_key, ())):
+            direct = self._direct[(object_key, privilege)]
+            for role_id in iter_bits(self._effective_mask(object_key, privilege)):
+                rows.append({
+                    "PRIVILEGE": privilege,
+                    "ROLE": self.roles.names[role_id],
+                    "GRANT_TYPE": "DIRECT" if direct >> role_id & 1 else "INHERITED",
+                })
+        return rows
+
+# Process-wide cache keyed by (account, role)
+_PRIVILEGE_MATRIX_CACHE = TTLCache(
+    ttl_seconds=CONFIG["CACHE"]["PRIVILEGE_MATRIX_TTL_SECONDS"],
+    max_entries=CONFIG["CACHE"]["ROLE_GRAPH_MAX_ENTRIES"],
+)
+
+# Get the effective privilege matrix for the current account and role
+def get_privilege_matrix(session, refresh: bool = False) -> EffectivePrivilegeMatrix:
+    """Builds the matrix from one bulk GRANTS_TO_ROLES read and shares it across sessions."""
+    context = get_session_context(session)
+    key = (context.account, context.role)
+    if refresh:
+        _PRIVILEGE_MATRIX_CACHE.pop(key)
+
+    def load():
+        grants = query_pandas(session, ALL_ROLE_GRANTS_QUERY, downcast=False)
+        columns = ["GRANTEE_NAME", "GRANTED_ON", "NAME", "TABLE_CATALOG", "TABLE_SCHEMA", "PRIVILEGE"]
+        return EffectivePrivilegeMatrix(zip(*(grants[column].tolist() for column in columns)))
+
+    return _PRIVILEGE_MATRIX_CACHE.get_or_load(key, load)
@@ -0,0 +1,113 @@
+import re
+from utils.instrumentation import start_query, finish_query, record_cache_hit
+from utils.result_cache import get_result_cache, result_cache_key
+
+# Columns worth storing as categoricals: repeated names and labels
+CATEGORY_COLUMN_PATTERN = re.compile(r"(_NAME|_TYPE|_ROLE|^ROLE|STATUS|^KIND|^PRIVILEGE|^GRANTED_ON|^INVOKED_BY)$")
+# Columns that only need single precision
+FLOAT32_COLUMN_PATTERN = re.compile(r"CREDITS")
+# Repeated labels are only worth a categorical when they repeat enough
+MAX_CATEGORY_RATIO = 0.5
+
+def downcast_frame(df):
+    """
+    Shrinks a query result in place: repeated name and label columns become categoricals,
+    credit columns float32 and integer columns the smallest integer type that holds them.
+    """
+    # pandas and numpy are imported on use so pages that only run statements stay light
+    import numpy as np
+    import pandas as pd
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_string_dtype(series.dtype) and CATEGORY_COLUMN_PATTERN.search(column):
+            if len(series) and series.nunique(dropna=True) <= MAX_CATEGORY_RATIO * len(series):
+                df[column] = series.astype("category")
+        elif FLOAT32_COLUMN_PATTERN.search(column) and pd.api.types.is_numeric_dtype(series):
+            df[column] = series.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast="integer")
+    return df
+
+def widen_numeric(df):
+    """
+    Integer columns as int64 and floats as float64, in place. The connector returns NUMBER
+    columns as the narrowest type that fits each result or batch, so results written to one
+    file layout (a store partition, an export) would otherwise disagree on column types.
+    """
+    import pandas as pd
+    for column in df.columns:
+        dtype = df[column].dtype
+        if pd.api.types.is_integer_dtype(dtype):
+            # Nullable integer columns keep their missing values
+            nullable = isinstance(dtype, pd.api.extensions.ExtensionDtype)
+            df[column] = df[column].astype("Int64" if nullable else "int64")
+        elif pd.api.types.is_float_dtype(dtype):
+            df[column] = df[column].astype("float64")
+    return df
+
+def _last_query_id(history):
+    return history.queries[-1].query_id if history.queries else None
+
+def _run(session, sql, params, result_type):
+    """
+    Runs sql synchronously and returns (trace event, query ID, result). The query ID comes
+    from Snowpark's query listener: an async job would cost extra round trips, since
+    AsyncJob.result() polls the query status and then re-reads the result with RESULT_SCAN.
+    """
+    event = start_query(sql)
+    frame = session.sql(sql, params=params)
+    fetch = {"row": frame.collect, "pandas": frame.to_pandas, "pandas_batches": frame.to_pandas_batches}[result_type]
+    with session.query_history() as history:
+        try:
+            result = fetch()
+        except Exception as e:
+            finish_query(event, query_id=_last_query_id(history), error=e)
+            raise
+    return event, _last_query_id(history), result
+
+# Run a statement and fetch its Rows
+def query_rows(session, sql: str, params=None) -> list:
+    """Runs sql and returns its Rows, recording the statement on the page trace."""
+    event, query_id, rows = _run(session, sql, params, "row")
+    finish_query(event, rows, query_id)
+    return rows
+
+def cache_key(session, sql: str, params=None) -> tuple:
+    """Shared result cache key for sql under the session's account and active role."""
+    from utils.helpers import get_session_context
+    context = get_session_context(session)
+    return result_cache_key(context.account, context.role, sql, params)
+
+# Fetch a query result as a DataFrame
+def query_pandas(session, sql: str, params=None, downcast: bool = True, cached: bool = False):
+    """
+    Runs sql and builds the DataFrame straight from the connector's Arrow result
+    batches, without creating a Row object per record.
+    With cached, the result is shared with every session running under the same
+    account and role until its query class TTL runs out; treat it as read-only.
+    """
+    def load():
+        event, query_id, df = _run(session, sql, params, "pandas")
+        finish_query(event, df, query_id)
+        return downcast_frame(df) if downcast else df
+
+    if not cached:
+        return load()
+    key = cache_key(session, sql, params)
+    loaded = []
+    df = get_result_cache().get_or_load(key, key[2], lambda: loaded.append(True) or load())
+    if not loaded:
+        record_cache_hit(sql, df)
+    return df.copy(deep=False)
+
+# Fetch a query result one DataFrame batch at a time
+def iter_pandas_batches(session, sql: str, params=None, downcast: bool = True):
+    """Yields the result of sql as DataFrames of one Arrow result batch each."""
+    event, query_id, batches = _run(session, sql, params, "pandas_batches")
+    rows = 0
+    try:
+        for batch in batches:
+            rows += len(batch)
+            yield downcast_frame(batch) if downcast else batch
+    finally:
+        finish_query(event, query_id=query_id, rows=rows)
@@ -0,0 +1,277 @@
+import json
+import re
+from dataclasses import dataclass, field
+from config.config import CONFIG
+from utils.bulk_executor import execute_statements
+from utils.cache import TTLCache
+from utils.catalog import get_role_names, normalize_identifier
+from utils.helpers import get_session_context
+from utils.privilege_matrix import ALL_ROLE_GRANTS_QUERY
+from utils.query import query_pandas
+
+# Object types granted at account level, whose NAME is not part of the grant's identity
+ACCOUNT_GRANT_TYPE = "ACCOUNT"
+ROLE_GRANT_TYPE = "ROLE"
+
+# Identifier parts, quoted or not, of a dotted object name
+_NAME_PART_PATTERN = re.compile(r'"(?:[^"]|"")*"|[^.]+')
+_UNQUOTED_PATTERN = re.compile(r"^[A-Z_][A-Z0-9_$]*$")
+_PRIVILEGE_PATTERN = re.compile(r"^[A-Z][A-Z_ ]*$")
+
+def quote_identifier(name: str) -> str:
+    """Leaves plain upper-case identifiers as they are and double-quotes everything else."""
+    if _UNQUOTED_PATTERN.match(name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+def canonical_object_name(name: str) -> str:
+    """Normalizes each part of a dotted name the way Snowflake stores it and quotes where needed."""
+    parts = _NAME_PART_PATTERN.findall(name.strip())
+    if not parts or ".".join(parts) != name.strip():
+        raise ValueError(f"'{name}' is not a valid object name")
+    return ".".join(quote_identifier(normalize_identifier(part)) for part in parts)
+
+def grant_statement(action: str, grantee: str, granted_on: str, object_name: str, privilege: str) -> str:
+    """GRANT or REVOKE statement for one (grantee, granted_on, object, privilege) grant."""
+    if granted_on == ROLE_GRANT_TYPE:
+        what = f"ROLE {object_name}"
+    elif granted_on == ACCOUNT_GRANT_TYPE:
+        what = f"{privilege} ON ACCOUNT"
+    else:
+        what = f"{privilege} ON {granted_on.replace('_', ' ')} {object_name}"
+    if action == "GRANT":
+        return f"GRANT {what} TO ROLE {quote_identifier(grantee)}"
+    return f"REVOKE {what} FROM ROLE {quote_identifier(grantee)}"
+
+
+class GrantState:
+    """
+    Active grants to account roles from one bulk GRANTS_TO_ROLES read, grouped by grantee:
+    role -> set of (granted_on, object name, privilege). Role-to-role grants are stored as
+    ("ROLE", granted role, "USAGE"). Object names are canonical, so they compare equal to
+    names from a desired state model.
+    """
+
+    def __init__(self, by_role: dict):
+        self.by_role = by_role
+
+    @classmethod
+    def from_frame(cls, grants):
+        by_role = {}
+        columns = ["GRANTEE_NAME", "GRANTED_ON", "NAME", "TABLE_CATALOG", "TABLE_SCHEMA", "PRIVILEGE"]
+        for grantee, granted_on, name, catalog, schema, privilege in zip(*(grants[column].tolist() for column in columns)):
+            if granted_on == ACCOUNT_GRANT_TYPE:
+                object_name = ""
+            else:
+                parts = [name] if granted_on in (ROLE_GRANT_TYPE, "DATABASE", "WAREHOUSE") or not catalog else (
+                    [catalog, name] if granted_on == "SCHEMA" or not schema else [catalog, schema, name]
+                )
+                object_name = ".".join(quote_identifier(part) for part in parts)
+            by_role.setdefault(grantee, set()).add((granted_on, object_name, privilege))
+        return cls(by_role)
+
+    @property
+    def num_grants(self) -> int:
+        return sum(len(grants) for grants in self.by_role.values())
+
+    def grants_of(self, role: str) -> set:
+        return self.by_role.get(role, set())
+
+    def with_changes(self, granted: list, revoked: list):
+        """Copy with (grantee, granted_on, object, privilege) grants added and removed; untouched roles are shared."""
+        by_role = dict(self.by_role)
+        for grantee in {grant[0] for grant in granted} | {grant[0] for grant in revoked}:
+            by_role[grantee] = set(by_role.get(grantee, ()))
+        for grantee, *grant in granted:
+            by_role[grantee].add(tuple(grant))
+        for grantee, *grant in revoked:
+            by_role[grantee].discard(tuple(grant))
+        return GrantState(by_role)
+
+# Process-wide cache keyed by (account, role); PRISM's own applied plans are patched into it
+_GRANT_STATE_CACHE = TTLCache(
+    ttl_seconds=CONFIG["CACHE"]["GRANT_STATE_TTL_SECONDS"],
+    max_entries=CONFIG["CACHE"]["ROLE_GRAPH_MAX_ENTRIES"],
+)
+
+# Load every active grant to an account role
+def get_grant_state(session, refresh: bool = False) -> GrantState:
+    """Reads GRANTS_TO_ROLES in bulk once and shares the grouped state across sessions."""
+    context = get_session_context(session)
+    key = (context.account, context.role)
+    if refresh:
+        _GRANT_STATE_CACHE.pop(key)
+
+    def load():
+        return GrantState.from_frame(query_pandas(session, ALL_ROLE_GRANTS_QUERY, downcast=False))
+
+    return _GRANT_STATE_CACHE.get_or_load(key, load)
+
+def record_grant_state_change(session, granted: list, revoked: list):
+    """Applies grants made by PRISM to every cached state of the account, since ACCOUNT_USAGE lags behind."""
+    account = get_session_context(session).account
+    for key in _GRANT_STATE_CACHE.keys():
+        if key[0] == account:
+            _GRANT_STATE_CACHE.update(key, lambda state: state.with_changes(granted, revoked))
+
+
+@dataclass
+class DesiredState:
+    """Grants each managed role should hold: role -> set of (granted_on, object name, privilege)."""
+    roles: dict
+    managed_types: set  # Object types whose unlisted grants are revoked from managed roles
+    revoke_unlisted: bool = True
+
+# Read a desired state model
+def parse_desired_state(text: str, file_name: str) -> DesiredState:
+    """
+    Parses a YAML or JSON RBAC model of the form
+
+        revoke_unlisted: true
+        roles:
+          ANALYST:
+            roles: [VIEWER]
+            privileges:
+              DATABASE: {SALES: [USAGE]}
+              SCHEMA: {SALES.PUBLIC: [USAGE]}
+              ACCOUNT: [CREATE DATABASE]
+
+    Every role under "roles" is managed: unless revoke_unlisted is false, the grants it
+    holds on roles, or on any object type the model mentions, that the model does not
+    list are revoked. OWNERSHIP is never revoked.
+    """
+    if file_name.lower().endswith(".json"):
+        document = json.loads(text)
+    else:
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML models need the PyYAML package; upload a JSON file instead")
+        document = yaml.safe_load(text)
+    if not isinstance(document, dict) or not isinstance(document.get("roles"), dict):
+        raise ValueError("The model must be a mapping with a 'roles' mapping")
+
+    roles, managed_types = {}, {ROLE_GRANT_TYPE}
+    for role, spec in document["roles"].items():
+        role = normalize_identifier(str(role))
+        spec = spec or {}
+        if not isinstance(spec, dict):
+            raise ValueError(f"{role}: expected a mapping with 'roles' and 'privileges'")
+        wanted = set()
+        for granted_role in spec.get("roles") or []:
+            wanted.add((ROLE_GRANT_TYPE, quote_identifier(normalize_identifier(str(granted_role))), "USAGE"))
+        for object_type, objects in (spec.get("privileges") or {}).items():
+            object_type = str(object_type).strip().upper().replace(" ", "_")
+            managed_types.add(object_type)
+            if object_type == ACCOUNT_GRANT_TYPE:
+                objects = {"": objects}
+            if not isinstance(objects, dict):
+                raise ValueError(f"{role}: {object_type} privileges must map object names to privilege lists")
+            for object_name, privileges in objects.items():
+                object_name = canonical_object_name(str(object_name)) if object_name else ""
+                for privilege in privileges or []:
+                    privilege = " ".join(str(privilege).upper().split())
+                    if not _PRIVILEGE_PATTERN.match(privilege):
+                        raise ValueError(f"{role}: '{privilege}' is not a valid privilege")
+                    wanted.add((object_type, object_name, privilege))
+        roles[role] = wanted
+    return DesiredState(roles, managed_types, bool(document.get("revoke_unlisted", True)))
+
+
+@dataclass
+class RbacPlan:
+    """Minimal statements that converge the account on a desired state."""
+    creates: list  # Managed roles missing from SHOW ROLES
+    grants: list  # (grantee, granted_on, object, privilege) to grant
+    revokes: list  # (grantee, granted_on, object, privilege) to revoke
+    unchanged: int  # Desired grants already in place
+    missing_roles: list = field(default_factory=list)  # Granted roles that neither exist nor are managed
+
+    @property
+    def statements(self) -> int:
+        return len(self.creates) + len(self.grants) + len(self.revokes)
+
+    def rows(self) -> list:
+        """One row per statement, in the order apply_rbac_plan runs them."""
+        rows = [{"ACTION": "CREATE_ROLE", "GRANTEE": role, "GRANTED_ON": "", "OBJECT": "", "PRIVILEGE": "",
+                 "STATEMENT": f"CREATE ROLE IF NOT EXISTS {quote_identifier(role)}"} for role in self.creates]
+        for action, deltas in (("GRANT", self.grants), ("REVOKE", self.revokes)):
+            for grant in deltas:
+                rows.append({
+                    "ACTION": f"{action}_{'ROLE' if grant[1] == ROLE_GRANT_TYPE else 'PRIVILEGE'}",
+                    "GRANTEE": grant[0], "GRANTED_ON": grant[1], "OBJECT": grant[2], "PRIVILEGE": grant[3],
+                    "STATEMENT": grant_statement(action, *grant),
+                })
+        return rows
+
+# Diff the desired state against the current one
+def plan_rbac(session, desired: DesiredState, refresh: bool = False) -> RbacPlan:
+    """
+    Computes the grants and revokes that converge every managed role, by set difference
+    per role against the bulk grant state. Costs one GRANTS_TO_ROLES read and one SHOW
+    ROLES, both cached, however many roles and grants the model has.
+    """
+    existing_roles = set(get_role_names(session, refresh=refresh))
+    state = get_grant_state(session, refresh=refresh)
+
+    grants, revokes, unchanged = [], [], 0
+    for role, wanted in desired.roles.items():
+        current = state.grants_of(role)
+        unchanged += len(wanted & current)
+        grants.extend((role,) + grant for grant in sorted(wanted - current))
+        if desired.revoke_unlisted:
+            unlisted = {
+                grant for grant in current - wanted
+                if grant[0] in desired.managed_types and grant[2] != "OWNERSHIP"
+            }
+            revokes.extend((role,) + grant for grant in sorted(unlisted))
+
+    known_roles = {quote_identifier(role) for role in existing_roles | set(desired.roles)}
+    missing_roles = sorted({grant[2] for grant in grants if grant[1] == ROLE_GRANT_TYPE} - known_roles)
+    return RbacPlan(
+        creates=sorted(set(desired.roles) - existing_roles),
+        grants=grants,
+        revokes=revokes,
+        unchanged=unchanged,
+        missing_roles=missing_roles,
+    )
+
+def _grant_of(row) -> tuple:
+    return (row["GRANTEE"], row["GRANTED_ON"], row["OBJECT"], row["PRIVILEGE"])
+
+# Run the statements of a plan
+def apply_rbac_plan(session, plan: RbacPlan, max_concurrency: int = None) -> list:
+    """
+    Creates missing managed roles, then runs every grant and revoke concurrently.
+    Statements touching a role that could not be created, or a granted role that does
+    not exist, are reported as failed without being run. Successful changes are patched
+    into the cached grant state.
+    Returns:
+        plan.rows(), each with the STATUS, MESSAGE, QUERY_ID, ATTEMPTS and ELAPSED_SECONDS
+        of execute_statements
+    """
+    rows = plan.rows()
+    create_rows = rows[:len(plan.creates)]
+    change_rows = rows[len(plan.creates):]
+    for row, result in zip(create_rows, execute_statements(session, [row["STATEMENT"] for row in create_rows], max_concurrency)):
+        row.update(result)
+
+    unavailable = {row["GRANTEE"] for row in create_rows if row["STATUS"] != "SUCCESS"}
+    unavailable_objects = set(plan.missing_roles) | {quote_identifier(role) for role in unavailable}
+    runnable = []
+    for row in change_rows:
+        if row["GRANTEE"] in unavailable or (row["GRANTED_ON"] == ROLE_GRANT_TYPE and row["OBJECT"] in unavailable_objects):
+            row.update(STATUS="FAILED", MESSAGE="Not attempted: a role it depends on does not exist",
+                       QUERY_ID=None, ATTEMPTS=0, ELAPSED_SECONDS=0.0)
+        else:
+            runnable.append(row)
+    for row, result in zip(runnable, execute_statements(session, [row["STATEMENT"] for row in runnable], max_concurrency)):
+        row.update(result)
+
+    succeeded = [row for row in change_rows if row["STATUS"] == "SUCCESS"]
+    record_grant_state_change(
+        session,
+        [_grant_of(row) for row in succeeded if row["ACTION"].startswith("GRANT")],
+        [_grant_of(row) for row in succeeded if row["ACTION"].startswith("REVOKE")],
+    )
+    return rows
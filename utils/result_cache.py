@@ -0,0 +1,133 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from config.config import CONFIG
+
+# Quoted literals and identifiers are kept verbatim; everything else has its whitespace collapsed
+_QUOTED_PATTERN = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+def normalize_sql(sql: str) -> str:
+    """Collapses whitespace outside quotes and drops a trailing semicolon, so formatting does not split cache keys."""
+    parts = _QUOTED_PATTERN.split(sql.strip().rstrip(";"))
+    return "".join(part if index % 2 else re.sub(r"\s+", " ", part) for index, part in enumerate(parts))
+
+def query_class(sql: str) -> str:
+    """Cache class of a query, which decides how long its results are reused."""
+    upper = sql.upper()
+    if "SNOWFLAKE.ACCOUNT_USAGE." in upper:
+        return "ACCOUNT_USAGE"
+    if "INFORMATION_SCHEMA." in upper:
+        return "INFORMATION_SCHEMA"
+    if CONFIG["TABLES"]["AUDIT_LOG"].upper() in upper:
+        return "AUDIT_LOG"
+    return "DEFAULT"
+
+def frame_bytes(df) -> int:
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+class ResultCache:
+    """
+    Process-wide cache of query results (DataFrames) shared by every Streamlit session.
+
+    Keys carry the account and the caller's active role, so a result is only ever served
+    to sessions running under the same role that fetched it. Entries expire after the TTL
+    of their query class, and the least recently used entries are evicted once the total
+    estimated size passes max_bytes. Concurrent misses on the same key wait for one load.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: dict):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._loading = {}
+        self._stats = {}
+
+    def _count(self, cls, outcome, amount=1):
+        counters = self._stats.setdefault(cls, {"HITS": 0, "MISSES": 0, "EVICTIONS": 0, "EXPIRATIONS": 0})
+        counters[outcome] += amount
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def get(self, key, cls):
+        """Returns the cached value or None, counting a hit or a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._drop(key)
+                self._count(cls, "EXPIRATIONS")
+                entry = None
+            if entry is None:
+                self._count(cls, "MISSES")
+                return None
+            self._entries.move_to_end(key)
+            self._count(cls, "HITS")
+            return entry[2]
+
+    def set(self, key, cls, value, size: int):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                return
+            ttl = self.ttl_seconds.get(cls, self.ttl_seconds["DEFAULT"])
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._count(oldest[2], "EVICTIONS")
+
+    def get_or_load(self, key, cls, loader, sizer=frame_bytes):
+        """Returns the cached value for key, or loads it once even if several sessions miss together."""
+        value = self.get(key, cls)
+        if value is not None:
+            return value
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    return entry[2]
+            try:
+                value = loader()
+                self.set(key, cls, value, sizer(value))
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        return value
+
+    def discard_where(self, predicate) -> int:
+        with self._lock:
+            doomed = [key for key in self._entries if predicate(key)]
+            for key in doomed:
+                self._drop(key)
+            return len(doomed)
+
+    def stats(self) -> dict:
+        """Counters per query class plus current entry count and size."""
+        with self._lock:
+            return {
+                "ENTRIES": len(self._entries),
+                "BYTES": self._bytes,
+                "MAX_BYTES": self.max_bytes,
+                "CLASSES": {cls: dict(counters) for cls, counters in self._stats.items()},
+            }
+
+_RESULT_CACHE = ResultCache(
+    max_bytes=CONFIG["RESULT_CACHE"]["MAX_BYTES"],
+    ttl_seconds=CONFIG["RESULT_CACHE"]["TTL_SECONDS"],
+)
+
+def get_result_cache() -> ResultCache:
+    return _RESULT_CACHE
+
+def result_cache_key(account: str, role: str, sql: str, params=None) -> tuple:
+    """(account, role, query class, normalized SQL, bind params)"""
+    return (account, role, query_class(sql), normalize_sql(sql), tuple(params or ()))
@@ -0,0 +1,113 @@
+import numpy as np
+from config.config import CONFIG
+from utils.cache import TTLCache
+from utils.helpers import get_session_context
+from utils.query import query_pandas
+
+# Active role-to-role grants: the grantee role inherits the granted role
+ROLE_EDGES_QUERY = """
+    SELECT
+        GRANTEE_NAME AS PARENT_ROLE,
+        NAME AS CHILD_ROLE
+    FROM SNOWFLAKE.ACCOUNT_USAGE.GRANTS_TO_ROLES
+    WHERE GRANTED_ON = 'ROLE'
+    AND GRANTED_TO = 'ROLE'
+    AND PRIVILEGE = 'USAGE'
+    AND DELETED_ON IS NULL
+"""
+
+def _csr(sources, targets, num_nodes):
+    """Sorted CSR adjacency: neighbours of i are targets[offsets[i]:offsets[i + 1]]."""
+    order = np.lexsort((targets, sources))
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_nodes), out=offsets[1:])
+    return offsets, targets[order].astype(np.int32)
+
+
+class RoleGraph:
+    """
+    Immutable role hierarchy with integer-interned role ids and CSR adjacency in both
+    directions, so child and parent lookups cost O(degree).
+
+    Edges point from parent to child: a parent role has been granted its child roles
+    and inherits their privileges (ACCOUNTADMIN -> SYSADMIN).
+    """
+
+    def __init__(self, names, parent_ids, child_ids):
+        self.names = list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        num_roles = len(self.names)
+        self.child_offsets, self.child_targets = _csr(parent_ids, child_ids, num_roles)
+        self.parent_offsets, self.parent_targets = _csr(child_ids, parent_ids, num_roles)
+
+    @classmethod
+    def from_edges(cls, edges, roles=()):
+        """
+        Builds the graph from (parent role, child role) pairs.
+        roles lists extra role names that should exist even without edges.
+        """
+        edges = list(edges)
+        names = sorted({name for edge in edges for name in edge} | set(roles))
+        ids = {name: i for i, name in enumerate(names)}
+        pairs = np.array([(ids[parent], ids[child]) for parent, child in edges], dtype=np.int64).reshape(-1, 2)
+        # Duplicate grants collapse to one edge
+        pairs = np.unique(pairs, axis=0)
+        return cls(names, pairs[:, 0], pairs[:, 1])
+
+    @property
+    def num_roles(self) -> int:
+        return len(self.names)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.child_targets)
+
+    def edges(self):
+        """Yields every (parent, child) role name pair."""
+        for parent in range(self.num_roles):
+            for child in self.child_ids(parent):
+                yield self.names[parent], self.names[child]
+
+    def child_ids(self, role_id: int):
+        return self.child_targets[self.child_offsets[role_id]:self.child_offsets[role_id + 1]]
+
+    def parent_ids(self, role_id: int):
+        return self.parent_targets[self.parent_offsets[role_id]:self.parent_offsets[role_id + 1]]
+
+    def children(self, role: str) -> list:
+        """Roles granted directly to role."""
+        role_id = self.ids.get(role)
+        return [] if role_id is None else [self.names[i] for i in self.child_ids(role_id)]
+
+    def parents(self, role: str) -> list:
+        """Roles that role is granted to directly."""
+        role_id = self.ids.get(role)
+        return [] if role_id is None else [self.names[i] for i in self.parent_ids(role_id)]
+
+    def out_degree(self, role_id: int) -> int:
+        return int(self.child_offsets[role_id + 1] - self.child_offsets[role_id])
+
+    def root_ids(self):
+        """Roles that are not granted to any other role."""
+        in_degree = np.diff(self.parent_offsets)
+        return np.flatnonzero(in_degree == 0)
+
+# Process-wide cache keyed by (account, role)
+_ROLE_GRAPH_CACHE = TTLCache(
+    ttl_seconds=CONFIG["CACHE"]["ROLE_GRAPH_TTL_SECONDS"],
+    max_entries=CONFIG["CACHE"]["ROLE_GRAPH_MAX_ENTRIES"],
+)
+
+# Load the role graph for the current account and role
+def get_role_graph(session, refresh: bool = False) -> RoleGraph:
+    """Builds the role graph from one GRANTS_TO_ROLES read and shares it across sessions."""
+    context = get_session_context(session)
+    key = (context.account, context.role)
+    if refresh:
+        _ROLE_GRAPH_CACHE.pop(key)
+
+    def load():
+        edges = query_pandas(session, ROLE_EDGES_QUERY, downcast=False)
+        return RoleGraph.from_edges(zip(edges["PARENT_ROLE"].tolist(), edges["CHILD_ROLE"].tolist()))
+
+    return _ROLE_GRAPH_CACHE.get_or_load(key, load)
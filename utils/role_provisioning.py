@@ -0,0 +1,203 @@
+import csv
+import io
+import itertools
+import re
+from dataclasses import dataclass, field
+from utils.bulk_executor import execute_statements
+from utils.catalog import get_role_names, normalize_identifier
+from utils.role_reachability import get_role_reachability
+
+# Default environments and role tiers, most privileged tier first
+ENVIRONMENTS = ["DEV", "TEST", "PROD"]
+ROLE_TIERS = ["ADMIN", "DEVELOPER", "ANALYST", "VIEWER"]
+
+# Spec fields; list-valued fields accept several values separated by ";" in CSV files
+SPEC_FIELDS = ("PREFIX", "ENVIRONMENTS", "TIERS", "PARENT_ROLE")
+SPEC_ALIASES = {"ENVIRONMENT": "ENVIRONMENTS", "TIER": "TIERS", "PREFIXES": "PREFIX"}
+
+# Only plain identifiers are accepted, since names are spliced into DDL
+IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*$")
+
+# Status of a CREATE ... IF NOT EXISTS that found the object already there
+ALREADY_EXISTS_PATTERN = re.compile(r"already exists", re.IGNORECASE)
+
+
+@dataclass
+class ProvisioningPlan:
+    """Roles and role grants a spec asks for, split into what is missing and what already exists."""
+    roles: list  # Every role in the spec, in spec order
+    creates: list  # Roles missing from SHOW ROLES
+    grants: list  # (grantee role, granted role) pairs not yet granted
+    skipped_roles: list = field(default_factory=list)
+    skipped_grants: list = field(default_factory=list)
+
+    @property
+    def statements(self) -> int:
+        return len(self.creates) + len(self.grants)
+
+def _values(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        items = value
+    else:
+        items = str(value).split(";")
+    return [str(item).strip() for item in items if str(item).strip()]
+
+def _normalize_entry(entry: dict, position: str) -> list:
+    """Expands one spec entry into (prefix, environment, tiers, parent role) tuples."""
+    fields = {}
+    for key, value in entry.items():
+        key = str(key).strip().upper()
+        fields[SPEC_ALIASES.get(key, key)] = value
+    unknown = set(fields) - set(SPEC_FIELDS)
+    if unknown:
+        raise ValueError(f"{position}: unknown field(s) {', '.join(sorted(unknown))}")
+
+    prefixes = _values(fields.get("PREFIX"))
+    if not prefixes:
+        raise ValueError(f"{position}: a prefix is required")
+    environments = _values(fields.get("ENVIRONMENTS")) or ENVIRONMENTS
+    tiers = _values(fields.get("TIERS")) or ROLE_TIERS
+    parents = _values(fields.get("PARENT_ROLE"))
+    if len(parents) > 1:
+        raise ValueError(f"{position}: only one parent role is allowed")
+    for name in prefixes + environments + tiers + parents:
+        if not IDENTIFIER_PATTERN.match(name):
+            raise ValueError(f"{position}: '{name}' is not a valid unquoted identifier")
+
+    parent = normalize_identifier(parents[0]) if parents else None
+    tiers = [tier.upper() for tier in tiers]
+    return [
+        (prefix.upper(), environment.upper(), tiers, parent)
+        for prefix, environment in itertools.product(prefixes, environments)
+    ]
+
+# Read a provisioning spec
+def parse_spec(text: str, file_name: str) -> list:
+    """
+    Parses a CSV or YAML provisioning spec.
+    CSV files have a header row with PREFIX and optionally ENVIRONMENTS, TIERS and
+    PARENT_ROLE columns; YAML files hold a list of mappings with the same keys, or a
+    mapping with that list under "roles". Missing environments and tiers default to
+    ENVIRONMENTS and ROLE_TIERS.
+    Args:
+        text: File contents
+        file_name: Used to pick the format by extension
+    Returns:
+        List of (prefix, environment, tiers, parent role) tuples
+    """
+    if file_name.lower().endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML specs need the PyYAML package; upload a CSV file instead")
+        document = yaml.safe_load(text) or []
+        if isinstance(document, dict):
+            document = document.get("roles", document.get("ROLES", []))
+        if not isinstance(document, list) or not all(isinstance(entry, dict) for entry in document):
+            raise ValueError("A YAML spec must be a list of mappings")
+        return expand_spec(document)
+
+    reader = csv.DictReader(io.StringIO(text))
+    entries, positions = [], []
+    for row in reader:
+        entries.append({key: value for key, value in row.items() if key and value})
+        positions.append(f"Line {reader.line_num}")
+    return expand_spec(entries, positions)
+
+def expand_spec(entries: list, positions: list = None) -> list:
+    """Validates spec entries (mappings of SPEC_FIELDS) and expands them per prefix and environment."""
+    positions = positions or [f"Entry {number}" for number in range(1, len(entries) + 1)]
+    expanded = []
+    for entry, position in zip(entries, positions):
+        expanded.extend(_normalize_entry(entry, position))
+    if not expanded:
+        raise ValueError("The spec does not list any roles")
+    return expanded
+
+def environment_role_name(prefix: str, environment: str, tier: str) -> str:
+    return f"{prefix}_{environment}_{tier}"
+
+# Diff a spec against the roles and grants that already exist
+def plan_provisioning(session, spec: list, refresh: bool = False) -> ProvisioningPlan:
+    """
+    Works out the CREATE ROLE and GRANT ROLE statements the spec still needs.
+    Role existence comes from the cached SHOW ROLES listing and grant existence from
+    the cached role reachability index, so planning costs no extra round trip once
+    those are loaded. Each tier is granted to the tier listed before it, and the first
+    tier to the entry's parent role.
+    Args:
+        session: Snowpark session
+        spec: Entries from parse_spec
+        refresh: Reload both snapshots first
+    Returns:
+        ProvisioningPlan
+    """
+    existing_roles = set(get_role_names(session, refresh=refresh))
+    reachability = get_role_reachability(session, refresh=refresh)
+
+    roles, wanted_grants = [], []
+    for prefix, environment, tiers, parent in spec:
+        names = [environment_role_name(prefix, environment, tier) for tier in tiers]
+        roles.extend(names)
+        wanted_grants.extend(zip(names, names[1:]))
+        if parent:
+            wanted_grants.append((parent, names[0]))
+    roles = list(dict.fromkeys(roles))
+    wanted_grants = list(dict.fromkeys(wanted_grants))
+
+    def granted(grantee, role):
+        grantee_id, role_id = reachability.ids.get(grantee), reachability.ids.get(role)
+        return grantee_id is not None and role_id is not None and role_id in reachability.children[grantee_id]
+
+    plan = ProvisioningPlan(roles=roles, creates=[], grants=[])
+    for role in roles:
+        (plan.skipped_roles if role in existing_roles else plan.creates).append(role)
+    for grantee, role in wanted_grants:
+        (plan.skipped_grants if granted(grantee, role) else plan.grants).append((grantee, role))
+    return plan
+
+# Run the statements of a plan
+def apply_provisioning(session, plan: ProvisioningPlan, max_concurrency: int = None) -> list:
+    """
+    Creates the missing roles concurrently, then issues the missing grants concurrently.
+    Grants that involve a role which neither existed nor was created are not attempted.
+    Returns:
+        One execute_statements result per planned statement, each with ACTION
+        ("CREATE_ROLE"/"GRANT_ROLE") and OBJECT added; creates also carry EXISTED (the role
+        was created by someone else after the SHOW ROLES snapshot) and grants GRANTEE and
+        GRANTED_ROLE
+    """
+    # IF NOT EXISTS keeps a role created since the SHOW ROLES snapshot from failing the run
+    create_results = execute_statements(
+        session, [f"CREATE ROLE IF NOT EXISTS {role}" for role in plan.creates], max_concurrency
+    )
+    for role, result in zip(plan.creates, create_results):
+        result.update(ACTION="CREATE_ROLE", OBJECT=role, EXISTED=ALREADY_EXISTS_PATTERN.search(result["MESSAGE"]) is not None)
+
+    failed_roles = {result["OBJECT"] for result in create_results if result["STATUS"] != "SUCCESS"}
+    missing_roles = failed_roles | (
+        {name for grant in plan.grants for name in grant}
+        - set(plan.roles)
+        - set(get_role_names(session))
+    )
+    runnable = [grant for grant in plan.grants if not missing_roles.intersection(grant)]
+    grant_results = execute_statements(
+        session, [f"GRANT ROLE {role} TO ROLE {grantee}" for grantee, role in runnable], max_concurrency
+    )
+    outcome = dict(zip(runnable, grant_results))
+
+    results = list(create_results)
+    for grantee, role in plan.grants:
+        result = outcome.get((grantee, role))
+        if result is None:
+            blocked = ", ".join(sorted(missing_roles.intersection((grantee, role))))
+            result = {
+                "STATEMENT": f"GRANT ROLE {role} TO ROLE {grantee}", "STATUS": "FAILED",
+                "MESSAGE": f"Not attempted: missing role(s) {blocked}", "QUERY_ID": None,
+                "ATTEMPTS": 0, "ELAPSED_SECONDS": 0.0,
+            }
+        result.update(ACTION="GRANT_ROLE", OBJECT=grantee, GRANTEE=grantee, GRANTED_ROLE=role)
+        results.append(result)
+    return results
@@ -0,0 +1,269 @@
+import threading
+from config.config import CONFIG
+from utils.cache import TTLCache
+from utils.helpers import get_session_context, normalize_identifier
+from utils.query import query_pandas
+
+# Active role grants to users
+USER_GRANTS_QUERY = """
+    SELECT
+        GRANTEE_NAME AS USER_NAME,
+        ROLE
+    FROM SNOWFLAKE.ACCOUNT_USAGE.GRANTS_TO_USERS
+    WHERE DELETED_ON IS NULL
+"""
+
+def iter_bits(mask: int):
+    """Yields the positions of the set bits of mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def _strongly_connected_components(num_nodes, children):
+    """
+    Iterative Tarjan. Returns (component id per node, components) with components
+    listed in reverse topological order, so every component comes after the
+    components it points to.
+    """
+    index_of = [-1] * num_nodes
+    low_link = [0] * num_nodes
+    on_stack = [False] * num_nodes
+    component_of = [-1] * num_nodes
+    stack, components = [], []
+    counter = 0
+    for root in range(num_nodes):
+        if index_of[root] != -1:
+            continue
+        work = [(root, iter(children[root]))]
+        index_of[root] = low_link[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            node, neighbours = work[-1]
+            advanced = False
+            for neighbour in neighbours:
+                if index_of[neighbour] == -1:
+                    index_of[neighbour] = low_link[neighbour] = counter
+                    counter += 1
+                    stack.append(neighbour)
+                    on_stack[neighbour] = True
+                    work.append((neighbour, iter(children[neighbour])))
+                    advanced = True
+                    break
+                if on_stack[neighbour]:
+                    low_link[node] = min(low_link[node], index_of[neighbour])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low_link[parent] = min(low_link[parent], low_link[node])
+            if low_link[node] == index_of[node]:
+                members = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component_of[member] = len(components)
+                    members.append(member)
+                    if member == node:
+                        break
+                components.append(members)
+    return component_of, components
+
+
+class RoleReachabilityIndex:
+    """
+    Transitive closure of the role hierarchy stored as one descendant and one ancestor
+    bitset (a Python int over role ids) per role. "Does A inherit B" is a single bit
+    test; listing every inherited or inheriting role walks only the set bits.
+
+    The closure is computed once over the SCC-condensed graph. Added edges are applied
+    incrementally by OR-ing the new reach into the affected ancestors and descendants.
+    Removed edges trigger a rebuild, because losing reach cannot be undone with ORs.
+    """
+
+    def __init__(self, edges, user_roles=None, roles=()):
+        """
+        Args:
+            edges: (parent role, child role) pairs; the parent inherits the child
+            user_roles: Optional mapping of user name -> directly granted role names
+            roles: Extra role names to index even if they have no edges
+        """
+        self.names = []
+        self.ids = {}
+        self.children = []
+        self.parents = []
+        for parent, child in edges:
+            self._link(self._intern(parent), self._intern(child))
+        for role in roles:
+            self._intern(role)
+        self.user_roles = {user: set(granted) for user, granted in (user_roles or {}).items()}
+        for granted in self.user_roles.values():
+            for role in granted:
+                self._intern(role)
+        self._lock = threading.RLock()
+        self._rebuild()
+
+    def _intern(self, name):
+        role_id = self.ids.get(name)
+        if role_id is None:
+            role_id = len(self.names)
+            self.ids[name] = role_id
+            self.names.append(name)
+            self.children.append(set())
+            self.parents.append(set())
+            if hasattr(self, "_descendants"):
+                self._descendants.append(0)
+                self._ancestors.append(0)
+        return role_id
+
+    def _link(self, parent_id, child_id):
+        self.children[parent_id].add(child_id)
+        self.parents[child_id].add(parent_id)
+
+    def _rebuild(self):
+        num_roles = len(self.names)
+        component_of, components = _strongly_connected_components(num_roles, self.children)
+        members = [sum(1 << member for member in component) for component in components]
+
+        # Components arrive sinks first, so every child component is finished before its parents
+        component_descendants = [0] * len(components)
+        for component_id, component in enumerate(components):
+            reach = 0
+            cyclic = len(component) > 1
+            for node in component:
+                for child in self.children[node]:
+                    child_component = component_of[child]
+                    if child_component == component_id:
+                        cyclic = True
+                    else:
+                        reach |= component_descendants[child_component] | members[child_component]
+            component_descendants[component_id] = reach | (members[component_id] if cyclic else 0)
+
+        component_ancestors = [0] * len(components)
+        for component_id in range(len(components) - 1, -1, -1):
+            reach = 0
+            for node in components[component_id]:
+                for parent in self.parents[node]:
+                    parent_component = component_of[parent]
+                    if parent_component != component_id:
+                        reach |= component_ancestors[parent_component] | members[parent_component]
+            cyclic = component_descendants[component_id] & members[component_id]
+            component_ancestors[component_id] = reach | (members[component_id] if cyclic else 0)
+
+        self._descendants = [component_descendants[component_of[node]] for node in range(num_roles)]
+        self._ancestors = [component_ancestors[component_of[node]] for node in range(num_roles)]
+
+    def _names_of(self, mask):
+        return sorted(self.names[role_id] for role_id in iter_bits(mask))
+
+    def descendants(self, role: str) -> list:
+        """Every role that role inherits, directly or transitively."""
+        role_id = self.ids.get(role)
+        return [] if role_id is None else self._names_of(self._descendants[role_id])
+
+    def ancestors(self, role: str) -> list:
+        """Every role that inherits role, directly or transitively."""
+        role_id = self.ids.get(role)
+        return [] if role_id is None else self._names_of(self._ancestors[role_id])
+
+    def inherits(self, role: str, other: str) -> bool:
+        """True if role is other or inherits it."""
+        role_id, other_id = self.ids.get(role), self.ids.get(other)
+        if role_id is None or other_id is None:
+            return False
+        return role_id == other_id or bool(self._descendants[role_id] >> other_id & 1)
+
+    def holder_mask(self, role: str) -> int:
+        """Bitset of role itself plus every role that inherits it."""
+        role_id = self.ids.get(role)
+        return 0 if role_id is None else self._ancestors[role_id] | (1 << role_id)
+
+    def users_holding(self, role: str) -> list:
+        """Users granted role directly or through any role that inherits it."""
+        holders = self.holder_mask(role)
+        return sorted(
+            user for user, roles in self.user_roles.items()
+            if any(holders >> self.ids[granted] & 1 for granted in roles)
+        )
+
+    def add_edge(self, parent: str, child: str):
+        """Applies GRANT ROLE child TO ROLE parent."""
+        with self._lock:
+            parent_id, child_id = self._intern(parent), self._intern(child)
+            self._link(parent_id, child_id)
+            if parent_id == child_id or self._descendants[child_id] >> parent_id & 1:
+                # The edge closes a cycle; let the condensation handle it
+                self._rebuild()
+                return
+            if self._descendants[parent_id] >> child_id & 1:
+                return
+            gained_descendants = self._descendants[child_id] | (1 << child_id)
+            gained_ancestors = self._ancestors[parent_id] | (1 << parent_id)
+            for role_id in iter_bits(gained_ancestors):
+                self._descendants[role_id] |= gained_descendants
+            for role_id in iter_bits(gained_descendants):
+                self._ancestors[role_id] |= gained_ancestors
+
+    def remove_edge(self, parent: str, child: str):
+        """Applies REVOKE ROLE child FROM ROLE parent."""
+        with self._lock:
+            parent_id, child_id = self.ids.get(parent), self.ids.get(child)
+            if parent_id is None or child_id is None or child_id not in self.children[parent_id]:
+                return
+            self.children[parent_id].discard(child_id)
+            self.parents[child_id].discard(parent_id)
+            self._rebuild()
+
+# Process-wide cache keyed by (account, role); PRISM's own grants are applied to every entry of the account
+_REACHABILITY_CACHE = TTLCache(
+    ttl_seconds=CONFIG["CACHE"]["ROLE_GRAPH_TTL_SECONDS"],
+    max_entries=CONFIG["CACHE"]["ROLE_GRAPH_MAX_ENTRIES"],
+)
+
+# Get the reachability index for the current account and role
+def get_role_reachability(session, refresh: bool = False) -> RoleReachabilityIndex:
+    """Builds the index from the cached role graph and one GRANTS_TO_USERS read."""
+    context = get_session_context(session)
+    key = (context.account, context.role)
+    if refresh:
+        _REACHABILITY_CACHE.pop(key)
+
+    def load():
+        # The numpy-backed graph is only imported once an index is actually built
+        from utils.role_graph import get_role_graph
+        graph = get_role_graph(session, refresh=refresh)
+        user_roles = {}
+        grants = query_pandas(session, USER_GRANTS_QUERY, downcast=False)
+        for user, role in zip(grants["USER_NAME"].tolist(), grants["ROLE"].tolist()):
+            user_roles.setdefault(user, set()).add(role)
+        return RoleReachabilityIndex(graph.edges(), user_roles)
+
+    return _REACHABILITY_CACHE.get_or_load(key, load)
+
+def get_cached_role_reachability(session):
+    """The index for the current account and role if one is already built, else None (never queries)."""
+    context = get_session_context(session)
+    return _REACHABILITY_CACHE.get((context.account, context.role))
+
+# Record a role grant or revoke made by PRISM
+def record_role_edge_change(session, parent: str, child: str, granted: bool):
+    """
+    Updates every cached index of the current account after GRANT/REVOKE ROLE child TO/FROM ROLE parent,
+    without waiting for ACCOUNT_USAGE to catch up. parent and child are identifiers as written in
+    the statement; they are normalized to the names Snowflake stores.
+    """
+    parent, child = normalize_identifier(parent), normalize_identifier(child)
+    account = get_session_context(session).account
+    for key in _REACHABILITY_CACHE.keys():
+        if key[0] != account:
+            continue
+        index = _REACHABILITY_CACHE.get(key)
+        if index is None:
+            continue
+        if granted:
+            index.add_edge(parent, child)
+        else:
+            index.remove_edge(parent, child)
@@ -0,0 +1,125 @@
+import json
+import numpy as np
+import pandas as pd
+
+# One row per database: its latest daily snapshot plus the whole range as two aligned arrays
+# (day offsets from the range start and total bytes), so the result stays one row per database
+STORAGE_SUMMARY_QUERY = """
+    SELECT
+        DATABASE_NAME,
+        MAX(USAGE_DATE) AS LATEST_DATE,
+        MAX_BY(COALESCE(AVERAGE_DATABASE_BYTES, 0), USAGE_DATE) AS DATABASE_BYTES,
+        MAX_BY(COALESCE(AVERAGE_FAILSAFE_BYTES, 0), USAGE_DATE) AS FAILSAFE_BYTES,
+        ARRAY_AGG(DATEDIFF(DAY, TO_DATE(?), USAGE_DATE)) WITHIN GROUP (ORDER BY USAGE_DATE) AS TREND_DAYS,
+        ARRAY_AGG(COALESCE(AVERAGE_DATABASE_BYTES, 0) + COALESCE(AVERAGE_FAILSAFE_BYTES, 0))
+            WITHIN GROUP (ORDER BY USAGE_DATE) AS TREND_BYTES
+    FROM SNOWFLAKE.ACCOUNT_USAGE.DATABASE_STORAGE_USAGE_HISTORY
+    WHERE USAGE_DATE >= TO_DATE(?)
+    AND USAGE_DATE <= TO_DATE(?)
+    GROUP BY DATABASE_NAME
+"""
+
+BYTES_PER_GB = 1024 ** 3
+
+def storage_summary_query(start_date, end_date) -> tuple:
+    """SQL and bind params of the storage summary for start_date through end_date."""
+    return STORAGE_SUMMARY_QUERY, [start_date.isoformat(), start_date.isoformat(), end_date.isoformat()]
+
+def _array(value) -> list:
+    # The connector returns ARRAY columns as JSON text
+    if value is None:
+        return []
+    return json.loads(value) if isinstance(value, str) else list(value)
+
+
+class StorageTrend:
+    """
+    Daily total bytes per database as a dense (database x day) matrix, NaN where a database
+    has no row for a day, with growth figures computed across all databases at once.
+    """
+
+    def __init__(self, summary: pd.DataFrame):
+        """summary is the non-empty result of the storage summary query."""
+        days = [np.asarray(_array(value), dtype=np.int64) for value in summary["TREND_DAYS"]]
+        values = [np.asarray(_array(value), dtype=np.float64) for value in summary["TREND_BYTES"]]
+        lengths = np.array([len(day) for day in days], dtype=np.int64)
+
+        # Day offsets count from the range start, and each array ends on its LATEST_DATE
+        latest = pd.to_datetime(summary["LATEST_DATE"]).to_numpy()
+        last_offsets = np.array([day[-1] if len(day) else 0 for day in days], dtype="timedelta64[D]")
+        start = (latest - last_offsets).min()
+        self.dates = pd.date_range(start, latest.max(), freq="D")
+        self.databases = summary["DATABASE_NAME"].astype(str).to_numpy()
+        self.matrix = np.full((len(summary), len(self.dates)), np.nan)
+
+        if lengths.sum():
+            rows = np.repeat(np.arange(len(summary)), lengths)
+            columns = np.concatenate(days)
+            inside = (columns >= 0) & (columns < len(self.dates))
+            # A database dropped and re-created under the same name can have two rows for a day
+            filled = np.zeros_like(self.matrix)
+            np.add.at(filled, (rows[inside], columns[inside]), np.concatenate(values)[inside])
+            present = np.zeros(self.matrix.shape, dtype=bool)
+            present[rows[inside], columns[inside]] = True
+            self.matrix[present] = filled[present]
+
+    def growth(self) -> pd.DataFrame:
+        """
+        Per database: FIRST_GB and CURRENT_GB (first and last day with data), CHANGE_GB,
+        CHANGE_PCT, AVG_DAILY_GROWTH_GB over the days between them, and CHANGE_7D_GB
+        against the value seven days before the last one (carried forward over gaps).
+        """
+        present = ~np.isnan(self.matrix)
+        has_data = present.any(axis=1)
+        num_days = self.matrix.shape[1]
+        first_index = present.argmax(axis=1)
+        last_index = num_days - 1 - present[:, ::-1].argmax(axis=1)
+        rows = np.arange(len(self.matrix))
+
+        first = self.matrix[rows, first_index] / BYTES_PER_GB
+        current = self.matrix[rows, last_index] / BYTES_PER_GB
+        carried = pd.DataFrame(self.matrix).ffill(axis=1).to_numpy() / BYTES_PER_GB
+        week_ago = carried[rows, np.maximum(last_index - 7, first_index)]
+        span = (last_index - first_index).astype(np.float64)
+
+        change = current - first
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change_pct = np.where(first > 0, change / first * 100, np.nan)
+            daily = np.where(span > 0, change / span, np.nan)
+        frame = pd.DataFrame({
+            "DATABASE_NAME": self.databases,
+            "LATEST_DATE": self.dates[last_index].date,
+            "CURRENT_GB": current,
+            "FIRST_GB": first,
+            "CHANGE_GB": change,
+            "CHANGE_PCT": change_pct,
+            "CHANGE_7D_GB": current - week_ago,
+            "AVG_DAILY_GROWTH_GB": daily,
+        })
+        return frame[has_data].sort_values("CHANGE_GB", ascending=False, ignore_index=True)
+
+    def series(self, max_series: int) -> pd.DataFrame:
+        """
+        Long-format daily GB for the max_series largest databases (by latest size) plus the
+        rest summed as "Other": columns DATABASE_NAME, USAGE_DATE and STORAGE_GB.
+        """
+        from utils.charts import OTHER_SERIES
+        gb = self.matrix / BYTES_PER_GB
+        latest = pd.DataFrame(gb).ffill(axis=1).to_numpy()[:, -1] if gb.size else np.array([])
+        order = np.argsort(-np.nan_to_num(latest), kind="stable")
+        top, rest = order[:max_series], order[max_series:]
+
+        names = list(self.databases[top])
+        blocks = [gb[top]]
+        if len(rest):
+            other = np.nansum(gb[rest], axis=0)
+            other[np.isnan(gb[rest]).all(axis=0)] = np.nan
+            names.append(OTHER_SERIES)
+            blocks.append(other[np.newaxis, :])
+        stacked = np.vstack(blocks)
+        frame = pd.DataFrame({
+            "DATABASE_NAME": np.repeat(names, len(self.dates)),
+            "USAGE_DATE": np.tile(self.dates, len(names)),
+            "STORAGE_GB": stacked.ravel(),
+        })
+        return frame.dropna(subset=["STORAGE_GB"]).reset_index(drop=True)